@@ -5,17 +5,252 @@ import shutil
 from dotenv import load_dotenv
 from twelve_labs_client import TwelveLabsClient
 from video_chunker import VideoChunker
+from encoding_profiles import DEFAULT_PROFILE, ENCODING_PROFILES
+from upload_pipeline import upload_chunks_fanout, upload_chunks_pipelined, upload_via_chunk_server
+from chunk_server import ChunkServer
+from upload_journal import UploadJournal
+from dedup_cache import DedupCache
+from scratch_space import ScratchSpace, ScratchSpaceFull, entry_prefix
+from task_poller import TaskPoller, TERMINAL_STATUSES
+from job_manager import JobCancelled, JobManager, SUCCEEDED, FAILED, CANCELLED, FINISHED_STATES
+import threading
 import time
+import uuid
+import weakref
+from urllib.parse import urlsplit
 
 # Load environment variables
 load_dotenv()
 
+# Buffer used when copying uploads to disk; memory use stays at this size regardless of file size
+UPLOAD_COPY_BUFFER_SIZE = int(os.getenv("UPLOAD_COPY_BUFFER_SIZE", 8 * 1024 * 1024))
+
+# Chunk planning targets: largest chunk sent in one upload, and concurrent chunk uploads
+MAX_CHUNK_BYTES = int(os.getenv("MAX_CHUNK_BYTES", 2 * 1024 * 1024 * 1024))
+MAX_CONCURRENT_UPLOADS = int(os.getenv("MAX_CONCURRENT_UPLOADS", 2))
+
+# Re-encode settings preselected for chunks that can't be stream-copied (throughput, balanced, size)
+ENCODING_PROFILE = os.getenv("ENCODING_PROFILE", DEFAULT_PROFILE)
+
+# Upload jobs running at once across all sessions
+MAX_UPLOAD_JOBS = int(os.getenv("MAX_UPLOAD_JOBS", 4))
+
+# Scratch space for upload copies and chunks: directory, byte budget, and free space always left on disk
+SCRATCH_DIR = os.getenv("SCRATCH_DIR") or None
+SCRATCH_BUDGET_BYTES = int(os.getenv("SCRATCH_BUDGET_BYTES", 50 * 1024 * 1024 * 1024))
+SCRATCH_MIN_FREE_BYTES = int(os.getenv("SCRATCH_MIN_FREE_BYTES", 1024 * 1024 * 1024))
+
+# Send chunks of stream-copyable sources straight from ffmpeg into the upload, without chunk files
+# (remuxed chunks go out with chunked transfer encoding)
+DIRECT_STREAMING = os.getenv("DIRECT_STREAMING", "0") == "1"
+
+# Let Twelve Labs download chunks from a small HTTP server in this app instead of receiving them
+# in upload requests: the base URL the API reaches that server at (enables it), and its port
+CHUNK_SERVER_PUBLIC_URL = os.getenv("CHUNK_SERVER_PUBLIC_URL") or None
+CHUNK_SERVER_PORT = int(os.getenv("CHUNK_SERVER_PORT", 8600))
+
+# How long an upload job waits for scratch space before giving up
+SCRATCH_WAIT_SECONDS = 30 * 60
+
+# How often the progress panel re-reads task statuses while uploads are indexing
+STATUS_REFRESH_SECONDS = 5
+
 def init_session_state():
     """Initialize session state variables"""
     if 'client' not in st.session_state:
         st.session_state.client = None
     if 'upload_progress' not in st.session_state:
         st.session_state.upload_progress = []
+    if 'upload_jobs' not in st.session_state:
+        st.session_state.upload_jobs = {}
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+
+@st.cache_resource
+def get_upload_journal():
+    """Shared job journal so failed chunked uploads can resume"""
+    return UploadJournal()
+
+@st.cache_resource
+def get_dedup_cache():
+    """Shared content-hash cache so identical videos aren't uploaded to an index twice"""
+    return DedupCache()
+
+@st.cache_resource
+def get_scratch_space():
+    """Process-wide scratch budget; created once per server start, which sweeps earlier leftovers"""
+    scratch = ScratchSpace(SCRATCH_DIR, budget_bytes=SCRATCH_BUDGET_BYTES, min_free_bytes=SCRATCH_MIN_FREE_BYTES)
+    # Chunks of failed uploads are kept for a retry, but not forever
+    scratch.sweep(stray_dirs=[os.getcwd()], expire_dirs=[get_upload_journal().chunk_root])
+    return scratch
+
+@st.cache_resource
+def get_chunk_server():
+    """Process-wide server the API downloads chunks from, or None when CHUNK_SERVER_PUBLIC_URL isn't set"""
+    if not CHUNK_SERVER_PUBLIC_URL:
+        return None
+    return ChunkServer(port=CHUNK_SERVER_PORT, public_url=CHUNK_SERVER_PUBLIC_URL).start()
+
+@st.cache_resource
+def get_job_manager():
+    """Process-wide upload job registry, shared by every session and rerun"""
+    return JobManager(max_workers=MAX_UPLOAD_JOBS)
+
+@st.cache_resource
+def get_shared_task_poller(api_key, _client):
+    """One background task-status poller per API key, shared by every session using that key"""
+    return TaskPoller(_client).start()
+
+def get_task_poller(client):
+    """Task-status poller for the client's API key (one thread per key, not per session)"""
+    return get_shared_task_poller(client.api_key, client)
+
+def track_uploads(client, index_id, name, results):
+    """Add upload results to the progress panel and start polling their tasks"""
+    poller = get_task_poller(client)
+    if isinstance(results, dict):
+        results = [results]
+    
+    for i, result in enumerate(results or []):
+        task_id = result.get('_id') or result.get('id')
+        if not task_id:
+            continue
+        item_name = name if len(results) == 1 else f"{name} (chunk {i+1}/{len(results)})"
+        poller.track(task_id, index_id=index_id, name=item_name)
+        st.session_state.upload_progress.append({
+            'name': item_name,
+            'task_id': task_id,
+            'status': result.get('status', 'pending')
+        })
+
+def track_fanout(client, name, outcomes):
+    """Track a fan-out job's uploads per index; indexes it failed on show up as failed entries"""
+    for index_id, outcome in outcomes.items():
+        if outcome['status'] == 'failed':
+            st.session_state.upload_progress.append({
+                'name': f"{name} → {index_id}",
+                'task_id': None,
+                'status': 'failed',
+                'error': outcome['error']
+            })
+        else:
+            track_uploads(client, index_id, f"{name} → {index_id}", outcome['results'])
+
+def byte_progress(job, source_size, expected_chunks):
+    """
+    Upload byte callback for a job: progress bar plus sent/rate/ETA detail line
+    Called from the upload threads as fn(chunk_index, bytes_sent, total_bytes)
+    """
+    lock = threading.Lock()
+    sent_per_chunk = {}
+    fraction_per_chunk = {}
+    started = time.time()
+    
+    def on_bytes(chunk_index, sent, total):
+        with lock:
+            sent_per_chunk[chunk_index] = sent
+            fraction_per_chunk[chunk_index] = sent / total if total else 1.0
+            sent_total = sum(sent_per_chunk.values())
+            progress = sum(fraction_per_chunk.values()) / max(expected_chunks, 1)
+        
+        rate = sent_total / max(time.time() - started, 1e-6)
+        remaining = max(source_size - sent_total, 0)
+        eta = f"{remaining / rate:.0f}s" if rate > 0 and remaining else "-"
+        job.report(min(progress, 1.0),
+                   detail=f"{format_size(sent_total)} of ~{format_size(source_size)} sent · "
+                          f"{format_size(rate)}/s · ETA {eta}")
+    
+    return on_bytes
+
+def save_uploaded_file(uploaded_file, suffix='.mp4', buffer_size=UPLOAD_COPY_BUFFER_SIZE, directory=None):
+    """Copy an uploaded file to a temp file (in directory, if given) in fixed-size blocks; returns the temp path"""
+    uploaded_file.seek(0)
+    prefix = entry_prefix("upload") if directory else None
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, prefix=prefix, dir=directory) as tmp_file:
+        shutil.copyfileobj(uploaded_file, tmp_file, buffer_size)
+        return tmp_file.name
+
+class PreparedUpload:
+    """
+    Temp copy of the file in the uploader and its chunk analysis, kept across reruns
+    The copy is removed and its scratch reservation released when it is discarded or
+    the session is dropped, unless an upload job took it over
+    """
+    
+    def __init__(self, file_id, path=None, reservation=None, analysis=None, error=None):
+        self.file_id = file_id
+        self.path = path
+        self.reservation = reservation
+        self.analysis = analysis
+        self.error = error
+        self.handed_off = False
+        self._finalizer = weakref.finalize(self, remove_upload_copy, path, reservation)
+    
+    def discard(self):
+        self._finalizer()
+    
+    def hand_off(self):
+        """An upload job owns the copy from now on"""
+        self._finalizer.detach()
+        self.handed_off = True
+
+def remove_upload_copy(path, reservation):
+    """Delete a temp upload copy and release its scratch reservation"""
+    if path and os.path.exists(path):
+        try:
+            os.unlink(path)
+        except:
+            pass
+    if reservation is not None:
+        reservation.release()
+
+def prepare_upload(uploaded_file):
+    """
+    Copy and analyze the file in the uploader once, reusing the result on later reruns
+    Returns None when there is no file or no scratch space for it yet (shown as an error)
+    """
+    prepared = st.session_state.get('prepared_upload')
+    if prepared is not None and (uploaded_file is None or prepared.file_id != uploaded_file.file_id):
+        # Another file (or none) is selected now
+        prepared.discard()
+        prepared = st.session_state.prepared_upload = None
+    if uploaded_file is None or prepared is not None:
+        return prepared
+    
+    # The temp copy needs room in the scratch budget; don't start if there is none
+    scratch = get_scratch_space()
+    try:
+        reservation = scratch.reserve(uploaded_file.size, timeout=0)
+    except ScratchSpaceFull as e:
+        st.error(f"❌ Not enough scratch space for this file right now: {str(e)}")
+        return None
+    
+    temp_file_path = None
+    try:
+        # Save uploaded file temporarily (streamed in blocks, never read() whole)
+        temp_file_path = save_uploaded_file(uploaded_file, directory=scratch.root)
+        prepared = PreparedUpload(uploaded_file.file_id, temp_file_path, reservation)
+        prepared.analysis = make_chunker().get_chunk_info(temp_file_path)
+    except Exception as e:
+        if prepared is not None:
+            prepared.discard()
+        else:
+            remove_upload_copy(temp_file_path, reservation)
+        prepared = PreparedUpload(uploaded_file.file_id, error=f"Failed to analyze video: {str(e)}")
+    
+    st.session_state.prepared_upload = prepared
+    return prepared
+
+def make_chunker(encoding_profile=ENCODING_PROFILE):
+    """Chunker sized for the API's upload limit and the uploader's parallelism"""
+    return VideoChunker(chunk_duration_hours=1.0, max_chunk_bytes=MAX_CHUNK_BYTES,
+                        parallelism=MAX_CONCURRENT_UPLOADS, encoding_profile=encoding_profile)
+
+def format_size(num_bytes):
+    """Format a byte count as MB/GB"""
+    if num_bytes >= 1024 ** 3:
+        return f"{num_bytes / 1024 ** 3:.2f} GB"
+    return f"{num_bytes / 1024 ** 2:.1f} MB"
 
 def format_duration(seconds):
     """Format duration from seconds to human readable format"""
@@ -56,6 +291,10 @@ def main():
         st.session_state.client = None
     if 'upload_progress' not in st.session_state:
         st.session_state.upload_progress = []
+    if 'upload_jobs' not in st.session_state:
+        st.session_state.upload_jobs = {}
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
     
     # Sidebar for API configuration
     with st.sidebar:
@@ -71,7 +310,9 @@ def main():
         
         if api_key:
             try:
-                st.session_state.client = TwelveLabsClient(api_key)
+                # Keep the client (and its connection pool) across reruns
+                if st.session_state.client is None or st.session_state.client.api_key != api_key:
+                    st.session_state.client = TwelveLabsClient(api_key, dedup_cache=get_dedup_cache())
                 st.success("✅ API key configured successfully!")
             except Exception as e:
                 st.error(f"❌ Invalid API key: {str(e)}")
@@ -107,7 +348,7 @@ def main():
         # Statistics
         if st.session_state.upload_progress:
             st.header("📊 Upload Statistics")
-            completed = len([p for p in st.session_state.upload_progress if p.get('status') == 'completed'])
+            completed = len([p for p in st.session_state.upload_progress if p.get('status') == 'ready'])
             total = len(st.session_state.upload_progress)
             st.metric("Uploads Completed", f"{completed}/{total}")
             
@@ -134,12 +375,15 @@ def main():
         )
         
         index_id = None
+        extra_index_ids = []
         
         if index_option == "Use existing index":
             # Get existing indexes only if client is configured
             if st.session_state.client:
                 try:
-                    indexes = st.session_state.client.list_indexes()
+                    # Cached by the client for a minute (all pages); creating an index refreshes it
+                    refresh_indexes = st.button("🔄 Refresh indexes")
+                    indexes = st.session_state.client.list_indexes(refresh=refresh_indexes)
                     if indexes:
                         # Handle different possible field names in API v1.3
                         index_options = {}
@@ -155,6 +399,10 @@ def main():
                             selected_index = st.selectbox("Select an index:", list(index_options.keys()))
                             if selected_index:
                                 index_id = index_options[selected_index]
+                            # Chunks are encoded once and sent to every selected index
+                            extra_index_ids = [index_options[label] for label in st.multiselect(
+                                "Also upload to:", [label for label in index_options if label != selected_index]
+                            )]
                         else:
                             st.warning("Found indexes but couldn't parse them properly. Please use manual index ID input.")
                     else:
@@ -164,7 +412,7 @@ def main():
                     manual_index_id = st.text_input("Or enter index ID manually:")
                     if manual_index_id:
                         index_id = manual_index_id
-                        
+                
                 except Exception as e:
                     st.error(f"Failed to load indexes: {str(e)}")
             else:
@@ -202,117 +450,287 @@ def main():
                 accept_multiple_files=False
             )
             
-            if uploaded_file:
-                # Save uploaded file temporarily
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmp_file:
-                    tmp_file.write(uploaded_file.read())
-                    temp_file_path = tmp_file.name
+            # Copied and analyzed once per selected file; reruns reuse both
+            prepared = prepare_upload(uploaded_file)
+            if prepared is not None and prepared.error:
+                st.error(f"❌ {prepared.error}")
+            elif prepared is not None and prepared.handed_off:
+                st.info("📤 This file is uploading in the background - choose another file to upload more")
+            elif prepared is not None:
+                needs_chunking, chunk_count, duration, plan = prepared.analysis
                 
-                try:
-                    # Analyze video
-                    chunker = VideoChunker()
-                    needs_chunking, chunk_count, duration = chunker.get_chunk_info(temp_file_path)
-                    
-                    # Display video info
-                    st.info(f"📊 Video Duration: {format_duration(duration)}")
-                    
-                    if needs_chunking:
-                        st.warning(f"⚠️ Video is longer than 1 hour and will be split into {chunk_count} chunks")
-                    else:
-                        st.success("✅ Video is under 1 hour - no chunking needed")
-                    
-                    # Upload button
-                    if st.button("🚀 Upload Video"):
-                        upload_chunks(st.session_state.client, temp_file_path, index_id, needs_chunking)
+                # Display video info
+                st.info(f"📊 Video Duration: {format_duration(duration)}")
                 
-                except Exception as e:
-                    st.error(f"❌ Failed to analyze video: {str(e)}")
-                finally:
-                    # Clean up temp file
-                    if os.path.exists(temp_file_path):
-                        os.unlink(temp_file_path)
+                encoding_profile = ENCODING_PROFILE
+                if needs_chunking:
+                    st.warning(f"⚠️ Video exceeds 1 hour or {format_size(MAX_CHUNK_BYTES)} and will be split into {chunk_count} chunks")
+                    with st.expander("🧩 Chunk plan"):
+                        for i, chunk in enumerate(plan):
+                            st.write(f"Chunk {i+1}: {format_duration(chunk['start'])} - {format_duration(chunk['end'])} "
+                                     f"(~{format_size(chunk['estimated_bytes'])})")
+                    profile_names = list(ENCODING_PROFILES)
+                    encoding_profile = st.selectbox(
+                        "Encoding profile:", profile_names,
+                        index=profile_names.index(ENCODING_PROFILE) if ENCODING_PROFILE in profile_names else 0,
+                        help="How chunks are encoded when they can't simply be cut from the source"
+                    )
+                    st.caption(ENCODING_PROFILES[encoding_profile].description)
+                else:
+                    st.success("✅ Video is within the chunk limits - no chunking needed")
+                
+                # Upload button
+                if st.button("🚀 Upload Video"):
+                    # The job owns the temp file from here on and removes it when done,
+                    # so reruns and other widgets can't interrupt the upload
+                    scratch = get_scratch_space()
+                    if extra_index_ids:
+                        job_index_ids = [index_id] + [i for i in extra_index_ids if i != index_id]
+                        job_id = get_job_manager().submit(
+                            upload_to_indexes, st.session_state.client, prepared.path, job_index_ids, scratch,
+                            get_chunk_server(), encoding_profile,
+                            name=uploaded_file.name, owner=st.session_state.session_id,
+                            cleanup_paths=[prepared.path], cleanup_callbacks=[prepared.reservation.release]
+                        )
+                    else:
+                        job_index_ids = index_id
+                        job_id = get_job_manager().submit(
+                            upload_chunks, st.session_state.client, prepared.path, index_id, needs_chunking,
+                            scratch, get_chunk_server(), encoding_profile,
+                            name=uploaded_file.name, owner=st.session_state.session_id,
+                            cleanup_paths=[prepared.path], cleanup_callbacks=[prepared.reservation.release]
+                        )
+                    prepared.hand_off()
+                    st.session_state.upload_jobs[job_id] = job_index_ids
+                    st.success("📤 Upload started in the background - follow it under Upload Progress")
+            
+            # Videos already on HTTP storage skip this server entirely
+            with st.expander("🔗 Or upload from a URL"):
+                video_url = st.text_input(
+                    "Video URL:",
+                    help="A public or presigned URL. Twelve Labs downloads the video itself, so it isn't chunked "
+                         "and must be within the upload limits."
+                )
+                if video_url and st.button("🚀 Upload from URL"):
+                    name = os.path.basename(urlsplit(video_url).path) or video_url
+                    job_id = get_job_manager().submit(
+                        upload_from_url, st.session_state.client, video_url, index_id,
+                        name=name, owner=st.session_state.session_id
+                    )
+                    st.session_state.upload_jobs[job_id] = index_id
+                    st.success("📤 Upload started in the background - follow it under Upload Progress")
     
     with col2:
         st.header("📊 Upload Progress")
         
+        # Upload jobs run in the background; this only reads their snapshots
+        job_manager = get_job_manager()
+        jobs_running = False
+        for job_id, job_index_id in list(st.session_state.upload_jobs.items()):
+            job = job_manager.get(job_id)
+            if job is None:
+                del st.session_state.upload_jobs[job_id]
+                continue
+            
+            if job['status'] == SUCCEEDED:
+                # Hand the uploaded tasks over to the status poller
+                if isinstance(job_index_id, list):
+                    track_fanout(st.session_state.client, job['name'], job['result'])
+                else:
+                    track_uploads(st.session_state.client, job_index_id, job['name'], job['result'])
+                del st.session_state.upload_jobs[job_id]
+                continue
+            
+            with st.expander(f"⬆️ {job['name']}", expanded=True):
+                st.write(f"**Upload:** {job['status']}")
+                st.progress(job['progress'])
+                if job['detail'] and job['status'] not in FINISHED_STATES:
+                    st.caption(job['detail'])
+                for message in job['messages'][-3:]:
+                    st.write(message)
+                
+                if job['status'] in (FAILED, CANCELLED):
+                    st.error(f"❌ {job['error']}")
+                    if st.button("Dismiss", key=f"dismiss_{job_id}"):
+                        del st.session_state.upload_jobs[job_id]
+                        st.rerun()
+                else:
+                    jobs_running = True
+                    if st.button("Cancel upload", key=f"cancel_{job_id}"):
+                        job_manager.cancel(job_id)
+        
         if st.session_state.upload_progress:
+            # Statuses come from the session's background poller, not a request per task
+            poller = get_task_poller(st.session_state.client)
+            for progress_item in st.session_state.upload_progress:
+                record = poller.get(progress_item['task_id'])
+                if record:
+                    progress_item['status'] = record['status']
+                    if record['status'] in TERMINAL_STATUSES:
+                        # The session keeps the final status; the shared poller can forget it
+                        poller.untrack(progress_item['task_id'])
+            
             for progress_item in st.session_state.upload_progress:
                 with st.expander(f"🎬 {progress_item['name']}", expanded=True):
                     st.write(f"**Status:** {progress_item['status']}")
-                    st.write(f"**Task ID:** {progress_item['task_id']}")
-                    if progress_item['status'] == 'processing':
-                        st.spinner("Processing...")
-                    elif progress_item['status'] == 'ready':
+                    if progress_item['task_id']:
+                        st.write(f"**Task ID:** {progress_item['task_id']}")
+                    if progress_item['status'] == 'ready':
                         st.success("✅ Complete")
                     elif progress_item['status'] == 'failed':
-                        st.error("❌ Failed")
-        else:
+                        st.error(f"❌ {progress_item['error']}" if progress_item.get('error') else "❌ Failed")
+                    else:
+                        st.info("⏳ Processing...")
+        
+        elif not st.session_state.upload_jobs:
             st.info("No uploads in progress")
+        
+        if jobs_running or any(p['status'] not in TERMINAL_STATUSES for p in st.session_state.upload_progress):
+            if st.checkbox("🔄 Auto-refresh status", value=True):
+                time.sleep(STATUS_REFRESH_SECONDS)
+                st.rerun()
+
+def upload_from_url(job, client, video_url, index_id):
+    """
+    Create an upload task from a video URL; Twelve Labs downloads the video itself
+    Runs as a background job like upload_chunks
+    """
+    job.report(0.0, "🔗 Registering video URL...")
+    try:
+        result = client.upload_video_url(index_id, video_url)
+        job.report(1.0, "✅ Video URL registered - Twelve Labs is downloading it")
+        return result
+    except Exception as e:
+        raise Exception(f"Upload failed: {str(e)}")
 
-def upload_chunks(client, file_path, index_id, needs_chunking):
-    """Handle video upload with chunking if needed"""
+def upload_chunks(job, client, file_path, index_id, needs_chunking, scratch=None, chunk_server=None,
+                  encoding_profile=ENCODING_PROFILE):
+    """
+    Handle video upload with chunking if needed
+    Runs as a background job: progress goes to job.report(), never to st.*
+    With a chunk server, Twelve Labs downloads the file or chunks from it instead
+    """
     
     if not needs_chunking:
         # Upload original file directly
-        st.info("🎬 Uploading video...")
+        job.report(0.0, "🎬 Uploading video...")
         try:
-            result = client.upload_video(index_id, file_path)
+            track_bytes = byte_progress(job, os.path.getsize(file_path), 1)
+            if chunk_server is not None:
+                result = upload_via_chunk_server(client, chunk_server, index_id, file_path,
+                                                 progress_callback=lambda sent, total: track_bytes(0, sent, total))
+            else:
+                result = client.upload_video(index_id, file_path,
+                                             progress_callback=lambda sent, total: track_bytes(0, sent, total))
+            job.report(1.0, "✅ Video uploaded successfully")
             return result
         except Exception as e:
+            if job.cancelled:
+                raise JobCancelled("Job was cancelled")
             raise Exception(f"Upload failed: {str(e)}")
     
     # Video needs chunking
-    st.info("📹 Video is longer than 1 hour. Creating chunks...")
+    job.report(0.0, "📹 Video exceeds the chunk limits. Chunking and uploading in parallel...")
     
     try:
-        chunker = VideoChunker(chunk_duration_hours=1.0)
+        chunker = make_chunker(encoding_profile)
+        _, expected_chunks, _, _ = chunker.get_chunk_info(file_path)
         
-        # Create chunks
-        with st.spinner("Creating video chunks..."):
-            chunk_paths = chunker.chunk_video(file_path)
+        uploaded_count = 0
         
-        st.success(f"✅ Created {len(chunk_paths)} chunks")
-        
-        # Upload each chunk
-        upload_results = []
-        progress_bar = st.progress(0)
-        
-        for i, chunk_path in enumerate(chunk_paths):
-            progress = (i + 1) / len(chunk_paths)
-            progress_bar.progress(progress)
-            
+        def on_progress(event, chunk_index, chunk_path, result):
+            nonlocal uploaded_count
             chunk_name = os.path.basename(chunk_path)
-            st.write(f"⬆️ Uploading chunk {i+1}/{len(chunk_paths)}: {chunk_name}")
             
-            try:
-                result = client.upload_video(index_id, chunk_path)
-                upload_results.append(result)
-                st.write(f"✅ Chunk {i+1} uploaded successfully")
-                
-            except Exception as e:
-                st.error(f"❌ Failed to upload chunk {i+1}: {str(e)}")
-                # Clean up remaining chunks
-                for remaining_chunk in chunk_paths[i:]:
-                    if os.path.exists(remaining_chunk) and remaining_chunk != file_path:
-                        try:
-                            os.remove(remaining_chunk)
-                        except:
-                            pass
-                raise e
+            if event == "chunked":
+                job.report(message=f"⬆️ Uploading chunk {chunk_index+1}/{expected_chunks}: {chunk_name}")
+            elif event == "skipped":
+                uploaded_count += 1
+                job.report(min(uploaded_count / expected_chunks, 1.0),
+                           f"⏭️ Chunk {chunk_index+1} was already uploaded by an earlier attempt")
+            elif event == "uploaded":
+                uploaded_count += 1
+                job.report(min(uploaded_count / expected_chunks, 1.0),
+                           f"✅ Chunk {chunk_index+1} uploaded successfully")
+            elif event == "failed":
+                job.report(message=f"❌ Failed to upload chunk {chunk_index+1}: {result['error']}")
         
-        # Clean up chunk files (but not the original)
-        for chunk_path in chunk_paths:
-            if chunk_path != file_path and os.path.exists(chunk_path):
-                try:
-                    os.remove(chunk_path)
-                except:
-                    pass
+        # Chunks are uploaded (and deleted) as soon as each one is written;
+        # the journal lets a retry pick up where a failed attempt stopped
+        upload_results = upload_chunks_pipelined(client, chunker, file_path, index_id,
+                                                 max_concurrent_uploads=MAX_CONCURRENT_UPLOADS,
+                                                 progress_callback=on_progress,
+                                                 journal=get_upload_journal(),
+                                                 upload_progress_callback=byte_progress(
+                                                     job, os.path.getsize(file_path), expected_chunks),
+                                                 scratch=scratch,
+                                                 scratch_timeout=SCRATCH_WAIT_SECONDS,
+                                                 direct_stream=DIRECT_STREAMING,
+                                                 chunk_server=chunk_server)
         
-        st.success(f"🎉 All {len(chunk_paths)} chunks uploaded successfully!")
+        job.report(1.0, f"🎉 All {len(upload_results)} chunks uploaded successfully!")
         return upload_results
+    
+    except JobCancelled:
+        raise
+    except Exception as e:
+        if job.cancelled:
+            # Cancelled mid-transfer: the aborted upload surfaces as a chunk failure
+            raise JobCancelled("Job was cancelled")
+        raise Exception(f"Chunking/upload failed: {str(e)}")
+
+def upload_to_indexes(job, client, file_path, index_ids, scratch=None, chunk_server=None,
+                      encoding_profile=ENCODING_PROFILE):
+    """
+    Upload one video to several indexes, chunking it only once
+    Runs as a background job like upload_chunks; an index that fails doesn't stop the others
+    """
+    job.report(0.0, f"📹 Chunking once and uploading to {len(index_ids)} indexes...")
+    
+    try:
+        chunker = make_chunker(encoding_profile)
+        _, expected_chunks, _, _ = chunker.get_chunk_info(file_path)
+        total_uploads = expected_chunks * len(index_ids)
         
+        uploaded_count = 0
+        
+        def on_progress(event, index_id, chunk_index, chunk_path, result):
+            nonlocal uploaded_count
+            
+            if event == "chunked":
+                job.report(message=f"⬆️ Uploading chunk {chunk_index+1}/{expected_chunks}: "
+                                   f"{os.path.basename(chunk_path)}")
+            elif event in ("skipped", "uploaded"):
+                uploaded_count += 1
+                job.report(min(uploaded_count / total_uploads, 1.0),
+                           f"✅ Chunk {chunk_index+1} {event} to {index_id}")
+            elif event == "failed":
+                job.report(message=f"❌ Failed to upload chunk {chunk_index+1} to {index_id}: {result['error']}")
+        
+        track_bytes = byte_progress(job, os.path.getsize(file_path) * len(index_ids), total_uploads)
+        outcomes = upload_chunks_fanout(client, chunker, file_path, index_ids,
+                                        max_concurrent_uploads=MAX_CONCURRENT_UPLOADS,
+                                        progress_callback=on_progress,
+                                        journal=get_upload_journal(),
+                                        upload_progress_callback=lambda index_id, chunk_index, sent, total:
+                                            track_bytes((index_id, chunk_index), sent, total),
+                                        scratch=scratch,
+                                        scratch_timeout=SCRATCH_WAIT_SECONDS,
+                                        chunk_server=chunk_server)
+    
+    except JobCancelled:
+        raise
     except Exception as e:
+        if job.cancelled:
+            raise JobCancelled("Job was cancelled")
         raise Exception(f"Chunking/upload failed: {str(e)}")
+    
+    failed = [index_id for index_id, outcome in outcomes.items() if outcome['status'] == 'failed']
+    if len(failed) == len(outcomes):
+        raise Exception(f"Upload failed on every index: {outcomes[failed[0]]['error']}")
+    job.report(1.0, f"🎉 Uploaded to {len(outcomes) - len(failed)} of {len(outcomes)} indexes"
+                    + (f" (failed: {', '.join(failed)})" if failed else ""))
+    return outcomes
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,258 @@
+import asyncio
+import os
+import time
+from contextlib import ExitStack
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import aiohttp
+
+import metrics
+from retry_policy import RetryPolicy, RetryStats, TokenBucket
+from ttl_cache import TTLCache
+from twelve_labs_client import (CONNECT_TIMEOUT, INDEX_PAGE_LIMIT, READ_TIMEOUT, build_index_payload, next_index_page,
+                                parse_index_list)
+
+# Methods that can be repeated without creating anything twice
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+
+# Errors raised while connecting, before any of the request was sent
+# (aiohttp < 3.10 reports connect timeouts as a plain ServerTimeoutError)
+NOT_SENT_ERRORS = (aiohttp.ClientConnectorError,) + (
+    (aiohttp.ConnectionTimeoutError,) if hasattr(aiohttp, "ConnectionTimeoutError") else ()
+)
+
+class AsyncTwelveLabsClient:
+    """asyncio counterpart of TwelveLabsClient with the same methods and errors"""
+    
+    def __init__(self, api_key: str, base_url: str = "https://api.twelvelabs.io/v1.3", max_connections: int = 100,
+                 retry_policy: RetryPolicy = None, rate_limit: Optional[float] = None, rate_burst: Optional[int] = None,
+                 cache_ttl: float = 60.0, connect_timeout: float = CONNECT_TIMEOUT,
+                 read_timeout: float = READ_TIMEOUT):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.headers = {
+            "x-api-key": api_key,
+            "Content-Type": "application/json"
+        }
+        self.max_connections = max_connections
+        # No overall limit (uploads can be large), but a stalled connection fails
+        self.timeout = aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout, sock_read=read_timeout)
+        self._session = None
+        
+        # Same retry rules, rate limiter and counters as the sync client
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = TokenBucket(rate_limit, rate_burst)
+        self.stats = RetryStats()
+        self.index_cache = TTLCache(cache_ttl)
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Create the pooled session lazily, inside the running event loop"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+    
+    async def close(self):
+        """Close pooled connections"""
+        if self._session is not None:
+            await self._session.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+    
+    async def _throttle(self):
+        """Wait for a rate-limiter token without blocking the loop"""
+        wait = self.rate_limiter.reserve()
+        if wait > 0:
+            self.stats.add("throttle_waits")
+            self.stats.add("throttle_wait_seconds", wait)
+            await asyncio.sleep(wait)
+    
+    async def _request(self, method: str, url: str, ok_statuses, error_prefix: str,
+                       data_factory: Callable[[ExitStack], Any] = None, **kwargs) -> Any:
+        """
+        Send a request under the rate limiter, retrying retryable failures
+        
+        data_factory builds a fresh request body for every attempt (files it opens
+        on the stack are closed afterwards). Returns the decoded JSON body. POSTs
+        are only retried where no duplicate can result (see RetryPolicy).
+        """
+        idempotent = method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            await self._throttle()
+            self.stats.add("requests")
+            
+            try:
+                with ExitStack() as stack:
+                    if data_factory is not None:
+                        kwargs["data"] = data_factory(stack)
+                    
+                    async with self._get_session().request(method, url, **kwargs) as response:
+                        if response.status in ok_statuses:
+                            return await response.json()
+                        
+                        status = response.status
+                        text = await response.text()
+                        retry_after = response.headers.get("Retry-After")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self.retry_policy.max_retries or not (idempotent or isinstance(e, NOT_SENT_ERRORS)):
+                    raise
+                delay = self.retry_policy.delay(attempt)
+            else:
+                if attempt >= self.retry_policy.max_retries or not self.retry_policy.is_retryable(
+                        status, idempotent, retry_after):
+                    raise Exception(f"{error_prefix}: {status} - {text}")
+                
+                delay = self.retry_policy.delay(attempt, retry_after)
+                if status == 429:
+                    self.stats.add("throttled_responses")
+                    # Hold back every request of this client, not just this one
+                    self.rate_limiter.pause(delay)
+            
+            self.stats.add("retries")
+            self.stats.add("retry_wait_seconds", delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+    
+    async def create_index(self, name: str, engines: List[str] = None) -> Dict:
+        """Create a new index"""
+        payload = build_index_payload(name, engines)
+        
+        result = await self._request("POST", f"{self.base_url}/indexes", (201,), "Failed to create index",
+                                     headers=self.headers, json=payload)
+        self.index_cache.invalidate()
+        return result
+    
+    async def get_index(self, index_id: str, refresh: bool = False) -> Dict:
+        """Get index details (cached; refresh=True bypasses the cache)"""
+        if not refresh:
+            cached = self.index_cache.get(("index", index_id))
+            if cached is not None:
+                return cached
+        
+        index = await self._request("GET", f"{self.base_url}/indexes/{index_id}", (200,), "Failed to get index",
+                                    headers=self.headers)
+        self.index_cache.set(("index", index_id), index)
+        return index
+    
+    async def iter_indexes(self, page_limit: int = INDEX_PAGE_LIMIT) -> AsyncIterator[Dict]:
+        """Yield every index, fetching pages lazily"""
+        page = 1
+        while page is not None:
+            response_data = await self._request("GET", f"{self.base_url}/indexes", (200,), "Failed to list indexes",
+                                                headers=self.headers, params={"page": page, "page_limit": page_limit})
+            for index in parse_index_list(response_data):
+                yield index
+            page = next_index_page(response_data, page)
+    
+    async def list_indexes(self, refresh: bool = False) -> List[Dict]:
+        """List all indexes, across every page (cached; refresh=True bypasses the cache)"""
+        if not refresh:
+            cached = self.index_cache.get("indexes")
+            if cached is not None:
+                return list(cached)
+        
+        indexes = [index async for index in self.iter_indexes()]
+        self.index_cache.set("indexes", indexes)
+        return list(indexes)
+    
+    async def upload_video(self, index_id: str, file_path: str, video_title: str = None) -> Dict:
+        """Upload a video to an index, streaming the file from disk"""
+        if video_title is None:
+            video_title = os.path.basename(file_path)
+        
+        # No Content-Type header - aiohttp sets the multipart boundary
+        headers = {
+            "x-api-key": self.api_key
+        }
+        
+        def make_form(stack):
+            # aiohttp sends file objects in chunks instead of loading them in memory
+            video_file = stack.enter_context(open(file_path, 'rb'))
+            form = aiohttp.FormData()
+            form.add_field("index_id", index_id)
+            form.add_field("video_file", video_file, filename=video_title, content_type="video/mp4")
+            return form
+        
+        with metrics.timed("upload_seconds"):
+            result = await self._request("POST", f"{self.base_url}/tasks", (200, 201), "Failed to upload video",
+                                         data_factory=make_form, headers=headers)
+        metrics.increment("upload_bytes_total", os.path.getsize(file_path))
+        return result
+    
+    async def upload_video_url(self, index_id: str, video_url: str) -> Dict:
+        """Create an upload task from a video the API downloads itself (public or presigned URL)"""
+        headers = {
+            "x-api-key": self.api_key
+        }
+        
+        def make_form(stack):
+            # FormData would send plain fields urlencoded; the endpoint takes multipart
+            form = aiohttp.MultipartWriter("form-data")
+            for name, value in (("index_id", index_id), ("video_url", video_url)):
+                form.append(value).set_content_disposition("form-data", name=name)
+            return form
+        
+        with metrics.timed("upload_seconds"):
+            return await self._request("POST", f"{self.base_url}/tasks", (200, 201),
+                                       "Failed to upload video from URL", data_factory=make_form, headers=headers)
+    
+    async def upload_many(self, index_id: str, file_paths: List[str], max_concurrency: int = 4,
+                          video_titles: List[str] = None) -> List[Dict]:
+        """Upload several videos concurrently; results are returned in file_paths order"""
+        if video_titles is None:
+            video_titles = [None] * len(file_paths)
+        
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        
+        async def upload_one(file_path, video_title):
+            async with semaphore:
+                try:
+                    return await self.upload_video(index_id, file_path, video_title)
+                except Exception as e:
+                    raise Exception(f"Failed to upload {os.path.basename(file_path)}: {str(e)}")
+        
+        tasks = [asyncio.ensure_future(upload_one(p, t)) for p, t in zip(file_paths, video_titles)]
+        try:
+            return await asyncio.gather(*tasks)
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            raise
+    
+    async def get_task_status(self, task_id: str) -> Dict:
+        """Get the status of an upload task"""
+        return await self._request("GET", f"{self.base_url}/tasks/{task_id}", (200,), "Failed to get task status",
+                                   headers=self.headers)
+    
+    async def list_tasks(self, index_id: str = None, page: int = 1, page_limit: int = 50, **filters) -> Dict:
+        """List upload tasks, newest first (one page, with "data" and "page_info")"""
+        params = {"page": page, "page_limit": page_limit, "sort_by": "created_at", "sort_option": "desc"}
+        if index_id:
+            params["index_id"] = index_id
+        params.update(filters)
+        
+        return await self._request("GET", f"{self.base_url}/tasks", (200,), "Failed to list tasks",
+                                   headers=self.headers, params=params)
+    
+    async def wait_for_upload_completion(self, task_id: str, timeout: int = 3600, poll_interval: float = 10) -> Dict:
+        """Wait for upload task to complete without blocking the event loop"""
+        start_time = time.monotonic()
+        
+        while time.monotonic() - start_time < timeout:
+            status = await self.get_task_status(task_id)
+            
+            if status["status"] in ("ready", "failed"):
+                metrics.observe("indexing_wait_seconds", time.monotonic() - start_time)
+            if status["status"] == "ready":
+                return status
+            elif status["status"] == "failed":
+                raise Exception(f"Upload failed: {status.get('error', 'Unknown error')}")
+            
+            await asyncio.sleep(poll_interval)
+        
+        raise Exception("Upload timeout")
@@ -0,0 +1,84 @@
+"""
+Throughput of AsyncTwelveLabsClient vs TwelveLabsClient against the mock API
+
+Usage: python benchmarks/bench_async_client.py [--tasks 200] [--threads 16]
+Each task uploads a small file and then polls until the mock marks it ready.
+The sync client needs one blocked thread per in-flight task; the async client
+tracks all of them on one event loop.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_twelve_labs_client import AsyncTwelveLabsClient
+from mock_api import MockTwelveLabsServer
+from twelve_labs_client import TwelveLabsClient
+
+
+def run_sync(server, path: str, tasks: int, threads: int, poll_interval: float):
+    """Upload and wait for `tasks` uploads on a thread pool"""
+    with TwelveLabsClient(server.api_key, base_url=server.base_url, pool_size=threads) as client:
+        def one(_):
+            task = client.upload_video("bench-index", path)
+            return client.wait_for_upload_completion(task["_id"], poll_interval=poll_interval)
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(one, range(tasks)))
+
+
+async def run_async(server, path: str, tasks: int, concurrency: int, poll_interval: float):
+    """Upload and wait for `tasks` uploads on the event loop"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with AsyncTwelveLabsClient(server.api_key, base_url=server.base_url) as client:
+        async def one():
+            async with semaphore:
+                task = await client.upload_video("bench-index", path)
+            # Polling is not bounded by the upload semaphore - every task waits concurrently
+            return await client.wait_for_upload_completion(task["_id"], poll_interval=poll_interval)
+
+        await asyncio.gather(*(one() for _ in range(tasks)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Async vs sync client throughput")
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16, help="Sync client thread pool size")
+    parser.add_argument("--upload-concurrency", type=int, default=16, help="Concurrent uploads for the async client")
+    parser.add_argument("--file-kb", type=int, default=256)
+    parser.add_argument("--latency", type=float, default=0.02, help="Mock API latency per request in seconds")
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_async_")
+    try:
+        path = os.path.join(work_dir, "small.mp4")
+        with open(path, "wb") as f:
+            f.write(os.urandom(args.file_kb * 1024))
+
+        print(f"{'client':<8} {'tasks':>6} {'seconds':>8} {'tasks/s':>8} {'client threads':>15}")
+
+        with MockTwelveLabsServer(latency=args.latency) as server:
+            start = time.perf_counter()
+            run_sync(server, path, args.tasks, args.threads, args.poll_interval)
+            elapsed = time.perf_counter() - start
+            print(f"{'sync':<8} {args.tasks:>6} {elapsed:>8.2f} {args.tasks / elapsed:>8.1f} {args.threads:>15}")
+
+        with MockTwelveLabsServer(latency=args.latency) as server:
+            start = time.perf_counter()
+            asyncio.run(run_async(server, path, args.tasks, args.upload_concurrency, args.poll_interval))
+            elapsed = time.perf_counter() - start
+            print(f"{'async':<8} {args.tasks:>6} {elapsed:>8.2f} {args.tasks / elapsed:>8.1f} {1:>15}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
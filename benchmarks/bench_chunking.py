@@ -0,0 +1,86 @@
+"""
+Compare stream-copy chunking against the re-encode path and its encoding profiles
+
+Usage: python benchmarks/bench_chunking.py [--duration 130] [--chunk-seconds 30] [--profiles throughput size]
+Reports wall-clock time and CPU seconds (this process plus ffmpeg children).
+Use --width/--height 1920 1080 to see what downscaling profiles save.
+"""
+import argparse
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from encoding_profiles import DEFAULT_PROFILE, ENCODING_PROFILES
+from synthetic_media import generate_video
+from video_chunker import VideoChunker
+
+
+def cpu_seconds() -> float:
+    """User + system CPU time of this process and its reaped children"""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def run_mode(source_path: str, chunk_seconds: float, stream_copy: bool, max_workers: int = None,
+             profile: str = DEFAULT_PROFILE) -> dict:
+    """Chunk source_path once and measure the cost"""
+    chunker = VideoChunker(chunk_duration_hours=chunk_seconds / 3600, stream_copy=stream_copy,
+                           max_workers=max_workers, encoding_profile=profile)
+    output_dir = tempfile.mkdtemp(prefix="bench_chunks_")
+    
+    try:
+        cpu_start = cpu_seconds()
+        wall_start = time.perf_counter()
+        chunk_paths = chunker.chunk_video(source_path, output_dir)
+        wall = time.perf_counter() - wall_start
+        cpu = cpu_seconds() - cpu_start
+        
+        return {
+            "mode": "stream-copy" if stream_copy else f"{profile} x{max_workers or 'auto'}",
+            "chunks": len(chunk_paths),
+            "wall_seconds": wall,
+            "cpu_seconds": cpu,
+            "output_bytes": sum(os.path.getsize(p) for p in chunk_paths)
+        }
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunking benchmark")
+    parser.add_argument("--duration", type=float, default=130.0, help="Synthetic source length in seconds")
+    parser.add_argument("--chunk-seconds", type=float, default=30.0, help="Target chunk length in seconds")
+    parser.add_argument("--source", help="Use an existing video instead of a synthetic one")
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, None],
+                        help="Re-encode worker counts to compare (omit a value for the automatic default)")
+    parser.add_argument("--profiles", nargs="*", default=[], choices=list(ENCODING_PROFILES),
+                        help="Encoding profiles to re-encode with as well (automatic worker count)")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=360)
+    args = parser.parse_args()
+    
+    work_dir = tempfile.mkdtemp(prefix="bench_source_")
+    try:
+        source_path = args.source or generate_video(os.path.join(work_dir, "source.mp4"), args.duration,
+                                                    args.width, args.height)
+        
+        runs = [(True, None, DEFAULT_PROFILE)] + [(False, workers, DEFAULT_PROFILE) for workers in args.workers]
+        runs += [(False, None, profile) for profile in args.profiles]
+        
+        print(f"{'mode':<16} {'chunks':>6} {'wall s':>9} {'cpu s':>9} {'MB out':>9}")
+        for stream_copy, workers, profile in runs:
+            r = run_mode(source_path, args.chunk_seconds, stream_copy, workers, profile)
+            print(f"{r['mode']:<16} {r['chunks']:>6} {r['wall_seconds']:>9.2f} "
+                  f"{r['cpu_seconds']:>9.2f} {r['output_bytes'] / 1e6:>9.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Concurrent uploads against a rate-limited mock API, with and without the
+client-side token bucket
+
+Usage: python benchmarks/bench_rate_limit.py [--uploads 40] [--concurrency 8] [--server-rate 5]
+Prints the client's retry/throttle counters so the policy can be tuned.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_api import MockTwelveLabsServer
+from retry_policy import RetryPolicy
+from twelve_labs_client import TwelveLabsClient
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rate limiter benchmark")
+    parser.add_argument("--uploads", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--server-rate", type=float, default=5, help="Server quota in requests/second")
+    args = parser.parse_args()
+    
+    work_dir = tempfile.mkdtemp(prefix="bench_rate_")
+    try:
+        path = os.path.join(work_dir, "small.mp4")
+        with open(path, "wb") as f:
+            f.write(os.urandom(64 * 1024))
+        paths = [path] * args.uploads
+        
+        for label, client_rate in (("no client limit", None), (f"client limit {args.server_rate:g}/s", args.server_rate)):
+            with MockTwelveLabsServer(rate_limit=args.server_rate) as server:
+                policy = RetryPolicy(max_retries=10, backoff_base=0.25, backoff_max=5)
+                with TwelveLabsClient(server.api_key, base_url=server.base_url, retry_policy=policy,
+                                      rate_limit=client_rate, rate_burst=1) as client:
+                    start = time.perf_counter()
+                    client.upload_many("bench-index", paths, max_concurrency=args.concurrency)
+                    elapsed = time.perf_counter() - start
+                
+                stats = client.stats.snapshot()
+                print(f"{label}: {elapsed:.2f}s, server 429s={server.rejected}")
+                for name, value in stats.items():
+                    print(f"    {name:<22} {value:.2f}" if isinstance(value, float) else f"    {name:<22} {value}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
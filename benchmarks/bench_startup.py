@@ -0,0 +1,86 @@
+"""
+Cold-start cost of the app: module import time and first Streamlit render
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--compare <git revision>]
+
+Every sample runs in a fresh interpreter (what a Streamlit cold start or a
+worker spawn pays):
+
+    import video_chunker    the chunking module alone (moviepy used to load here)
+    import app              everything app.py imports, Streamlit included
+    first render            AppTest run of app.py, from interpreter start to rendered page
+
+With --compare, the same measurements run on a checkout of that revision
+(e.g. --compare HEAD~1) so before/after shows up side by side. Medians of
+--runs samples are reported.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each snippet prints its own elapsed seconds; the interpreter's own startup isn't counted
+SNIPPETS = {
+    "import video_chunker": "import time; t = time.perf_counter(); import video_chunker; "
+                            "print(time.perf_counter() - t)",
+    "import app": "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)",
+    "first render": "import time; t = time.perf_counter(); "
+                    "from streamlit.testing.v1 import AppTest; "
+                    "at = AppTest.from_file('app.py', default_timeout=120).run(); "
+                    "assert not at.exception, at.exception; print(time.perf_counter() - t)",
+}
+
+
+def measure(source_dir: str, snippet: str, runs: int) -> float:
+    """Median seconds of snippet over runs fresh interpreters started in source_dir"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    # No API key, so the first render stops at the key prompt without network calls
+    env.pop("TWELVE_LABS_API_KEY", None)
+    samples = []
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, "-c", f"import sys; sys.path.insert(0, '.'); {snippet}"],
+                                   cwd=source_dir, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise Exception(f"Failed to measure in {source_dir}: {completed.stderr.strip()[-500:]}")
+        samples.append(float(completed.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def export_revision(revision: str, target_dir: str):
+    """Write the tree of a git revision to target_dir"""
+    archive = subprocess.run(["git", "archive", revision], cwd=REPO_DIR, capture_output=True, check=True)
+    subprocess.run(["tar", "-x", "-C", target_dir], input=archive.stdout, check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="App cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--compare", help="Git revision to measure as well (e.g. HEAD~1)")
+    args = parser.parse_args()
+    
+    trees = [("working tree", REPO_DIR)]
+    work_dir = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        if args.compare:
+            export_revision(args.compare, work_dir)
+            trees.insert(0, (args.compare, work_dir))
+        
+        # One throwaway run per tree so every sample sees the same warm disk cache
+        for _, source_dir in trees:
+            measure(source_dir, SNIPPETS["import app"], 1)
+        
+        print(f"{'':<22}" + "".join(f"{name:>16}" for name, _ in trees))
+        for label, snippet in SNIPPETS.items():
+            cells = [f"{measure(source_dir, snippet, args.runs) * 1000:>14.0f}ms" for _, source_dir in trees]
+            print(f"{label:<22}" + "".join(cells))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
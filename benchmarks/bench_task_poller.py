@@ -0,0 +1,69 @@
+"""
+Tracking many upload tasks: one blocked thread per task vs TaskPoller
+
+Usage: python benchmarks/bench_task_poller.py [--tasks 500] [--ready-after-polls 5]
+Tasks are created on the mock API, then waited on both ways; prints the status
+requests each approach needed and how long until every task was ready.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_api import MockTwelveLabsServer
+from task_poller import TaskPoller
+from twelve_labs_client import TwelveLabsClient
+
+
+def create_tasks(client, path, count):
+    return [task["_id"] for task in client.upload_many("bench-index", [path] * count, max_concurrency=8)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Task status polling benchmark")
+    parser.add_argument("--tasks", type=int, default=500)
+    parser.add_argument("--ready-after-polls", type=int, default=5)
+    parser.add_argument("--interval", type=float, default=0.2, help="Poll interval (poller: initial interval)")
+    args = parser.parse_args()
+    
+    work_dir = tempfile.mkdtemp(prefix="bench_poll_")
+    try:
+        path = os.path.join(work_dir, "small.mp4")
+        with open(path, "wb") as f:
+            f.write(os.urandom(1024))
+        
+        with MockTwelveLabsServer(ready_after_polls=args.ready_after_polls) as server:
+            with TwelveLabsClient(server.api_key, base_url=server.base_url, pool_size=64) as client:
+                task_ids = create_tasks(client, path, args.tasks)
+                before = client.stats.snapshot()["requests"]
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=args.tasks) as executor:
+                    list(executor.map(lambda t: client.wait_for_upload_completion(t, poll_interval=args.interval),
+                                      task_ids))
+                elapsed = time.perf_counter() - start
+                requests = client.stats.snapshot()["requests"] - before
+            print(f"thread per task: {requests} requests, {args.tasks} threads, {elapsed:.2f}s")
+        
+        with MockTwelveLabsServer(ready_after_polls=args.ready_after_polls) as server:
+            with TwelveLabsClient(server.api_key, base_url=server.base_url) as client:
+                task_ids = create_tasks(client, path, args.tasks)
+                before = client.stats.snapshot()["requests"]
+                start = time.perf_counter()
+                with TaskPoller(client, min_interval=args.interval, max_interval=args.interval * 10) as poller:
+                    for task_id in task_ids:
+                        poller.track(task_id, index_id="bench-index")
+                    poller.wait(task_ids, timeout=600)
+                elapsed = time.perf_counter() - start
+                requests = client.stats.snapshot()["requests"] - before
+            print(f"TaskPoller:      {requests} requests, 1 thread, {elapsed:.2f}s")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
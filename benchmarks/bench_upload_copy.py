@@ -0,0 +1,78 @@
+"""
+Peak RSS of saving an upload to disk, for growing file sizes
+
+Usage: python benchmarks/bench_upload_copy.py [--sizes-mb 64 256 1024]
+Each measurement runs in a fresh subprocess. app.save_uploaded_file (block
+copy) should stay flat while the old read()-everything approach grows with
+the file. Exits non-zero if the block copy's RSS growth exceeds --max-growth-mb.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, os, resource, sys, tempfile
+sys.path.insert(0, {repo_root!r})
+import app
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+source_path, mode = sys.argv[1], sys.argv[2]
+before = peak_rss_mb()
+with open(source_path, "rb") as uploaded_file:
+    if mode == "block":
+        temp_path = app.save_uploaded_file(uploaded_file)
+    else:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp_file:
+            tmp_file.write(uploaded_file.read())
+            temp_path = tmp_file.name
+after = peak_rss_mb()
+os.unlink(temp_path)
+print(json.dumps({{"growth_mb": after - before}}))
+"""
+
+
+def measure(source_path: str, mode: str) -> float:
+    """Peak RSS growth (MB) of one copy in a fresh interpreter"""
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(repo_root=REPO_ROOT), source_path, mode],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])["growth_mb"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload copy memory benchmark")
+    parser.add_argument("--sizes-mb", type=int, nargs="*", default=[64, 256, 1024])
+    parser.add_argument("--max-growth-mb", type=float, default=64)
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'size MB':>8} {'block copy MB':>14} {'read() MB':>10}")
+    for size_mb in args.sizes_mb:
+        with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as source:
+            block = os.urandom(1024 * 1024)
+            for _ in range(size_mb):
+                source.write(block)
+        try:
+            block_growth = measure(source.name, "block")
+            read_growth = measure(source.name, "read")
+        finally:
+            os.unlink(source.name)
+
+        failed |= block_growth > args.max_growth_mb
+        print(f"{size_mb:>8} {block_growth:>14.1f} {read_growth:>10.1f}")
+
+    if failed:
+        print(f"FAIL: block copy grew RSS by more than {args.max_growth_mb} MB")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Client memory while sending one upload: requests' files= vs MultipartFileBody
+
+Usage: python benchmarks/bench_upload_memory.py [--file-mb 256]
+Measures the peak Python allocations for producing the multipart body of one
+file (what requests holds before the first byte goes out), and how often the
+streaming body reports progress.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from multipart_stream import MultipartFileBody
+
+
+def peak_mb(fn) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1e6, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload body memory benchmark")
+    parser.add_argument("--file-mb", type=float, default=256)
+    parser.add_argument("--block-kb", type=int, default=64, help="Read size used by the HTTP stack")
+    args = parser.parse_args()
+    
+    work_dir = tempfile.mkdtemp(prefix="bench_upload_mem_")
+    try:
+        path = os.path.join(work_dir, "video.mp4")
+        with open(path, "wb") as f:
+            for _ in range(int(args.file_mb)):
+                f.write(os.urandom(1024 * 1024))
+        
+        def files_body():
+            with open(path, "rb") as video_file:
+                requests.Request("POST", "http://localhost/tasks", data={"index_id": "bench-index"},
+                                 files={"video_file": ("video.mp4", video_file, "video/mp4")}).prepare()
+        
+        callbacks = []
+        
+        def streamed_body():
+            with MultipartFileBody({"index_id": "bench-index"}, "video_file", path, "video.mp4", "video/mp4",
+                                   progress_callback=lambda sent, total: callbacks.append(sent)) as body:
+                while body.read(args.block_kb * 1024):
+                    pass
+        
+        print(f"{'body':<20} {'peak MB':>8} {'seconds':>8}")
+        for label, fn in (("requests files=", files_body), ("MultipartFileBody", streamed_body)):
+            peak, elapsed = peak_mb(fn)
+            print(f"{label:<20} {peak:>8.1f} {elapsed:>8.2f}")
+        print(f"progress callbacks: {len(callbacks)} (last at {callbacks[-1] / 1e6:.1f} MB)")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
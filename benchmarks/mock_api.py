@@ -0,0 +1,321 @@
+"""
+Local stand-in for the Twelve Labs /indexes and /tasks endpoints
+
+    with MockTwelveLabsServer(bandwidth_per_connection=20e6) as server:
+        client = TwelveLabsClient("test-key", base_url=server.base_url)
+
+Uploads are read in full (optionally throttled per connection to emulate a
+single-stream uplink), keeping only their first 64 KB so the server's memory
+doesn't skew client measurements. Tasks become "ready" after ready_after_polls
+polls, by GET /tasks/{id} or by a GET /tasks listing that includes them.
+Tasks created from a video_url are downloaded in the background first (the
+bytes count towards bytes_fetched) and fail if the download does.
+rate_limit (requests/second) makes the server answer 429 with Retry-After when
+exceeded, and inject_errors() queues error responses for the next requests.
+"""
+import json
+import re
+import threading
+import time
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+    
+    def _send_json(self, status: int, payload, headers: Optional[Dict] = None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _read_body(self, keep: int = None) -> Tuple[bytes, int]:
+        """
+        Read the request body (Content-Length or chunked), throttled to
+        bandwidth_per_connection bytes/s; returns (first `keep` bytes, length),
+        with None instead of the bytes if the client stopped sending mid-body
+        """
+        bandwidth = self.server.bandwidth_per_connection
+        chunks = []
+        started = time.perf_counter()
+        received = 0
+        
+        def read(remaining):
+            nonlocal received
+            while remaining > 0:
+                data = self.rfile.read(min(remaining, 256 * 1024))
+                if not data:
+                    return False
+                if keep is None or received < keep:
+                    chunks.append(data)
+                received += len(data)
+                remaining -= len(data)
+                if bandwidth:
+                    ahead = received / bandwidth - (time.perf_counter() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+            return True
+        
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            complete = False
+            while True:
+                line = self.rfile.readline()
+                if not line.strip():
+                    break
+                size = int(line.split(b";")[0].strip(), 16)
+                if size == 0:
+                    # Trailer section ends with an empty line
+                    while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    complete = True
+                    break
+                if not read(size):
+                    break
+                self.rfile.readline()
+        else:
+            complete = read(int(self.headers.get("Content-Length", 0)))
+        
+        if not complete:
+            self.close_connection = True
+            return None, received
+        body = b"".join(chunks)
+        return (body if keep is None else body[:keep]), received
+    
+    def _rejected(self) -> bool:
+        """Answer with an injected error or a 429 if the request quota is used up"""
+        server = self.server
+        with server.lock:
+            error = server.injected_errors.pop(0) if server.injected_errors else None
+            if error is None and server.rate_limit:
+                now = time.monotonic()
+                server.quota_tokens = min(server.rate_limit, server.quota_tokens + (now - server.quota_updated) * server.rate_limit)
+                server.quota_updated = now
+                if server.quota_tokens < 1:
+                    error = (429, "1")
+                else:
+                    server.quota_tokens -= 1
+            if error is not None:
+                server.rejected += 1
+        
+        if error is None:
+            return False
+        status, retry_after = error
+        self._send_json(status, {"code": "injected_error" if status != 429 else "too_many_requests",
+                                 "message": "Simulated error"},
+                        {"Retry-After": retry_after} if retry_after else None)
+        return True
+    
+    def _authorized(self) -> bool:
+        if self.headers.get("x-api-key") != self.server.api_key:
+            self._send_json(401, {"code": "api_key_invalid", "message": "Invalid API key"})
+            return False
+        return True
+    
+    def do_POST(self):
+        body, length = self._read_body(keep=None if self.path == "/indexes" else 64 * 1024)
+        if body is None:
+            return
+        if not self._authorized() or self._rejected():
+            return
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        
+        if self.path == "/indexes":
+            payload = json.loads(body or b"{}")
+            index_id = uuid.uuid4().hex[:24]
+            with server.lock:
+                server.indexes[index_id] = {"_id": index_id, "index_name": payload.get("index_name"),
+                                            "models": payload.get("models", [])}
+            self._send_json(201, {"_id": index_id})
+        
+        elif self.path == "/tasks":
+            task_id = uuid.uuid4().hex[:24]
+            index_id = re.search(rb'name="index_id"\r\n\r\n([^\r]*)\r\n', body)
+            video_url = re.search(rb'name="video_url"\r\n\r\n([^\r]*)\r\n', body)
+            with server.lock:
+                server.tasks[task_id] = {"_id": task_id, "video_id": uuid.uuid4().hex[:24],
+                                         "index_id": index_id.group(1).decode() if index_id else None,
+                                         "status": "pending", "polls": 0, "bytes": length,
+                                         "fetching": bool(video_url)}
+                server.bytes_received += length
+                task = server.tasks[task_id]
+            if video_url:
+                threading.Thread(target=server.fetch, args=(task_id, video_url.group(1).decode()),
+                                 daemon=True).start()
+            self._send_json(201, {"_id": task["_id"], "video_id": task["video_id"]})
+        
+        else:
+            self._send_json(404, {"code": "not_found", "message": self.path})
+    
+    def _advance(self, task: Dict):
+        """Move a task towards ready each time it is polled (caller holds the lock)"""
+        if task["fetching"] or task["status"] == "failed":
+            return
+        task["polls"] += 1
+        if task["polls"] >= self.server.ready_after_polls:
+            task["status"] = "ready"
+        elif task["polls"] > 1:
+            task["status"] = "indexing"
+    
+    def do_GET(self):
+        if not self._authorized() or self._rejected():
+            return
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        
+        match = re.fullmatch(r"/indexes/([^/?]+)", self.path)
+        url = urlsplit(self.path)
+        if url.path == "/indexes":
+            query = parse_qs(url.query)
+            page = int(query.get("page", ["1"])[0])
+            page_limit = int(query.get("page_limit", ["10"])[0])
+            with server.lock:
+                indexes = list(server.indexes.values())
+            data = indexes[(page - 1) * page_limit:page * page_limit]
+            total_pages = max(1, -(-len(indexes) // page_limit))
+            self._send_json(200, {"data": data, "page_info": {"page": page, "total_page": total_pages,
+                                                              "total_results": len(indexes)}})
+        
+        elif match:
+            with server.lock:
+                index = server.indexes.get(match.group(1))
+            if index:
+                self._send_json(200, index)
+            else:
+                self._send_json(404, {"code": "index_not_exists", "message": match.group(1)})
+        
+        elif url.path == "/tasks":
+            # Newest first, filtered by index_id; every listed task counts as polled
+            query = parse_qs(url.query)
+            index_id = query.get("index_id", [None])[0]
+            page = int(query.get("page", ["1"])[0])
+            page_limit = int(query.get("page_limit", ["10"])[0])
+            with server.lock:
+                tasks = [t for t in reversed(list(server.tasks.values())) if index_id in (None, t["index_id"])]
+                data = tasks[(page - 1) * page_limit:page * page_limit]
+                for task in data:
+                    self._advance(task)
+                data = [dict(task) for task in data]
+            total_pages = max(1, -(-len(tasks) // page_limit))
+            self._send_json(200, {"data": data, "page_info": {"page": page, "total_page": total_pages,
+                                                              "total_results": len(tasks)}})
+        
+        elif re.fullmatch(r"/tasks/[^/?]+", self.path):
+            task_id = self.path.rsplit("/", 1)[1]
+            with server.lock:
+                task = server.tasks.get(task_id)
+                if task:
+                    self._advance(task)
+                    task = dict(task)
+            if task:
+                self._send_json(200, task)
+            else:
+                self._send_json(404, {"code": "task_not_exists", "message": task_id})
+        
+        else:
+            self._send_json(404, {"code": "not_found", "message": self.path})
+
+
+class MockTwelveLabsServer(ThreadingHTTPServer):
+    daemon_threads = True
+    
+    def __init__(self, api_key: str = "test-key", host: str = "127.0.0.1", port: int = 0,
+                 bandwidth_per_connection: float = None, latency: float = 0.0, ready_after_polls: int = 3,
+                 rate_limit: float = None):
+        super().__init__((host, port), _Handler)
+        self.api_key = api_key
+        self.bandwidth_per_connection = bandwidth_per_connection
+        self.latency = latency
+        self.ready_after_polls = ready_after_polls
+        self.rate_limit = rate_limit
+        self.quota_tokens = rate_limit or 0
+        self.quota_updated = time.monotonic()
+        self.injected_errors = []
+        self.rejected = 0
+        self.lock = threading.Lock()
+        self.indexes = {}
+        self.tasks = {}
+        self.connections = 0
+        self.bytes_received = 0
+        self.bytes_fetched = 0
+        self._thread = None
+    
+    def inject_errors(self, status: int, count: int = 1, retry_after: str = None):
+        """Answer the next `count` requests with `status`"""
+        with self.lock:
+            self.injected_errors.extend([(status, retry_after)] * count)
+    
+    def fetch(self, task_id: str, video_url: str):
+        """Download a video_url task's video (discarding it) like the real service does"""
+        fetched = 0
+        error = None
+        try:
+            with urllib.request.urlopen(video_url, timeout=30) as response:
+                while True:
+                    data = response.read(256 * 1024)
+                    if not data:
+                        break
+                    fetched += len(data)
+        except Exception as e:
+            error = str(e)
+        
+        with self.lock:
+            task = self.tasks[task_id]
+            task["fetching"] = False
+            task["bytes"] = fetched
+            self.bytes_fetched += fetched
+            if error:
+                task["status"] = "failed"
+                task["error"] = f"Could not download {video_url}: {error}"
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Run the mock Twelve Labs API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--api-key", default="test-key")
+    parser.add_argument("--bandwidth", type=float, help="Per-connection upload limit in bytes/s")
+    args = parser.parse_args()
+    
+    server = MockTwelveLabsServer(args.api_key, port=args.port, bandwidth_per_connection=args.bandwidth)
+    print(f"Serving mock API on {server.base_url}")
+    server.serve_forever()
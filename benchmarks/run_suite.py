@@ -0,0 +1,282 @@
+"""
+Reproducible benchmark suite for the chunking and upload paths, with regression thresholds
+
+Usage: python benchmarks/run_suite.py [--duration 60] [--bitrate 4M] [--chunk-seconds 20]
+                                      [--bandwidth-mb 0] [--scenarios ...] [--json results.json]
+
+A synthetic video (ffmpeg lavfi test pattern, configurable length and bitrate)
+is generated once, then every scenario runs in its own Python process against
+the local mock API, so peak RSS is per scenario. Reported per scenario:
+
+    encode_fps            source frames chunked per second (chunking scenarios)
+    upload_mb_s           MB sent per second of upload time (upload scenarios)
+    peak_rss_mb           peak resident memory of the Python process or any ffmpeg child
+    disk_high_water_mb    most bytes held in the chunk directory at once
+    disk_written_mb       chunk bytes written to disk in total
+    latency_seconds       wall time of the scenario (end_to_end: file in -> all tasks ready)
+
+Results are checked against thresholds.json next to this script (min/max per
+metric, sized for the default workload on a modest machine); the exit status
+is 1 if any threshold is violated. --thresholds "" skips the check.
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+SCENARIOS = ("chunk_stream_copy", "chunk_reencode", "upload", "end_to_end", "end_to_end_direct")
+DEFAULT_THRESHOLDS = os.path.join(BENCH_DIR, "thresholds.json")
+METRIC_COLUMNS = ("encode_fps", "upload_mb_s", "peak_rss_mb", "disk_high_water_mb", "disk_written_mb",
+                  "latency_seconds")
+
+
+class DiskHighWater:
+    """Samples the size of a directory's files from a background thread: largest total, and bytes written"""
+    
+    def __init__(self, directory: str, interval: float = 0.05):
+        self.directory = directory
+        self.interval = interval
+        self.high_water = 0
+        self._file_sizes = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+    
+    def sample(self):
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    continue
+                total += size
+                self._file_sizes[path] = max(self._file_sizes.get(path, 0), size)
+        self.high_water = max(self.high_water, total)
+    
+    @property
+    def written(self) -> int:
+        """Largest size seen per file, summed (chunks are written once)"""
+        return sum(self._file_sizes.values())
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+    
+    def __enter__(self):
+        self._thread.start()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+
+def peak_rss_mb() -> float:
+    """Peak RSS of this process or its largest reaped child (Linux reports KB)"""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024
+
+
+def run_chunking(source: str, args, stream_copy: bool) -> dict:
+    from video_chunker import VideoChunker
+    
+    chunker = VideoChunker(chunk_duration_hours=args.chunk_seconds / 3600, stream_copy=stream_copy)
+    output_dir = tempfile.mkdtemp(prefix="suite_chunks_")
+    try:
+        with DiskHighWater(output_dir) as disk:
+            started = time.perf_counter()
+            chunk_paths = chunker.chunk_video(source, output_dir)
+            elapsed = time.perf_counter() - started
+        return {
+            "chunks": len(chunk_paths),
+            "encode_fps": args.duration * args.fps / elapsed,
+            "disk_high_water_mb": disk.high_water / 1e6,
+            "disk_written_mb": disk.written / 1e6,
+            "latency_seconds": elapsed
+        }
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def run_upload(source: str, args) -> dict:
+    from mock_api import MockTwelveLabsServer
+    from twelve_labs_client import TwelveLabsClient
+    
+    with MockTwelveLabsServer(bandwidth_per_connection=args.bandwidth_mb * 1e6 or None) as server:
+        with TwelveLabsClient(server.api_key, base_url=server.base_url) as client:
+            started = time.perf_counter()
+            client.upload_video("bench-index", source)
+            elapsed = time.perf_counter() - started
+        sent = server.bytes_received
+    return {"upload_mb_s": sent / 1e6 / elapsed, "latency_seconds": elapsed}
+
+
+def run_end_to_end(source: str, args, direct_stream: bool = False) -> dict:
+    from mock_api import MockTwelveLabsServer
+    from task_poller import TaskPoller
+    from twelve_labs_client import TwelveLabsClient
+    from upload_pipeline import upload_chunks_pipelined
+    from video_chunker import VideoChunker
+    
+    chunker = VideoChunker(chunk_duration_hours=args.chunk_seconds / 3600)
+    output_dir = tempfile.mkdtemp(prefix="suite_e2e_")
+    upload_seconds = 0.0
+    try:
+        with MockTwelveLabsServer(bandwidth_per_connection=args.bandwidth_mb * 1e6 or None,
+                                  ready_after_polls=args.ready_after_polls) as server:
+            with TwelveLabsClient(server.api_key, base_url=server.base_url) as client, \
+                    TaskPoller(client, min_interval=0.2) as poller, \
+                    DiskHighWater(output_dir) as disk:
+                started = time.perf_counter()
+                results = upload_chunks_pipelined(client, chunker, source, "bench-index",
+                                                  output_dir=output_dir, direct_stream=direct_stream)
+                upload_seconds = time.perf_counter() - started
+                task_ids = [result["_id"] for result in results]
+                for task_id in task_ids:
+                    poller.track(task_id, index_id="bench-index")
+                records = poller.wait(task_ids, timeout=300)
+                elapsed = time.perf_counter() - started
+            sent = server.bytes_received
+        
+        if any(record["status"] != "ready" for record in records.values()):
+            raise Exception("Not every task became ready")
+        return {
+            "chunks": len(task_ids),
+            "upload_mb_s": sent / 1e6 / upload_seconds,
+            "disk_high_water_mb": disk.high_water / 1e6,
+            "disk_written_mb": disk.written / 1e6,
+            "latency_seconds": elapsed
+        }
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def run_scenario(name: str, source: str, args) -> dict:
+    """Run one scenario in this process and return its metrics"""
+    if name == "chunk_stream_copy":
+        result = run_chunking(source, args, stream_copy=True)
+    elif name == "chunk_reencode":
+        result = run_chunking(source, args, stream_copy=False)
+    elif name == "upload":
+        result = run_upload(source, args)
+    elif name == "end_to_end":
+        result = run_end_to_end(source, args)
+    elif name == "end_to_end_direct":
+        result = run_end_to_end(source, args, direct_stream=True)
+    else:
+        raise ValueError(f"Unknown scenario: {name}")
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_isolated(name: str, source: str, argv: list) -> dict:
+    """Run one scenario in a fresh interpreter so peak RSS isn't shared between scenarios"""
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", name, "--source", source] + argv,
+        capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def check_thresholds(results: dict, thresholds: dict) -> list:
+    """Violations as (scenario, metric, value, bound description)"""
+    violations = []
+    for scenario, limits in thresholds.items():
+        result = results.get(scenario)
+        if result is None:
+            continue
+        if "error" in result:
+            violations.append((scenario, "error", result["error"], "scenario failed"))
+            continue
+        for metric, bounds in limits.items():
+            value = result.get(metric)
+            if value is None:
+                continue
+            if "min" in bounds and value < bounds["min"]:
+                violations.append((scenario, metric, value, f">= {bounds['min']}"))
+            if "max" in bounds and value > bounds["max"]:
+                violations.append((scenario, metric, value, f"<= {bounds['max']}"))
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunking and upload benchmark suite")
+    parser.add_argument("--duration", type=float, default=60, help="Synthetic video length in seconds")
+    parser.add_argument("--bitrate", default="4M", help="Synthetic video bitrate, e.g. 4M")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=int, default=25)
+    parser.add_argument("--chunk-seconds", type=float, default=20)
+    parser.add_argument("--bandwidth-mb", type=float, default=0, help="Mock per-connection cap in MB/s (0 = none)")
+    parser.add_argument("--ready-after-polls", type=int, default=2)
+    parser.add_argument("--scenarios", nargs="*", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS, help='Thresholds JSON ("" to skip checks)')
+    parser.add_argument("--json", help="Also write the results here")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--source", help=argparse.SUPPRESS)
+    args, _ = parser.parse_known_args()
+    
+    if args.worker:
+        print(json.dumps(run_scenario(args.worker, args.source, args)))
+        return 0
+    
+    from synthetic_media import generate_video
+    
+    # Scenario settings passed through to the workers
+    worker_argv = ["--duration", str(args.duration), "--fps", str(args.fps),
+                   "--chunk-seconds", str(args.chunk_seconds), "--bandwidth-mb", str(args.bandwidth_mb),
+                   "--ready-after-polls", str(args.ready_after_polls)]
+    
+    work_dir = tempfile.mkdtemp(prefix="bench_suite_")
+    try:
+        source = os.path.join(work_dir, "synthetic.mp4")
+        generate_video(source, args.duration, args.width, args.height, args.fps, args.bitrate,
+                       keyframe_interval=2 * args.fps)
+        print(f"source: {args.duration:g}s {args.width}x{args.height}@{args.fps} {args.bitrate}, "
+              f"{os.path.getsize(source) / 1e6:.1f} MB")
+        
+        results = {}
+        print(f"{'scenario':<18}" + "".join(f"{column:>20}" for column in METRIC_COLUMNS))
+        for name in args.scenarios:
+            result = results[name] = run_isolated(name, source, worker_argv)
+            if "error" in result:
+                print(f"{name:<18} failed: {result['error']}")
+                continue
+            cells = [f"{result[column]:>20.1f}" if column in result else f"{'-':>20}" for column in METRIC_COLUMNS]
+            print(f"{name:<18}" + "".join(cells))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"parameters": vars(args), "results": results}, f, indent=2)
+    
+    if not args.thresholds:
+        return 0
+    with open(args.thresholds) as f:
+        thresholds = json.load(f)
+    violations = check_thresholds(results, thresholds)
+    for scenario, metric, value, bound in violations:
+        shown = f"{value:.1f}" if isinstance(value, float) else value
+        print(f"REGRESSION {scenario}.{metric} = {shown} (expected {bound})")
+    print("thresholds: " + ("failed" if violations else "passed"))
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
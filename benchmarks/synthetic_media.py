@@ -0,0 +1,42 @@
+"""Generate synthetic test videos locally with ffmpeg's lavfi sources"""
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from video_probe import ffmpeg_binary
+
+
+def generate_video(output_path: str, duration_seconds: float, width: int = 640, height: int = 360,
+                   fps: int = 25, video_bitrate: str = "1M", keyframe_interval: int = 50) -> str:
+    """Render a test pattern with a sine tone to output_path (H.264/AAC mp4)"""
+    command = [
+        ffmpeg_binary(),
+        "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={fps}:duration={duration_seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=44100:duration={duration_seconds}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-b:v", video_bitrate, "-g", str(keyframe_interval),
+        "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "128k",
+        "-shortest",
+        output_path
+    ]
+    subprocess.run(command, check=True)
+    return output_path
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description=generate_video.__doc__)
+    parser.add_argument("output_path")
+    parser.add_argument("--duration", type=float, default=60.0, help="Length in seconds")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=360)
+    parser.add_argument("--fps", type=int, default=25)
+    parser.add_argument("--bitrate", default="1M", help="Video bitrate, e.g. 1M or 800k")
+    args = parser.parse_args()
+    
+    generate_video(args.output_path, args.duration, args.width, args.height, args.fps, args.bitrate)
+    print(args.output_path)
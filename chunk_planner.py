@@ -0,0 +1,85 @@
+import math
+from bisect import bisect_left
+from typing import Callable, List, Optional, Sequence, Tuple
+
+# Upper bound on re-planning rounds when keyframe snapping overfills a chunk
+MAX_REPLANS = 16
+
+def plan_chunks(duration: float, size: int, max_chunk_seconds: Optional[float] = None,
+                max_chunk_bytes: Optional[int] = None, parallelism: Optional[int] = None,
+                keyframes: Optional[Sequence[float]] = None,
+                snap: Optional[Callable[[float], float]] = None) -> List[Tuple[float, float]]:
+    """
+    Plan (start, end) cut points in seconds for a video of `duration` and `size` bytes
+    
+    The chunk count is the smallest that keeps every chunk under max_chunk_seconds
+    and max_chunk_bytes (bytes estimated from the average bitrate), rounded up to a
+    multiple of parallelism so the last upload wave is full. Chunks are equal in
+    length, so there is never a tiny or empty trailing chunk. With keyframes, each
+    cut is moved to the nearest keyframe, and chunks are added until the snapped
+    plan still respects the limits; snap does the same for keyframes that are
+    looked up per cut (it returns where a cut near the given time can be made).
+    A single segment means no chunking is needed; parallelism alone never splits a
+    video that is within the limits.
+    """
+    if duration <= 0:
+        return [(0.0, duration)]
+    
+    count = 1
+    if max_chunk_seconds:
+        count = max(count, math.ceil(duration / max_chunk_seconds))
+    if max_chunk_bytes and size:
+        count = max(count, math.ceil(size / max_chunk_bytes))
+    if count == 1:
+        return [(0.0, duration)]
+    
+    step = parallelism if parallelism and parallelism > 1 else 1
+    count = math.ceil(count / step) * step
+    
+    keyframes = sorted(k for k in (keyframes or ()) if 0 < k < duration)
+    if snap is None and keyframes:
+        snap = lambda cut: _nearest(keyframes, cut)
+    
+    segments = _balanced_segments(duration, count, snap)
+    for _ in range(MAX_REPLANS):
+        if all(_fits(start, end, duration, size, max_chunk_seconds, max_chunk_bytes) for start, end in segments):
+            break
+        count += step
+        segments = _balanced_segments(duration, count, snap)
+    
+    return segments
+
+def estimate_chunk_bytes(start: float, end: float, duration: float, size: int) -> int:
+    """Bytes in [start, end) assuming a constant bitrate"""
+    if duration <= 0:
+        return size
+    return int(size * (end - start) / duration)
+
+def _fits(start: float, end: float, duration: float, size: int,
+          max_chunk_seconds: Optional[float], max_chunk_bytes: Optional[int]) -> bool:
+    if max_chunk_seconds and end - start > max_chunk_seconds:
+        return False
+    if max_chunk_bytes and size and estimate_chunk_bytes(start, end, duration, size) > max_chunk_bytes:
+        return False
+    return True
+
+def _balanced_segments(duration: float, count: int,
+                       snap: Optional[Callable[[float], float]]) -> List[Tuple[float, float]]:
+    """Split [0, duration] into `count` equal parts, snapping inner cuts to keyframes"""
+    cuts = [0.0]
+    for i in range(1, count):
+        cut = duration * i / count
+        if snap:
+            cut = snap(cut)
+        # Snapping can collapse neighbouring cuts when keyframes are sparse
+        if cuts[-1] < cut < duration:
+            cuts.append(cut)
+    cuts.append(duration)
+    
+    return list(zip(cuts[:-1], cuts[1:]))
+
+def _nearest(values: Sequence[float], target: float) -> float:
+    """Value in sorted `values` closest to target"""
+    i = bisect_left(values, target)
+    candidates = values[max(0, i - 1):i + 1]
+    return min(candidates, key=lambda v: abs(v - target))
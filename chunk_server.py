@@ -0,0 +1,137 @@
+import os
+import secrets
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import quote, unquote, urlsplit
+
+class _ChunkHandler(BaseHTTPRequestHandler):
+    """Serves published files by token; everything else is a 404 (no directory listings)"""
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def _published(self) -> Optional[Dict]:
+        # A reverse proxy may add a path prefix; the token and file name are always last
+        parts = unquote(urlsplit(self.path).path).strip("/").split("/")
+        if len(parts) < 2:
+            return None
+        with self.server.lock:
+            entry = self.server.published.get(parts[-2])
+        if entry is None or os.path.basename(entry["path"]) != parts[-1]:
+            return None
+        return dict(entry, token=parts[-2])
+    
+    def _send_head(self):
+        entry = self._published()
+        if entry is None:
+            self.send_error(404)
+            return None, None
+        try:
+            f = open(entry["path"], "rb")
+        except OSError:
+            self.send_error(404)
+            return None, None
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+        self.end_headers()
+        return entry["token"], f
+    
+    def do_HEAD(self):
+        _, f = self._send_head()
+        if f:
+            f.close()
+    
+    def do_GET(self):
+        token, f = self._send_head()
+        if f is None:
+            return
+        try:
+            shutil.copyfileobj(f, self.wfile, 1024 * 1024)
+        except OSError:
+            # Fetcher went away mid-transfer; it isn't fetched yet
+            return
+        finally:
+            f.close()
+        self.server.mark_fetched(token)
+
+class ChunkServer(ThreadingHTTPServer):
+    """
+    Local HTTP server that lets the API fetch chunks by URL instead of receiving them in the request
+    
+    Only files passed to publish() are served, each under an unguessable token
+    (/<token>/<file name>), until unpublish(). public_url is the address the
+    API reaches this server at (e.g. behind a reverse proxy); by default the
+    bound host and port. wait_fetched() tells when a file has been downloaded
+    in full, so its chunk can be deleted.
+    """
+    daemon_threads = True
+    
+    def __init__(self, host: str = "0.0.0.0", port: int = 0, public_url: str = None):
+        super().__init__((host, port), _ChunkHandler)
+        self.public_url = public_url.rstrip("/") if public_url else None
+        self.lock = threading.Condition()
+        self.published: Dict[str, Dict] = {}
+        self._thread = None
+    
+    @property
+    def base_url(self) -> str:
+        if self.public_url:
+            return self.public_url
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+    
+    def publish(self, file_path: str) -> str:
+        """Serve file_path and return its URL"""
+        if not os.path.isfile(file_path):
+            raise Exception(f"Failed to publish chunk: {file_path} does not exist")
+        token = secrets.token_urlsafe(24)
+        with self.lock:
+            self.published[token] = {"path": os.path.abspath(file_path), "fetches": 0}
+        return f"{self.base_url}/{token}/{quote(os.path.basename(file_path))}"
+    
+    def unpublish(self, url: str):
+        """Stop serving the file behind url (the file itself is left alone)"""
+        with self.lock:
+            self.published.pop(self._token(url), None)
+    
+    def fetches(self, url: str) -> int:
+        """Complete downloads of the file behind url so far"""
+        with self.lock:
+            entry = self.published.get(self._token(url))
+            return entry["fetches"] if entry else 0
+    
+    def wait_fetched(self, url: str, timeout: Optional[float] = None) -> bool:
+        """Block until the file behind url has been downloaded in full once; False on timeout"""
+        token = self._token(url)
+        with self.lock:
+            return self.lock.wait_for(
+                lambda: token not in self.published or self.published[token]["fetches"] > 0, timeout
+            ) and token in self.published
+    
+    def mark_fetched(self, token: str):
+        with self.lock:
+            if token in self.published:
+                self.published[token]["fetches"] += 1
+            self.lock.notify_all()
+    
+    @staticmethod
+    def _token(url: str) -> str:
+        return urlsplit(url).path.strip("/").split("/")[-2]
@@ -0,0 +1,146 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, List, Optional
+
+from upload_journal import DEFAULT_STATE_DIR
+
+class DedupCache:
+    """
+    Local map from content hash + index ID to the upload result the API returned
+    
+    Entries are written for whole sources (the list of chunk results) and for
+    every uploaded file or chunk (one task), so identical content is never sent to
+    the same index twice. At most max_entries are kept; the least recently used
+    are evicted first. Entries older than validate_after seconds are re-checked
+    with get_task_status before they are trusted, and dropped if the task failed
+    or no longer exists.
+    """
+    
+    def __init__(self, db_path: str = None, max_entries: int = 10000, validate_after: float = 24 * 3600):
+        if db_path is None:
+            db_path = os.path.join(DEFAULT_STATE_DIR, "dedup.sqlite3")
+        
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.validate_after = validate_after
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    content_hash TEXT NOT NULL,
+                    index_id TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    size INTEGER,
+                    created_at REAL NOT NULL,
+                    validated_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL,
+                    PRIMARY KEY (content_hash, index_id)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used_at)")
+    
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+    
+    def lookup(self, content_hash: str, index_id: str, client=None) -> Optional[Any]:
+        """
+        Cached upload result for this content in this index, or None
+        
+        With a client, an entry due for validation is checked against the API
+        first and treated as a miss if its tasks failed, are gone or can't be
+        checked right now.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM entries WHERE content_hash = ? AND index_id = ?", (content_hash, index_id)
+            ).fetchone()
+        if row is None:
+            return None
+        
+        result = json.loads(row["result"])
+        now = time.time()
+        if client is not None and now - row["validated_at"] >= self.validate_after:
+            if not self.validate(client, content_hash, index_id, result):
+                return None
+        
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE entries SET last_used_at = ? WHERE content_hash = ? AND index_id = ?",
+                (now, content_hash, index_id)
+            )
+        return result
+    
+    def store(self, content_hash: str, index_id: str, result: Any, size: int = None):
+        """Remember an upload result (a task dict or a list of them), evicting old entries if full"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (content_hash, index_id, json.dumps(result), size, now, now, now)
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute("""
+                    DELETE FROM entries WHERE rowid IN (
+                        SELECT rowid FROM entries ORDER BY last_used_at LIMIT ?
+                    )
+                """, (count - self.max_entries,))
+    
+    def invalidate(self, content_hash: str, index_id: str):
+        """Forget an entry"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM entries WHERE content_hash = ? AND index_id = ?", (content_hash, index_id)
+            )
+    
+    def validate(self, client, content_hash: str, index_id: str, result: Any = None) -> bool:
+        """
+        Check an entry's tasks with get_task_status; drops the entry if one is gone (404) or failed
+        
+        Other errors (outage, rate limit, timeout) say nothing about the tasks, so
+        they count as a miss but keep the entry for the next check.
+        """
+        if result is None:
+            result = self.lookup(content_hash, index_id)
+            if result is None:
+                return False
+        
+        task_ids = task_ids_of(result)
+        try:
+            valid = bool(task_ids) and all(
+                client.get_task_status(task_id).get("status") != "failed" for task_id in task_ids
+            )
+        except Exception as e:
+            # Clients raise "Failed to get task status: <status> - <body>"
+            if ": 404 - " not in str(e):
+                return False
+            valid = False
+        
+        if not valid:
+            self.invalidate(content_hash, index_id)
+            return False
+        
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE entries SET validated_at = ? WHERE content_hash = ? AND index_id = ?",
+                (time.time(), content_hash, index_id)
+            )
+        return True
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+def task_ids_of(result: Any) -> List[str]:
+    """Task IDs in an upload result or list of results"""
+    results = result if isinstance(result, list) else [result]
+    return [r.get("_id") or r.get("id") for r in results if isinstance(r, dict) and (r.get("_id") or r.get("id"))]
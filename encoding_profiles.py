@@ -0,0 +1,75 @@
+from typing import Dict, List, Optional, Union
+
+class EncodingProfile:
+    """
+    x264/AAC settings for chunks that are re-encoded
+    
+    preset and crf trade encode speed against size; max_height downscales
+    taller video (aspect ratio kept), which cuts both encode time and upload
+    bytes; audio is "copy" (passed through when the source codec fits MP4,
+    else transcoded) or "aac". threads is ffmpeg threads per
+    chunk (None: the chunker's default). With stream_copy False, sources are
+    re-encoded even when they could be cut without it, so the profile's
+    resolution and quality always apply.
+    """
+    
+    def __init__(self, name: str, preset: str, crf: int, max_height: Optional[int] = None, audio: str = "aac",
+                 audio_bitrate: str = "128k", threads: Optional[int] = None, stream_copy: bool = True,
+                 description: str = ""):
+        if audio not in ("copy", "aac"):
+            raise ValueError(f"audio must be 'copy' or 'aac', not {audio!r}")
+        self.name = name
+        self.preset = preset
+        self.crf = crf
+        self.max_height = max_height
+        self.audio = audio
+        self.audio_bitrate = audio_bitrate
+        self.threads = threads
+        self.stream_copy = stream_copy
+        self.description = description
+    
+    def ffmpeg_args(self, threads: int, copy_audio: bool) -> List[str]:
+        """Output options for one chunk; copy_audio says whether the source audio can be passed through"""
+        args = ["-c:v", "libx264", "-preset", self.preset, "-crf", str(self.crf), "-pix_fmt", "yuv420p",
+                "-threads", str(threads)]
+        if self.max_height:
+            # Never upscale; keep both sides even for yuv420p
+            args += ["-vf", f"scale=-2:'trunc(min(ih,{self.max_height})/2)*2'"]
+        if self.audio == "copy" and copy_audio:
+            args += ["-c:a", "copy"]
+        else:
+            args += ["-c:a", "aac", "-b:a", self.audio_bitrate]
+        return args
+    
+    def as_dict(self) -> Dict:
+        return {"name": self.name, "preset": self.preset, "crf": self.crf, "max_height": self.max_height,
+                "audio": self.audio, "audio_bitrate": self.audio_bitrate, "threads": self.threads,
+                "stream_copy": self.stream_copy}
+
+ENCODING_PROFILES = {
+    "throughput": EncodingProfile(
+        "throughput", preset="veryfast", crf=23, max_height=720, audio="copy", threads=2,
+        description="Fastest turnaround: stream copy when possible, otherwise a quick 720p encode "
+                    "with the audio passed through"
+    ),
+    "balanced": EncodingProfile(
+        "balanced", preset="fast", crf=23,
+        description="Stream copy when possible, otherwise full resolution at the default x264 quality"
+    ),
+    "size": EncodingProfile(
+        "size", preset="slow", crf=28, max_height=720, audio="aac", audio_bitrate="96k", stream_copy=False,
+        description="Smallest uploads: always re-encoded to 720p with a slower preset (archival backlogs, "
+                    "slow uplinks)"
+    ),
+}
+
+DEFAULT_PROFILE = "balanced"
+
+def get_profile(profile: Union[str, EncodingProfile, None]) -> EncodingProfile:
+    """Look up a profile by name (None for the default); EncodingProfile instances pass through"""
+    if isinstance(profile, EncodingProfile):
+        return profile
+    name = profile or DEFAULT_PROFILE
+    if name not in ENCODING_PROFILES:
+        raise ValueError(f"Unknown encoding profile {name!r} (choose from {', '.join(ENCODING_PROFILES)})")
+    return ENCODING_PROFILES[name]
@@ -0,0 +1,9 @@
+import hashlib
+
+def file_digest(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """Hash a file's contents in fixed-size blocks (BLAKE2b, hex digest)"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,308 @@
+"""
+Headless batch ingest: upload directories or manifests of videos to an index
+
+    python ingest_cli.py --index-id <id> /mnt/videos/2024-06 --report results.jsonl
+    python ingest_cli.py --index-id <id> --manifest nightly.txt --chunk-workers 2 --upload-concurrency 8 \
+        --files-in-flight 8
+
+Files are hashed and checked against the upload journal, so files already
+ingested into the index are skipped and interrupted files resume. One JSON line
+per file goes to the report (stdout by default), and a summary goes to stderr.
+The exit status is 1 if any file failed.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List
+
+from dotenv import load_dotenv
+
+from chunk_server import ChunkServer
+from dedup_cache import DedupCache
+from encoding_profiles import DEFAULT_PROFILE, ENCODING_PROFILES
+from file_hashing import file_digest
+from scratch_space import ScratchSpace
+from twelve_labs_client import TwelveLabsClient
+from upload_journal import UploadJournal
+from upload_pipeline import upload_chunks_pipelined
+from video_chunker import VideoChunker
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".wmv", ".flv", ".webm", ".m4v")
+
+class _UploadSlots:
+    """Client proxy that caps concurrent upload_video calls across all files"""
+    
+    def __init__(self, client: TwelveLabsClient, limit: int):
+        self._client = client
+        self._semaphore = threading.BoundedSemaphore(max(1, limit))
+    
+    def upload_video(self, *args, **kwargs) -> Dict:
+        with self._semaphore:
+            return self._client.upload_video(*args, **kwargs)
+    
+    def upload_stream(self, *args, **kwargs) -> Dict:
+        with self._semaphore:
+            return self._client.upload_stream(*args, **kwargs)
+    
+    def upload_video_url(self, *args, **kwargs) -> Dict:
+        with self._semaphore:
+            return self._client.upload_video_url(*args, **kwargs)
+    
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+class _ChunkSlots:
+    """Chunker proxy that caps how many files are producing a chunk at once"""
+    
+    def __init__(self, chunker: VideoChunker, limit: int):
+        self._chunker = chunker
+        self._semaphore = threading.BoundedSemaphore(max(1, limit))
+    
+    def iter_chunks(self, *args, **kwargs) -> Iterator[str]:
+        # Only producing a chunk holds a slot; uploading it doesn't
+        chunks = self._chunker.iter_chunks(*args, **kwargs)
+        try:
+            while True:
+                with self._semaphore:
+                    try:
+                        chunk_path = next(chunks)
+                    except StopIteration:
+                        return
+                yield chunk_path
+        finally:
+            chunks.close()
+    
+    def __getattr__(self, name):
+        return getattr(self._chunker, name)
+
+class _KeyedLocks:
+    """One lock per key, dropped once nobody holds or waits for it"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks = {}
+    
+    @contextmanager
+    def hold(self, key: str):
+        with self._lock:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+def iter_sources(paths: Iterable[str], manifest: str = None, recursive: bool = True,
+                 extensions=VIDEO_EXTENSIONS) -> Iterator[str]:
+    """Yield video files from paths (files or directories) and a manifest, lazily and without duplicates"""
+    seen = set()
+    
+    def candidates():
+        for path in paths:
+            if os.path.isdir(path):
+                for root, dirs, files in os.walk(path):
+                    dirs.sort()
+                    for name in sorted(files):
+                        if name.lower().endswith(extensions):
+                            yield os.path.join(root, name)
+                    if not recursive:
+                        break
+            else:
+                yield path
+        
+        if manifest:
+            # One path per line; blank lines and # comments are ignored
+            with open(manifest) as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        yield line
+    
+    for path in candidates():
+        path = os.path.abspath(path)
+        if path not in seen:
+            seen.add(path)
+            yield path
+
+def ingest_file(client, chunker: VideoChunker, journal: UploadJournal, file_path: str, index_id: str,
+                upload_concurrency: int, force: bool = False, source_locks: _KeyedLocks = None,
+                scratch: ScratchSpace = None, direct_stream: bool = False,
+                chunk_server: ChunkServer = None) -> Dict:
+    """Upload one file (resuming or skipping via the journal); returns its report record"""
+    started = time.perf_counter()
+    record = {"path": file_path, "index_id": index_id}
+    
+    try:
+        record["size"] = os.path.getsize(file_path)
+        source_hash = file_digest(file_path)
+        record["source_hash"] = source_hash
+        
+        # Copies of the same content share one journal job; the second copy waits and is skipped
+        with (source_locks or _KeyedLocks()).hold(source_hash):
+            if force:
+                # Otherwise the journal would replay the accepted chunks instead of uploading them
+                journal.reset_job(source_hash, index_id)
+            
+            job = journal.get_job(source_hash, index_id)
+            if job and job["status"] == "complete":
+                chunks = journal.get_chunks(source_hash, index_id)
+                record["status"] = "skipped"
+                record["task_ids"] = [chunk["task_id"] for chunk in chunks.values() if chunk["task_id"]]
+                return record
+            
+            results = upload_chunks_pipelined(client, chunker, file_path, index_id,
+                                              max_concurrent_uploads=upload_concurrency,
+                                              journal=journal, source_hash=source_hash, scratch=scratch,
+                                              direct_stream=direct_stream, chunk_server=chunk_server)
+        record["status"] = "uploaded"
+        record["chunks"] = len(results)
+        record["task_ids"] = [r.get("_id") or r.get("id") for r in results if isinstance(r, dict)]
+    
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = str(e)
+    
+    finally:
+        record["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    
+    return record
+
+def run_ingest(client: TwelveLabsClient, chunker: VideoChunker, journal: UploadJournal, sources: Iterable[str],
+               index_id: str, report, chunk_workers: int = 2, upload_concurrency: int = 4,
+               force: bool = False, scratch: ScratchSpace = None, direct_stream: bool = False,
+               chunk_server: ChunkServer = None, files_in_flight: int = None) -> Dict[str, int]:
+    """
+    Ingest every source file and write one JSON line per file to `report`
+    
+    At most files_in_flight files (default: the larger of chunk_workers and
+    upload_concurrency) are being hashed, chunked or uploaded at once. Of those,
+    at most chunk_workers are producing a chunk at the same time (encoding or
+    remuxing; uploads don't hold a chunk slot), and at most upload_concurrency
+    uploads run across all of them. Direct streams are remuxed while they are
+    uploaded, so only the upload limit applies to them.
+    
+    Sources are consumed lazily and finished records are written immediately, so
+    memory stays flat for any number of files; chunks on disk are bounded by the
+    pipeline's back-pressure, and with a scratch space a file only starts
+    chunking once its chunks fit the byte budget.
+    Returns counts per status.
+    """
+    slots = _UploadSlots(client, upload_concurrency)
+    chunk_slots = _ChunkSlots(chunker, chunk_workers)
+    files_in_flight = max(1, files_in_flight or max(chunk_workers, upload_concurrency))
+    source_locks = _KeyedLocks()
+    counts = {"uploaded": 0, "skipped": 0, "failed": 0}
+    sources = iter(sources)
+    
+    def write(record):
+        counts[record["status"]] += 1
+        report.write(json.dumps(record) + "\n")
+        report.flush()
+    
+    with ThreadPoolExecutor(max_workers=files_in_flight) as executor:
+        in_flight = set()
+        exhausted = False
+        while in_flight or not exhausted:
+            while not exhausted and len(in_flight) < files_in_flight:
+                try:
+                    file_path = next(sources)
+                except StopIteration:
+                    exhausted = True
+                    break
+                in_flight.add(executor.submit(ingest_file, slots, chunk_slots, journal, file_path, index_id,
+                                              upload_concurrency, force, source_locks, scratch, direct_stream,
+                                              chunk_server))
+            
+            if in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    write(future.result())
+    
+    return counts
+
+def main(argv: List[str] = None) -> int:
+    load_dotenv()
+    
+    parser = argparse.ArgumentParser(description="Upload directories or manifests of videos to a Twelve Labs index")
+    parser.add_argument("paths", nargs="*", help="Video files or directories")
+    parser.add_argument("--manifest", help="File with one video path per line")
+    parser.add_argument("--index-id", required=True)
+    parser.add_argument("--api-key", default=os.getenv("TWELVE_LABS_API_KEY"),
+                        help="Defaults to $TWELVE_LABS_API_KEY")
+    parser.add_argument("--base-url", default="https://api.twelvelabs.io/v1.3")
+    parser.add_argument("--no-recursive", action="store_true", help="Only scan the top level of directories")
+    parser.add_argument("--chunk-workers", type=int, default=2,
+                        help="Files producing a chunk (encoding or remuxing) at the same time")
+    parser.add_argument("--upload-concurrency", type=int, default=4, help="Uploads in flight across all files")
+    parser.add_argument("--files-in-flight", type=int,
+                        help="Files being hashed, chunked or uploaded at once (default: the larger of "
+                             "--chunk-workers and --upload-concurrency)")
+    parser.add_argument("--chunk-hours", type=float, default=1.0, help="Longest chunk in hours")
+    parser.add_argument("--max-chunk-bytes", type=int, default=2 * 1024 * 1024 * 1024, help="Largest chunk in bytes")
+    parser.add_argument("--encoding-profile", choices=list(ENCODING_PROFILES), default=DEFAULT_PROFILE,
+                        help="Re-encode settings for chunks that can't be stream-copied")
+    parser.add_argument("--rate-limit", type=float, help="Client-side requests/second")
+    parser.add_argument("--journal", help="Journal database (default ~/.twelvelabs_uploader/journal.sqlite3)")
+    parser.add_argument("--scratch-budget", type=int,
+                        help="Most chunk bytes on disk at once across all files (default: only keep 1 GB free)")
+    parser.add_argument("--direct", action="store_true",
+                        help="Stream chunks of stream-copyable files straight into the upload (no chunk files)")
+    parser.add_argument("--serve-chunks", metavar="PUBLIC_URL",
+                        help="Let the API download chunks from a local HTTP server reachable at PUBLIC_URL")
+    parser.add_argument("--serve-port", type=int, default=8600, help="Port of the --serve-chunks server")
+    parser.add_argument("--report", help="Write JSON Lines results here instead of stdout")
+    parser.add_argument("--force", action="store_true", help="Upload files even if already ingested")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Don't skip content (files or chunks) already uploaded to the index")
+    args = parser.parse_args(argv)
+    
+    if not args.api_key:
+        parser.error("an API key is required (--api-key or TWELVE_LABS_API_KEY)")
+    if not args.paths and not args.manifest:
+        parser.error("give at least one path or --manifest")
+    
+    chunker = VideoChunker(chunk_duration_hours=args.chunk_hours, max_chunk_bytes=args.max_chunk_bytes,
+                           parallelism=args.upload_concurrency, encoding_profile=args.encoding_profile)
+    journal = UploadJournal(args.journal)
+    dedup_cache = None if args.no_dedup or args.force else DedupCache(
+        os.path.join(os.path.dirname(os.path.abspath(journal.db_path)), "dedup.sqlite3")
+    )
+    scratch = ScratchSpace(budget_bytes=args.scratch_budget)
+    scratch.sweep(expire_dirs=[journal.chunk_root])
+    chunk_server = ChunkServer(port=args.serve_port, public_url=args.serve_chunks).start() if args.serve_chunks else None
+    report = open(args.report, "a") if args.report else sys.stdout
+    started = time.perf_counter()
+    
+    try:
+        with TwelveLabsClient(args.api_key, base_url=args.base_url, pool_size=max(10, args.upload_concurrency),
+                              rate_limit=args.rate_limit, dedup_cache=dedup_cache) as client:
+            sources = iter_sources(args.paths, args.manifest, recursive=not args.no_recursive)
+            counts = run_ingest(client, chunker, journal, sources, args.index_id, report,
+                                chunk_workers=args.chunk_workers, upload_concurrency=args.upload_concurrency,
+                                force=args.force, scratch=scratch, direct_stream=args.direct,
+                                chunk_server=chunk_server, files_in_flight=args.files_in_flight)
+            stats = client.stats.snapshot()
+    finally:
+        journal.close()
+        if chunk_server is not None:
+            chunk_server.stop()
+        if dedup_cache is not None:
+            dedup_cache.close()
+        if report is not sys.stdout:
+            report.close()
+    
+    summary = dict(counts, elapsed_seconds=round(time.perf_counter() - started, 3), api=stats)
+    print(json.dumps(summary), file=sys.stderr)
+    return 1 if counts["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = {SUCCEEDED, FAILED, CANCELLED}
+
+class JobCancelled(Exception):
+    """Raised inside a job once it has been cancelled"""
+
+class JobContext:
+    """Passed to every job function for reporting progress and honouring cancellation"""
+    
+    def __init__(self, manager: "JobManager", job_id: str):
+        self.manager = manager
+        self.job_id = job_id
+    
+    @property
+    def cancelled(self) -> bool:
+        return self.manager._is_cancelled(self.job_id)
+    
+    def check_cancelled(self):
+        """Raise JobCancelled if cancel() was called for this job"""
+        if self.cancelled:
+            raise JobCancelled("Job was cancelled")
+    
+    def report(self, progress: Optional[float] = None, message: Optional[str] = None, detail: Optional[str] = None):
+        """Update progress (0-1), add a log message and/or replace the one-line detail; also a cancellation point"""
+        self.manager._update(self.job_id, progress, message, detail)
+        self.check_cancelled()
+
+class JobManager:
+    """
+    Runs long jobs (uploads) on a thread pool, outside any Streamlit script run
+    
+    The registry lives in this object, not in st.session_state, so a rerun or a
+    second browser tab never stops or duplicates a job; pages only submit jobs and
+    read snapshots. Jobs are called as fn(context, *args, **kwargs). Files listed in
+    cleanup_paths belong to the job and are removed once it has finished, after
+    which cleanup_callbacks are called (e.g. to release reserved scratch space).
+    """
+    
+    def __init__(self, max_workers: int = 4, max_finished_jobs: int = 200, max_messages: int = 50):
+        self.max_finished_jobs = max_finished_jobs
+        self.max_messages = max_messages
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upload-job")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+    
+    def submit(self, fn: Callable, *args, name: str = None, owner: str = None,
+               cleanup_paths: List[str] = None, cleanup_callbacks: List[Callable[[], None]] = None,
+               **kwargs) -> str:
+        """Queue fn(context, *args, **kwargs); returns the job ID"""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {
+                "id": job_id,
+                "name": name or getattr(fn, "__name__", "job"),
+                "owner": owner,
+                "status": QUEUED,
+                "progress": 0.0,
+                "messages": deque(maxlen=self.max_messages),
+                "detail": None,
+                "result": None,
+                "error": None,
+                "cancel_requested": False,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "future": None,
+                "cleanup_paths": list(cleanup_paths or []),
+                "cleanup_callbacks": list(cleanup_callbacks or [])
+            }
+            self._prune()
+        
+        future = self._executor.submit(self._run, job_id, fn, args, kwargs)
+        with self._lock:
+            self._jobs[job_id]["future"] = future
+        return job_id
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Snapshot of one job (None if unknown or pruned)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+    
+    def list_jobs(self, owner: str = None) -> List[Dict]:
+        """Snapshots of all jobs (or one owner's), oldest first"""
+        with self._lock:
+            return [self._snapshot(job) for job in self._jobs.values() if owner is None or job["owner"] == owner]
+    
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job, or ask a running one to stop at its next report()"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] in FINISHED_STATES:
+                return False
+            job["cancel_requested"] = True
+            future = job["future"]
+        
+        if future is not None and future.cancel():
+            # Never started: _run won't run, so finish it here
+            self._finish(job_id, CANCELLED, error="Job was cancelled")
+            self._cleanup(job_id)
+        return True
+    
+    def shutdown(self, wait: bool = True):
+        """Stop accepting jobs; with wait, block until running jobs finish"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+    
+    def _run(self, job_id: str, fn: Callable, args, kwargs):
+        with self._lock:
+            job = self._jobs[job_id]
+            if job["cancel_requested"]:
+                status = CANCELLED
+            else:
+                job["status"] = RUNNING
+                job["started_at"] = time.time()
+                status = None
+        
+        try:
+            if status == CANCELLED:
+                self._finish(job_id, CANCELLED, error="Job was cancelled")
+                return
+            
+            try:
+                result = fn(JobContext(self, job_id), *args, **kwargs)
+            except JobCancelled as e:
+                self._finish(job_id, CANCELLED, error=str(e))
+            except Exception as e:
+                self._finish(job_id, FAILED, error=str(e))
+            else:
+                self._finish(job_id, SUCCEEDED, result=result)
+        
+        finally:
+            self._cleanup(job_id)
+    
+    def _cleanup(self, job_id: str):
+        """Remove the files the job owned, then run its cleanup callbacks (each only once)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            paths = job["cleanup_paths"] if job else []
+            callbacks = job["cleanup_callbacks"] if job else []
+            if job:
+                job["cleanup_paths"] = []
+                job["cleanup_callbacks"] = []
+        
+        for path in paths:
+            if path and os.path.exists(path):
+                try:
+                    os.remove(path)
+                except:
+                    pass
+        
+        for callback in callbacks:
+            try:
+                callback()
+            except:
+                pass
+    
+    def _update(self, job_id: str, progress: Optional[float], message: Optional[str], detail: Optional[str] = None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            if progress is not None:
+                job["progress"] = min(max(progress, 0.0), 1.0)
+            if message:
+                job["messages"].append(message)
+            if detail is not None:
+                job["detail"] = detail
+    
+    def _is_cancelled(self, job_id: str) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job is None or job["cancel_requested"]
+    
+    def _finish(self, job_id: str, status: str, result=None, error: str = None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job["status"] = status
+            job["result"] = result
+            job["error"] = error
+            if status == SUCCEEDED:
+                job["progress"] = 1.0
+            job["finished_at"] = time.time()
+    
+    def _prune(self):
+        """Forget the oldest finished jobs beyond max_finished_jobs (caller holds the lock)"""
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+    
+    @staticmethod
+    def _snapshot(job: Dict) -> Dict:
+        snapshot = {key: value for key, value in job.items() if key not in ("future", "messages", "cleanup_paths", "cleanup_callbacks")}
+        snapshot["messages"] = list(job["messages"])
+        snapshot["message"] = job["messages"][-1] if job["messages"] else None
+        return snapshot
@@ -0,0 +1,132 @@
+"""
+Pluggable timing and counter hooks for the ingest phases
+
+Instrumented code reports to the process-wide hook:
+    probe_seconds           header probe of a source (cache misses only)
+    encode_seconds          producing one chunk (stream copy or re-encode)
+    upload_seconds          one upload request, including retries
+    indexing_wait_seconds   upload accepted -> task ready/failed
+    upload_bytes_total      bytes sent to /tasks (counter)
+
+The default hook keeps Prometheus-style counters and histograms in memory;
+set_metrics_hook() swaps in any object with observe() and increment(), e.g. an
+adapter around prometheus_client.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+# Histogram buckets in seconds: sub-second probes up to multi-hour indexing waits
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600, 14400)
+
+class MetricsHook:
+    """No-op base class; subclasses export observations somewhere"""
+    
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        """Record one sample of a histogram (durations in seconds)"""
+    
+    def increment(self, name: str, amount: float = 1, labels: Optional[Dict[str, str]] = None):
+        """Add to a counter"""
+
+class InMemoryMetrics(MetricsHook):
+    """Counters and bucketed histograms kept in memory (bounded by the number of series)"""
+    
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+    
+    @staticmethod
+    def _key(name: str, labels: Optional[Dict[str, str]]):
+        return name, tuple(sorted((labels or {}).items()))
+    
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            histogram["counts"][bisect.bisect_left(self.buckets, value)] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+    
+    def increment(self, name: str, amount: float = 1, labels: Optional[Dict[str, str]] = None):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+    
+    def summary(self) -> Dict[str, Dict]:
+        """Per series: count/sum/mean for histograms, value for counters"""
+        with self._lock:
+            result = {}
+            for (name, labels), histogram in self._histograms.items():
+                count = histogram["count"]
+                result[_series(name, labels)] = {
+                    "count": count,
+                    "sum": histogram["sum"],
+                    "mean": histogram["sum"] / count if count else 0.0
+                }
+            for (name, labels), value in self._counters.items():
+                result[_series(name, labels)] = {"value": value}
+            return result
+    
+    def render_prometheus(self) -> str:
+        """Text exposition format, e.g. for a /metrics endpoint"""
+        lines = []
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                lines.append(f"{_series(name, labels)} {value}")
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), histogram["counts"]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{_series(name + '_bucket', labels + (('le', le),))} {cumulative}")
+                lines.append(f"{_series(name + '_sum', labels)} {histogram['sum']}")
+                lines.append(f"{_series(name + '_count', labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+    
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+def _series(name: str, labels: Tuple) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+_hook: MetricsHook = InMemoryMetrics()
+
+def get_metrics_hook() -> MetricsHook:
+    return _hook
+
+def set_metrics_hook(hook: MetricsHook):
+    """Send all further observations to hook"""
+    global _hook
+    _hook = hook
+
+def observe(name: str, value: float, labels: Optional[Dict[str, str]] = None):
+    try:
+        _hook.observe(name, value, labels)
+    except Exception:
+        # A broken exporter must never fail an upload
+        pass
+
+def increment(name: str, amount: float = 1, labels: Optional[Dict[str, str]] = None):
+    try:
+        _hook.increment(name, amount, labels)
+    except Exception:
+        pass
+
+@contextmanager
+def timed(name: str, labels: Optional[Dict[str, str]] = None):
+    """Observe the block's wall time as `name` (also when it raises)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, labels)
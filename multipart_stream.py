@@ -0,0 +1,152 @@
+import mmap
+import os
+import uuid
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+class MultipartStreamBody:
+    """
+    multipart/form-data body around one readable stream (a file, a pipe, a byte range)
+    
+    With a known length the body is passed as `data=` to requests and read in
+    small blocks while the request is sent (requests' files= builds the whole body
+    in memory first), with Content-Length set. Without one, pass iter_blocks() to
+    send it with chunked transfer encoding. progress_callback(sent, total) is
+    called at most every progress_interval bytes and once at the end; total is
+    size_hint (or the bytes sent so far) when the length isn't known.
+    The stream is closed with the body. Each attempt needs a fresh body.
+    """
+    
+    def __init__(self, fields: Dict[str, str], file_field: str, stream: BinaryIO, filename: str,
+                 content_type: str = "application/octet-stream", length: Optional[int] = None,
+                 size_hint: Optional[int] = None,
+                 progress_callback: Optional[Callable[[int, int], None]] = None,
+                 progress_interval: int = 1024 * 1024):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self.progress_callback = progress_callback
+        self.progress_interval = progress_interval
+        
+        head = []
+        for name, value in fields.items():
+            head.append(
+                f"--{self.boundary}\r\n"
+                f"Content-Disposition: form-data; name=\"{name}\"\r\n\r\n"
+                f"{value}\r\n"
+            )
+        filename = filename.replace('"', "%22")
+        head.append(
+            f"--{self.boundary}\r\n"
+            f"Content-Disposition: form-data; name=\"{file_field}\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: {content_type}\r\n\r\n"
+        )
+        self._head = "".join(head).encode()
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode()
+        
+        self._file = stream
+        self._parts = [self._head, None, self._tail]
+        self._part = 0
+        self._offset = 0
+        self.total = None if length is None else len(self._head) + length + len(self._tail)
+        self._size_hint = None if size_hint is None else len(self._head) + size_hint + len(self._tail)
+        self.sent = 0
+        self._reported = 0
+    
+    def __len__(self) -> int:
+        if self.total is None:
+            raise TypeError("Body length is unknown; send iter_blocks() instead")
+        return self.total
+    
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.total - self.sent if self.total is not None else 1 << 62
+        
+        data = b""
+        while len(data) < size and self._part < len(self._parts):
+            part = self._parts[self._part]
+            if part is None:
+                block = self._file.read(size - len(data))
+                if not block:
+                    self._part += 1
+                    continue
+            else:
+                block = part[self._offset:self._offset + size - len(data)]
+                self._offset += len(block)
+                if self._offset >= len(part):
+                    self._part += 1
+                    self._offset = 0
+            data += block
+        
+        self.sent += len(data)
+        finished = self._part >= len(self._parts)
+        if self.progress_callback and (self.sent - self._reported >= self.progress_interval
+                                       or (finished and self._reported != self.sent)):
+            self._reported = self.sent
+            total = self.total if self.total is not None else max(self._size_hint or 0, self.sent)
+            self.progress_callback(self.sent, self.sent if finished else total)
+        return data
+    
+    def iter_blocks(self, block_size: int = 256 * 1024) -> Iterator[bytes]:
+        """The body as a generator, for chunked transfer encoding"""
+        while True:
+            block = self.read(block_size)
+            if not block:
+                return
+            yield block
+    
+    def close(self):
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class MultipartFileBody(MultipartStreamBody):
+    """MultipartStreamBody that streams one file from disk"""
+    
+    def __init__(self, fields: Dict[str, str], file_field: str, file_path: str, filename: str = None,
+                 content_type: str = "application/octet-stream",
+                 progress_callback: Optional[Callable[[int, int], None]] = None,
+                 progress_interval: int = 1024 * 1024):
+        super().__init__(fields, file_field, open(file_path, "rb"), filename or os.path.basename(file_path),
+                         content_type, length=os.path.getsize(file_path), progress_callback=progress_callback,
+                         progress_interval=progress_interval)
+
+class FileRanges:
+    """
+    Read-only stream over byte ranges of a file, in order, through a memory map
+    
+    Nothing is copied to disk or buffered beyond the block being read; the page
+    cache serves the bytes straight from the source file.
+    """
+    
+    def __init__(self, file_path: str, ranges: List[Tuple[int, int]]):
+        self.ranges = [(start, end) for start, end in ranges if end > start]
+        self.length = sum(end - start for start, end in self.ranges)
+        self._file = open(file_path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(self._map, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            self._map.madvise(mmap.MADV_SEQUENTIAL)
+        self._range = 0
+        self._position = self.ranges[0][0] if self.ranges else 0
+    
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.length
+        
+        data = b""
+        while len(data) < size and self._range < len(self.ranges):
+            _, end = self.ranges[self._range]
+            block = self._map[self._position:min(end, self._position + size - len(data))]
+            self._position += len(block)
+            data += block
+            if self._position >= end:
+                self._range += 1
+                if self._range < len(self.ranges):
+                    self._position = self.ranges[self._range][0]
+        return data
+    
+    def close(self):
+        self._map.close()
+        self._file.close()
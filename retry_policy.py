@@ -0,0 +1,113 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+class RetryPolicy:
+    """
+    Which failures are retried and how long to wait between attempts
+    
+    Rate limits (429) and transient server errors are retried with exponential
+    backoff and full jitter, and a Retry-After header always takes precedence.
+    Connection errors and timeouts are retried the same way.
+    
+    Non-idempotent requests (POSTs creating a task or an index) may have been
+    carried out before the error, and retrying them would create a duplicate.
+    They are only retried when the server says the request wasn't processed
+    (429, or 503 with Retry-After), or when it failed before being sent.
+    """
+    
+    def __init__(self, max_retries: int = 5, backoff_base: float = 1.0, backoff_max: float = 60.0,
+                 retry_statuses=(429, 500, 502, 503, 504)):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = set(retry_statuses)
+    
+    def is_retryable(self, status_code: int, idempotent: bool = True, retry_after: Optional[str] = None) -> bool:
+        """Whether a response status is worth another attempt"""
+        if status_code not in self.retry_statuses:
+            return False
+        if idempotent:
+            return True
+        return status_code == 429 or (status_code == 503 and retry_after is not None)
+    
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Seconds to wait before retry number attempt + 1"""
+        server_delay = parse_retry_after(retry_after)
+        if server_delay is not None:
+            return min(server_delay, self.backoff_max)
+        
+        # Full jitter keeps concurrent uploads from retrying in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (seconds or HTTP date) into seconds from now"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    """
+    Client-side rate limiter shared by every request of a client
+    
+    reserve() takes a token and returns how long the caller must wait for it,
+    so the same bucket works for threads (time.sleep) and asyncio (asyncio.sleep).
+    A server-side 429 pauses the whole bucket, so concurrent uploads back off together.
+    With rate=None there is no limit, only the pause.
+    """
+    
+    def __init__(self, rate: Optional[float] = None, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = float(burst or max(1, int(rate or 1)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+    
+    def reserve(self) -> float:
+        """Take one token; returns the seconds to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._paused_until - now)
+            
+            if self.rate:
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                self._tokens -= 1
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens / self.rate)
+            
+            return wait
+    
+    def pause(self, seconds: float):
+        """Hold back every caller for `seconds` (e.g. after a 429 with Retry-After)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+class RetryStats:
+    """Thread-safe counters for tuning the retry policy and rate limiter"""
+    
+    FIELDS = ("requests", "retries", "retry_wait_seconds", "throttled_responses",
+              "throttle_waits", "throttle_wait_seconds")
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {name: 0 for name in self.FIELDS}
+    
+    def add(self, name: str, amount: float = 1):
+        with self._lock:
+            self._counters[name] += amount
+    
+    def snapshot(self) -> Dict[str, float]:
+        """Current counter values"""
+        with self._lock:
+            return dict(self._counters)
@@ -0,0 +1,267 @@
+import fnmatch
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+DEFAULT_SCRATCH_ROOT = os.path.join(tempfile.gettempdir(), "twelvelabs_uploader")
+
+# Temp files moviepy leaves next to its output (or in the working directory) when a write is interrupted
+STRAY_PATTERNS = ("*TEMP_MPY_*", "*_temp-audio.m4a")
+
+# Scratch entries are named <kind>-<pid>.<start time>-<random> so a sweep can tell whose they are; the start
+# time tells a live owner from an unrelated process that got its pid later (e.g. after a container restart)
+_ENTRY_NAME = re.compile(r"^[A-Za-z0-9_]+-(\d+)(?:\.(\d+))?-")
+
+class ScratchSpaceFull(Exception):
+    """Raised when a reservation can't be admitted (larger than the budget, or timed out)"""
+
+class Reservation:
+    """Bytes of scratch space held for one job; release() or leave the with block to give them back"""
+    
+    def __init__(self, scratch: "ScratchSpace", nbytes: int):
+        self.scratch = scratch
+        self.nbytes = nbytes
+    
+    def resize(self, nbytes: int):
+        """Change the amount held; shrinking wakes waiting reservations, growing never blocks"""
+        self.scratch._resize(self, max(0, int(nbytes)))
+    
+    def release(self):
+        self.resize(0)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+class ScratchSpace:
+    """
+    Byte budget and admission control for temp copies and chunks
+    
+    Jobs reserve the bytes they are about to write before writing them; a
+    reservation is admitted once it fits both the budget (sum of outstanding
+    reservations, None for no budget) and the free space of the target
+    filesystem minus min_free_bytes, otherwise it waits. Directories and files
+    created here are removed when their with block ends, and sweep() removes
+    what a crashed process left behind.
+    """
+    
+    def __init__(self, root: str = None, budget_bytes: Optional[int] = None,
+                 min_free_bytes: int = 1024 * 1024 * 1024, poll_interval: float = 0.5):
+        self.root = root or DEFAULT_SCRATCH_ROOT
+        os.makedirs(self.root, exist_ok=True)
+        self.budget_bytes = budget_bytes
+        self.min_free_bytes = min_free_bytes
+        self.poll_interval = poll_interval
+        self._condition = threading.Condition()
+        self._reserved = 0
+    
+    @property
+    def reserved_bytes(self) -> int:
+        with self._condition:
+            return self._reserved
+    
+    def free_bytes(self, path: str = None) -> int:
+        """Free bytes on the filesystem holding path (default: the scratch root)"""
+        path = os.path.abspath(path or self.root)
+        # The directory may not exist yet (e.g. a job's chunk directory)
+        while not os.path.exists(path) and os.path.dirname(path) != path:
+            path = os.path.dirname(path)
+        return shutil.disk_usage(path).free
+    
+    def available_bytes(self, path: str = None) -> int:
+        """Bytes a new reservation could get right now"""
+        available = self.free_bytes(path) - self.min_free_bytes
+        with self._condition:
+            if self.budget_bytes is not None:
+                available = min(available, self.budget_bytes - self._reserved)
+        return max(0, available)
+    
+    def reserve(self, nbytes: int, path: str = None, timeout: Optional[float] = None) -> Reservation:
+        """
+        Hold nbytes for files about to be written under path (default: the scratch root)
+        
+        Blocks until the bytes fit; raises ScratchSpaceFull if they never can
+        (more than the budget) or timeout seconds pass first.
+        """
+        nbytes = max(0, int(nbytes))
+        if self.budget_bytes is not None and nbytes > self.budget_bytes:
+            raise ScratchSpaceFull(
+                f"Needs {nbytes} bytes of scratch space but the budget is {self.budget_bytes}"
+            )
+        
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                fits_budget = self.budget_bytes is None or self._reserved + nbytes <= self.budget_bytes
+                # Free space is re-checked on every wakeup; other processes use the disk too
+                if fits_budget and self.free_bytes(path) - nbytes >= self.min_free_bytes:
+                    self._reserved += nbytes
+                    return Reservation(self, nbytes)
+                
+                wait = self.poll_interval
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise ScratchSpaceFull(
+                            f"Not enough scratch space for {nbytes} bytes "
+                            f"({self.available_bytes(path)} available)"
+                        )
+                    wait = min(wait, remaining)
+                self._condition.wait(wait)
+    
+    def _resize(self, reservation: Reservation, nbytes: int):
+        with self._condition:
+            self._reserved += nbytes - reservation.nbytes
+            reservation.nbytes = nbytes
+            self._condition.notify_all()
+    
+    def new_path(self, kind: str = "file", suffix: str = "") -> str:
+        """Create an empty file in the scratch root; the caller removes it"""
+        fd, path = tempfile.mkstemp(prefix=entry_prefix(kind), suffix=suffix, dir=self.root)
+        os.close(fd)
+        return path
+    
+    def new_directory(self, kind: str = "dir") -> str:
+        """Create a directory in the scratch root; the caller removes it"""
+        return tempfile.mkdtemp(prefix=entry_prefix(kind), dir=self.root)
+    
+    @contextmanager
+    def file(self, kind: str = "file", suffix: str = "") -> Iterator[str]:
+        """Path of a scratch file that is removed when the block ends"""
+        path = self.new_path(kind, suffix)
+        try:
+            yield path
+        finally:
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except:
+                    pass
+    
+    @contextmanager
+    def directory(self, kind: str = "dir") -> Iterator[str]:
+        """Scratch directory that is removed with its contents when the block ends"""
+        path = self.new_directory(kind)
+        try:
+            yield path
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+    
+    def sweep(self, max_age: float = 24 * 3600, stray_dirs: List[str] = (),
+              expire_dirs: List[str] = ()) -> List[str]:
+        """
+        Remove orphaned scratch entries; returns the removed paths
+        
+        An entry is orphaned when the process that created it is gone (its pid
+        now belonging to a process that started later counts as gone); entries
+        whose name carries no owner pid are orphaned once older than max_age. An
+        entry of a running process is never removed, however old. moviepy temp
+        files (STRAY_PATTERNS) in the root and in stray_dirs are removed once they
+        are older than an hour. Entries of expire_dirs (e.g. the upload journal's
+        chunk directories, kept across restarts so a failed upload can resume)
+        are removed once nothing in them changed for max_age.
+        """
+        removed = []
+        now = time.time()
+        
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            match = _ENTRY_NAME.match(name)
+            try:
+                age = now - os.path.getmtime(path)
+            except OSError:
+                continue
+            if match:
+                started = int(match.group(2)) if match.group(2) else None
+                orphaned = not _process_alive(int(match.group(1)), started)
+            else:
+                orphaned = age > max_age
+            if orphaned:
+                _remove(path)
+                removed.append(path)
+        
+        for directory in [self.root] + list(stray_dirs):
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if not any(fnmatch.fnmatch(name, pattern) for pattern in STRAY_PATTERNS) or path in removed:
+                    continue
+                try:
+                    if now - os.path.getmtime(path) > 3600:
+                        _remove(path)
+                        removed.append(path)
+                except OSError:
+                    pass
+        
+        for directory in expire_dirs:
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if now - _newest_mtime(path) > max_age:
+                    _remove(path)
+                    removed.append(path)
+        
+        return removed
+
+def entry_prefix(kind: str) -> str:
+    """Name prefix that marks a scratch entry as this process's, for files created outside ScratchSpace"""
+    started = _process_start_time(os.getpid())
+    owner = os.getpid() if started is None else f"{os.getpid()}.{started}"
+    return f"{kind}-{owner}-"
+
+def _process_start_time(pid: int) -> Optional[int]:
+    """Start time of a process in clock ticks since boot, or None where /proc isn't available"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    try:
+        # The command name may contain spaces, so count fields after its closing parenthesis
+        return int(stat.rsplit(")", 1)[1].split()[19])
+    except (IndexError, ValueError):
+        return None
+
+def _process_alive(pid: int, started: Optional[int] = None) -> bool:
+    if pid == os.getpid():
+        return started is None or started == _process_start_time(pid)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists but belongs to another user
+        pass
+    if started is not None:
+        # A different start time means the pid was reused
+        current = _process_start_time(pid)
+        return current is None or current == started
+    return True
+
+def _newest_mtime(path: str) -> float:
+    """Latest modification time of path or anything directly inside it"""
+    mtimes = []
+    for entry in [path] + ([os.path.join(path, name) for name in os.listdir(path)] if os.path.isdir(path) else []):
+        try:
+            mtimes.append(os.path.getmtime(entry))
+        except OSError:
+            pass
+    return max(mtimes, default=time.time())
+
+def _remove(path: str):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except:
+            pass
@@ -0,0 +1,297 @@
+import math
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+import metrics
+from twelve_labs_client import TwelveLabsClient
+
+TERMINAL_STATUSES = {"ready", "failed"}
+
+# Largest page GET /tasks returns
+LIST_PAGE_LIMIT = 50
+
+class TaskPoller:
+    """
+    Track the status of many upload tasks from one background thread
+    
+    Each task is polled on its own adaptive schedule: min_interval right after
+    upload, growing by backoff_factor per poll up to max_interval, so fresh
+    tasks are checked quickly and long indexing jobs cost little. Polls that come
+    due within coalesce_window of each other are made together; when at least
+    list_threshold of them belong to the same index, one GET /tasks listing
+    (50 tasks per page) replaces the individual status requests.
+    
+    Status changes are published to callbacks (called on the poller thread) and,
+    with max_events, to the `events` queue as (task_id, record) pairs; a full
+    queue drops its oldest event. Records of ready or failed tasks are forgotten
+    retention seconds after they finished.
+    """
+    
+    def __init__(self, client: TwelveLabsClient, min_interval: float = 2.0, max_interval: float = 60.0,
+                 backoff_factor: float = 1.5, coalesce_window: float = 1.0, max_concurrent_polls: int = 4,
+                 list_threshold: int = 3, max_list_pages: int = 20,
+                 on_change: Optional[Callable[[str, Dict], None]] = None, max_events: int = 0,
+                 retention: float = 3600.0):
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.coalesce_window = coalesce_window
+        self.max_concurrent_polls = max_concurrent_polls
+        self.list_threshold = list_threshold
+        self.max_list_pages = max_list_pages
+        self.retention = retention
+        
+        self.events = queue.Queue(maxsize=max_events) if max_events else None
+        self.requests = 0
+        self._listeners = [on_change] if on_change else []
+        self._tasks = {}
+        self._cond = threading.Condition()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+    
+    def add_listener(self, callback: Callable[[str, Dict], None]):
+        """Call callback(task_id, record) on every status change"""
+        self._listeners.append(callback)
+    
+    def track(self, task_id: str, index_id: str = None, name: str = None, status: str = None):
+        """Start tracking an upload task (no-op if it is already tracked)"""
+        with self._cond:
+            self._expire()
+            if task_id in self._tasks:
+                return
+            self._tasks[task_id] = {
+                "task_id": task_id,
+                "index_id": index_id,
+                "name": name or task_id,
+                "status": status or "pending",
+                "task": None,
+                "error": None,
+                "polls": 0,
+                "interval": self.min_interval,
+                "next_poll": time.monotonic() + self.min_interval,
+                "tracked_at": time.time(),
+                "updated_at": time.time()
+            }
+        self._wakeup.set()
+    
+    def untrack(self, task_id: str):
+        """Stop tracking a task and forget its record"""
+        with self._cond:
+            self._tasks.pop(task_id, None)
+    
+    def _expire(self):
+        """Forget finished tasks older than the retention period (called with the lock held)"""
+        cutoff = time.time() - self.retention
+        for task_id in [t for t, r in self._tasks.items()
+                        if r["status"] in TERMINAL_STATUSES and r["updated_at"] < cutoff]:
+            del self._tasks[task_id]
+    
+    def get(self, task_id: str) -> Optional[Dict]:
+        """Latest record for a task: status, task (last API response), error, polls"""
+        with self._cond:
+            record = self._tasks.get(task_id)
+            return dict(record) if record else None
+    
+    def snapshot(self) -> Dict[str, Dict]:
+        """Latest records of every tracked task"""
+        with self._cond:
+            return {task_id: dict(record) for task_id, record in self._tasks.items()}
+    
+    def pending(self) -> List[str]:
+        """Task IDs that haven't reached ready or failed"""
+        with self._cond:
+            return [t for t, r in self._tasks.items() if r["status"] not in TERMINAL_STATUSES]
+    
+    def start(self):
+        """Start the background polling thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="task-poller", daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self):
+        """Stop the background thread (tracked tasks are kept)"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+    
+    def wait(self, task_ids: Iterable[str], timeout: float = 3600) -> Dict[str, Dict]:
+        """Block until every task is ready or failed; returns their records"""
+        task_ids = list(task_ids)
+        self.start()
+        deadline = time.monotonic() + timeout
+        
+        with self._cond:
+            while True:
+                records = {t: self._tasks.get(t) for t in task_ids}
+                missing = [t for t, r in records.items() if r is None]
+                if missing:
+                    raise Exception(f"Task is not tracked: {missing[0]}")
+                if all(r["status"] in TERMINAL_STATUSES for r in records.values()):
+                    return {t: dict(r) for t, r in records.items()}
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise Exception("Upload timeout")
+                self._cond.wait(remaining)
+    
+    def poll_once(self) -> int:
+        """Poll every task that is due now; returns the number of API requests made"""
+        now = time.monotonic()
+        with self._cond:
+            due = [
+                (task_id, record["index_id"]) for task_id, record in self._tasks.items()
+                if record["status"] not in TERMINAL_STATUSES and record["next_poll"] <= now + self.coalesce_window
+            ]
+        if not due:
+            return 0
+        
+        by_index = defaultdict(list)
+        for task_id, index_id in due:
+            by_index[index_id].append(task_id)
+        
+        requests = 0
+        found = {}
+        for index_id, task_ids in by_index.items():
+            if index_id and len(task_ids) >= self.list_threshold:
+                listed, listing_requests = self._poll_listing(index_id, set(task_ids))
+                found.update(listed)
+                requests += listing_requests
+        
+        # Whatever the listings didn't cover is polled one by one
+        remaining = [task_id for task_id, _ in due if task_id not in found]
+        errors = {}
+        if remaining:
+            def poll(task_id):
+                try:
+                    return task_id, self.client.get_task_status(task_id), None
+                except Exception as e:
+                    return task_id, None, str(e)
+            
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_concurrent_polls, len(remaining)))) as executor:
+                for task_id, task, error in executor.map(poll, remaining):
+                    if error is None:
+                        found[task_id] = task
+                    else:
+                        errors[task_id] = error
+            requests += len(remaining)
+        
+        self._apply(found, errors, {task_id for task_id, _ in due})
+        with self._cond:
+            self.requests += requests
+        return requests
+    
+    def _poll_listing(self, index_id: str, wanted: set) -> tuple:
+        """Read task statuses for an index from GET /tasks pages; returns (found, requests)"""
+        found = {}
+        requests = 0
+        page = 1
+        # Tracked tasks are the newest ones, so they fill the first pages
+        max_pages = min(self.max_list_pages, math.ceil(len(wanted) / LIST_PAGE_LIMIT) + 1)
+        try:
+            while page <= max_pages:
+                response_data = self.client.list_tasks(index_id=index_id, page=page, page_limit=LIST_PAGE_LIMIT)
+                requests += 1
+                
+                with self._cond:
+                    tracked = set(self._tasks)
+                for task in response_data.get("data", []):
+                    task_id = task.get("_id") or task.get("id")
+                    # Any tracked task in the listing is updated for free
+                    if task_id in tracked:
+                        found[task_id] = task
+                
+                total_pages = response_data.get("page_info", {}).get("total_page", page)
+                if wanted <= set(found) or page >= total_pages:
+                    break
+                page += 1
+        except Exception:
+            # Fall back to per-task polls for anything not found
+            pass
+        return found, requests
+    
+    def _apply(self, found: Dict[str, Dict], errors: Dict[str, str], polled: set):
+        """Record poll results, reschedule tasks and publish status changes"""
+        now = time.monotonic()
+        changes = []
+        
+        with self._cond:
+            for task_id, task in found.items():
+                record = self._tasks.get(task_id)
+                if record is None:
+                    continue
+                record["task"] = task
+                record["error"] = None
+                status = task.get("status", record["status"])
+                if status != record["status"]:
+                    record["status"] = status
+                    record["updated_at"] = time.time()
+                    changes.append((task_id, dict(record)))
+                    if status in TERMINAL_STATUSES:
+                        metrics.observe("indexing_wait_seconds", record["updated_at"] - record["tracked_at"])
+            
+            for task_id in polled:
+                record = self._tasks.get(task_id)
+                if record is None:
+                    continue
+                if task_id in errors:
+                    record["error"] = errors[task_id]
+                record["polls"] += 1
+                record["next_poll"] = now + record["interval"]
+                record["interval"] = min(self.max_interval, record["interval"] * self.backoff_factor)
+            
+            if changes:
+                self._cond.notify_all()
+        
+        for task_id, record in changes:
+            if self.events is not None:
+                self._publish((task_id, record))
+            for callback in list(self._listeners):
+                try:
+                    callback(task_id, record)
+                except Exception:
+                    pass
+    
+    def _publish(self, event: tuple):
+        """Queue an event, dropping the oldest one when nobody keeps up"""
+        while True:
+            try:
+                self.events.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.events.get_nowait()
+                except queue.Empty:
+                    pass
+    
+    def _next_poll_in(self) -> Optional[float]:
+        with self._cond:
+            times = [r["next_poll"] for r in self._tasks.values() if r["status"] not in TERMINAL_STATUSES]
+        if not times:
+            return None
+        return max(0.0, min(times) - time.monotonic())
+    
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.poll_once()
+            except Exception:
+                pass
+            
+            self._wakeup.wait(self._next_poll_in())
+            self._wakeup.clear()
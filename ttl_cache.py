@@ -0,0 +1,37 @@
+import threading
+import time
+from typing import Any, Hashable, Optional
+
+class TTLCache:
+    """Thread-safe key/value cache whose entries expire after ttl seconds"""
+    
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            return value
+    
+    def set(self, key: Hashable, value: Any):
+        if not self.ttl:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+    
+    def invalidate(self, key: Hashable = None):
+        """Drop one entry, or everything when key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
@@ -1,137 +1,423 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
 import os
 import time
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional
 import json
+from retry_policy import RetryPolicy, RetryStats, TokenBucket
+from dedup_cache import DedupCache
+from file_hashing import file_digest
+from ttl_cache import TTLCache
+from multipart_stream import MultipartFileBody, MultipartStreamBody
+import metrics
+
+def build_index_payload(name: str, engines: List[str] = None) -> Dict:
+    """Build the create-index request body"""
+    if engines is None:
+        engines = ["marengo2.7", "pegasus1.2"]
+    
+    # Build models array with proper structure for API v1.3
+    models = []
+    for engine in engines:
+        models.append({
+            "model_name": engine,
+            "model_options": ["visual", "audio"]
+        })
+    
+    return {
+        "index_name": name,
+        "models": models
+    }
+
+# Largest page GET /indexes returns
+INDEX_PAGE_LIMIT = 50
+
+def next_index_page(response_data, page: int) -> Optional[int]:
+    """Page number to fetch after `page`, or None if it was the last"""
+    page_info = response_data.get("page_info") if isinstance(response_data, dict) else None
+    if not page_info:
+        return None
+    return page + 1 if page < page_info.get("total_page", page) else None
+
+def parse_index_list(response_data) -> List[Dict]:
+    """Extract the list of indexes from a /indexes response"""
+    # Handle different possible response structures
+    if "data" in response_data:
+        return response_data["data"]
+    return response_data if isinstance(response_data, list) else []
+
+# Seconds to open a connection, and the longest silence while sending or waiting for a response
+CONNECT_TIMEOUT = 10.0
+READ_TIMEOUT = 300.0
+
+class _TimeoutAdapter(HTTPAdapter):
+    """Connection pool adapter that applies a default timeout to every request"""
+    
+    def __init__(self, timeout, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+    
+    def send(self, request, timeout=None, **kwargs):
+        return super().send(request, timeout=timeout if timeout is not None else self.timeout, **kwargs)
+
+def _failed_before_sending(error: requests.RequestException) -> bool:
+    """Whether a connection error happened before any of the request reached the server"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
 
 class TwelveLabsClient:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, base_url: str = "https://api.twelvelabs.io/v1.3", pool_size: int = 10,
+                 retry_policy: RetryPolicy = None, rate_limit: Optional[float] = None, rate_burst: Optional[int] = None,
+                 dedup_cache: DedupCache = None, cache_ttl: float = 60.0, connect_timeout: float = CONNECT_TIMEOUT,
+                 read_timeout: float = READ_TIMEOUT):
         self.api_key = api_key
-        self.base_url = "https://api.twelvelabs.io/v1.3"
+        self.base_url = base_url.rstrip("/")
         self.headers = {
             "x-api-key": api_key,
             "Content-Type": "application/json"
         }
+        
+        # One keep-alive connection pool shared by all calls (and upload threads);
+        # a stalled connection fails after read_timeout instead of hanging
+        self.session = requests.Session()
+        adapter = _TimeoutAdapter((connect_timeout, read_timeout), pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        
+        # Shared by every call: retry rules, client-side requests/second limit, counters
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = TokenBucket(rate_limit, rate_burst)
+        self.stats = RetryStats()
+        
+        # Optional: content hash -> earlier upload result, so identical files aren't sent twice
+        self.dedup_cache = dedup_cache
+        
+        # Index list and index details are cached for cache_ttl seconds (0 disables);
+        # create_index() invalidates them
+        self.index_cache = TTLCache(cache_ttl)
+    
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _throttle(self):
+        """Wait for a rate-limiter token"""
+        wait = self.rate_limiter.reserve()
+        if wait > 0:
+            self.stats.add("throttle_waits")
+            self.stats.add("throttle_wait_seconds", wait)
+            time.sleep(wait)
+    
+    def _send(self, send: Callable[[], requests.Response], idempotent: bool = True) -> requests.Response:
+        """
+        Run send() under the rate limiter, retrying retryable failures
+        
+        Returns the last response (callers check the status as before) or
+        re-raises the connection error once retries are exhausted. Requests that
+        aren't idempotent are only retried where no duplicate can result (see
+        RetryPolicy).
+        """
+        attempt = 0
+        while True:
+            self._throttle()
+            self.stats.add("requests")
+            
+            try:
+                response = send()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.retry_policy.max_retries or not (idempotent or _failed_before_sending(e)):
+                    raise
+                delay = self.retry_policy.delay(attempt)
+            else:
+                retry_after = response.headers.get("Retry-After")
+                if attempt >= self.retry_policy.max_retries or not self.retry_policy.is_retryable(
+                        response.status_code, idempotent, retry_after):
+                    return response
+                
+                delay = self.retry_policy.delay(attempt, retry_after)
+                if response.status_code == 429:
+                    self.stats.add("throttled_responses")
+                    # Hold back every request of this client, not just this one
+                    self.rate_limiter.pause(delay)
+                response.close()
+            
+            self.stats.add("retries")
+            self.stats.add("retry_wait_seconds", delay)
+            time.sleep(delay)
+            attempt += 1
     
     def create_index(self, name: str, engines: List[str] = None) -> Dict:
         """Create a new index"""
-        if engines is None:
-            engines = ["marengo2.7", "pegasus1.2"]
-        
-        # Build models array with proper structure for API v1.3
-        models = []
-        for engine in engines:
-            models.append({
-                "model_name": engine,
-                "model_options": ["visual", "audio"]
-            })
-        
-        payload = {
-            "index_name": name,
-            "models": models
-        }
+        payload = build_index_payload(name, engines)
         
-        response = requests.post(
+        response = self._send(lambda: self.session.post(
             f"{self.base_url}/indexes",
             headers=self.headers,
             json=payload
-        )
+        ), idempotent=False)
         
         if response.status_code == 201:
+            self.index_cache.invalidate()
             return response.json()
         else:
             raise Exception(f"Failed to create index: {response.status_code} - {response.text}")
     
-    def get_index(self, index_id: str) -> Dict:
-        """Get index details"""
-        response = requests.get(
+    def get_index(self, index_id: str, refresh: bool = False) -> Dict:
+        """Get index details (cached; refresh=True bypasses the cache)"""
+        if not refresh:
+            cached = self.index_cache.get(("index", index_id))
+            if cached is not None:
+                return cached
+        
+        response = self._send(lambda: self.session.get(
             f"{self.base_url}/indexes/{index_id}",
             headers=self.headers
-        )
+        ))
         
         if response.status_code == 200:
-            return response.json()
+            index = response.json()
+            self.index_cache.set(("index", index_id), index)
+            return index
         else:
             raise Exception(f"Failed to get index: {response.status_code} - {response.text}")
     
-    def list_indexes(self) -> List[Dict]:
-        """List all indexes"""
-        response = requests.get(
-            f"{self.base_url}/indexes",
-            headers=self.headers
-        )
-        
-        if response.status_code == 200:
-            response_data = response.json()
+    def iter_indexes(self, page_limit: int = INDEX_PAGE_LIMIT) -> Iterator[Dict]:
+        """Yield every index, fetching pages lazily"""
+        page = 1
+        while page is not None:
+            response = self._send(lambda: self.session.get(
+                f"{self.base_url}/indexes",
+                headers=self.headers,
+                params={"page": page, "page_limit": page_limit}
+            ))
             
-            # Handle different possible response structures
-            if "data" in response_data:
-                indexes = response_data["data"]
-            else:
-                indexes = response_data if isinstance(response_data, list) else []
+            if response.status_code != 200:
+                raise Exception(f"Failed to list indexes: {response.status_code} - {response.text}")
             
-            return indexes
-        else:
-            raise Exception(f"Failed to list indexes: {response.status_code} - {response.text}")
+            response_data = response.json()
+            yield from parse_index_list(response_data)
+            page = next_index_page(response_data, page)
+    
+    def list_indexes(self, refresh: bool = False) -> List[Dict]:
+        """List all indexes, across every page (cached; refresh=True bypasses the cache)"""
+        if not refresh:
+            cached = self.index_cache.get("indexes")
+            if cached is not None:
+                return list(cached)
+        
+        indexes = list(self.iter_indexes())
+        self.index_cache.set("indexes", indexes)
+        return list(indexes)
     
-    def upload_video(self, index_id: str, file_path: str, video_title: str = None) -> Dict:
-        """Upload a video to an index using API v1.3 direct upload"""
+    def upload_video(self, index_id: str, file_path: str, video_title: str = None, content_hash: str = None,
+                     progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict:
+        """
+        Upload a video to an index using API v1.3 direct upload
+        
+        The multipart body is streamed from disk; progress_callback(bytes_sent,
+        total_bytes) is called as it goes (restarting from 0 on a retry).
+        With a dedup cache, a file whose content was already uploaded to this index
+        returns the earlier result without sending it (content_hash skips hashing).
+        """
         if video_title is None:
             video_title = os.path.basename(file_path)
         
-        # Prepare headers (no Content-Type for multipart/form-data - requests will set it)
-        headers = {
-            "x-api-key": self.api_key
-        }
+        if self.dedup_cache is not None:
+            if content_hash is None:
+                content_hash = file_digest(file_path)
+            cached = self.dedup_cache.lookup(content_hash, index_id, client=self)
+            if isinstance(cached, dict):
+                return cached
         
         # Prepare form data
         data = {
             "index_id": index_id
         }
         
-        # Open file and upload directly
-        with open(file_path, 'rb') as video_file:
-            files = {
-                'video_file': (video_title, video_file, 'video/mp4')
-            }
-            
-            response = requests.post(
-                f"{self.base_url}/tasks",
-                headers=headers,
-                data=data,
-                files=files
-            )
+        def send():
+            # Fresh streaming body (and file handle) for every attempt
+            with MultipartFileBody(data, "video_file", file_path, video_title, "video/mp4",
+                                   progress_callback=progress_callback) as body:
+                headers = {
+                    "x-api-key": self.api_key,
+                    "Content-Type": body.content_type
+                }
+                
+                return self.session.post(
+                    f"{self.base_url}/tasks",
+                    headers=headers,
+                    data=body
+                )
+        
+        with metrics.timed("upload_seconds"):
+            response = self._send(send, idempotent=False)
         
         if response.status_code in [200, 201]:
             result = response.json()
+            metrics.increment("upload_bytes_total", os.path.getsize(file_path))
+            if self.dedup_cache is not None:
+                self.dedup_cache.store(content_hash, index_id, result, os.path.getsize(file_path))
             return result
         else:
             raise Exception(f"Failed to upload video: {response.status_code} - {response.text}")
     
+    def upload_stream(self, index_id: str, open_stream: Callable[[], BinaryIO], filename: str,
+                      content_type: str = "video/mp4", length: Optional[int] = None, size_hint: Optional[int] = None,
+                      progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict:
+        """
+        Upload a video that is produced while it is sent (a remux pipe, a byte range)
+        
+        open_stream() is called for every attempt and the stream is closed after
+        it. With length the request carries a Content-Length; without it the body
+        is sent with chunked transfer encoding.
+        """
+        data = {
+            "index_id": index_id
+        }
+        sent = 0
+        
+        def send():
+            nonlocal sent
+            with MultipartStreamBody(data, "video_file", open_stream(), filename, content_type, length=length,
+                                     size_hint=size_hint, progress_callback=progress_callback) as body:
+                headers = {
+                    "x-api-key": self.api_key,
+                    "Content-Type": body.content_type
+                }
+                
+                response = self.session.post(
+                    f"{self.base_url}/tasks",
+                    headers=headers,
+                    data=body if length is not None else body.iter_blocks()
+                )
+                sent = body.sent
+                return response
+        
+        with metrics.timed("upload_seconds"):
+            response = self._send(send, idempotent=False)
+        
+        if response.status_code in [200, 201]:
+            metrics.increment("upload_bytes_total", sent)
+            return response.json()
+        else:
+            raise Exception(f"Failed to upload video: {response.status_code} - {response.text}")
+    
+    def upload_video_url(self, index_id: str, video_url: str, content_hash: str = None) -> Dict:
+        """
+        Create an upload task from a video the API downloads itself (public or presigned URL)
+        
+        No video bytes go through this client. With a dedup cache and
+        content_hash, content already uploaded to this index returns the
+        earlier result without creating a task.
+        """
+        if self.dedup_cache is not None and content_hash is not None:
+            cached = self.dedup_cache.lookup(content_hash, index_id, client=self)
+            if isinstance(cached, dict):
+                return cached
+        
+        # Small multipart form without a file part
+        fields = {
+            "index_id": (None, index_id),
+            "video_url": (None, video_url)
+        }
+        
+        with metrics.timed("upload_seconds"):
+            response = self._send(lambda: self.session.post(
+                f"{self.base_url}/tasks",
+                headers={"x-api-key": self.api_key},
+                files=fields
+            ), idempotent=False)
+        
+        if response.status_code in [200, 201]:
+            result = response.json()
+            if self.dedup_cache is not None and content_hash is not None:
+                self.dedup_cache.store(content_hash, index_id, result)
+            return result
+        else:
+            raise Exception(f"Failed to upload video from URL: {response.status_code} - {response.text}")
+    
+    def upload_many(self, index_id: str, file_paths: List[str], max_concurrency: int = 4,
+                    video_titles: List[str] = None) -> List[Dict]:
+        """Upload several videos concurrently; results are returned in file_paths order"""
+        if video_titles is None:
+            video_titles = [None] * len(file_paths)
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+            futures = [
+                executor.submit(self.upload_video, index_id, file_path, video_title)
+                for file_path, video_title in zip(file_paths, video_titles)
+            ]
+            
+            results = []
+            for file_path, future in zip(file_paths, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    # Don't start uploads that haven't begun yet
+                    for other in futures:
+                        other.cancel()
+                    raise Exception(f"Failed to upload {os.path.basename(file_path)}: {str(e)}")
+            
+            return results
+    
     def get_task_status(self, task_id: str) -> Dict:
         """Get the status of an upload task"""
-        response = requests.get(
+        response = self._send(lambda: self.session.get(
             f"{self.base_url}/tasks/{task_id}",
             headers=self.headers
-        )
+        ))
         
         if response.status_code == 200:
             return response.json()
         else:
             raise Exception(f"Failed to get task status: {response.status_code} - {response.text}")
     
-    def wait_for_upload_completion(self, task_id: str, timeout: int = 3600) -> Dict:
+    def list_tasks(self, index_id: str = None, page: int = 1, page_limit: int = 50, **filters) -> Dict:
+        """
+        List upload tasks, newest first (one page)
+        Returns the response body: "data" plus "page_info"; extra filters
+        (e.g. status) are passed through as query parameters
+        """
+        params = {"page": page, "page_limit": page_limit, "sort_by": "created_at", "sort_option": "desc"}
+        if index_id:
+            params["index_id"] = index_id
+        params.update(filters)
+        
+        response = self._send(lambda: self.session.get(
+            f"{self.base_url}/tasks",
+            headers=self.headers,
+            params=params
+        ))
+        
+        if response.status_code == 200:
+            return response.json()
+        else:
+            raise Exception(f"Failed to list tasks: {response.status_code} - {response.text}")
+    
+    def wait_for_upload_completion(self, task_id: str, timeout: int = 3600, poll_interval: float = 10) -> Dict:
         """Wait for upload task to complete"""
         start_time = time.time()
         
         while time.time() - start_time < timeout:
             status = self.get_task_status(task_id)
             
+            if status["status"] in ("ready", "failed"):
+                metrics.observe("indexing_wait_seconds", time.time() - start_time)
             if status["status"] == "ready":
                 return status
             elif status["status"] == "failed":
                 raise Exception(f"Upload failed: {status.get('error', 'Unknown error')}")
             
-            time.sleep(10)  # Wait 10 seconds before checking again
+            time.sleep(poll_interval)  # Wait before checking again
         
         raise Exception("Upload timeout")
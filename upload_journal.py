@@ -0,0 +1,177 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+DEFAULT_STATE_DIR = os.path.join(os.path.expanduser("~"), ".twelvelabs_uploader")
+
+class UploadJournal:
+    """
+    Persistent record of chunked upload jobs, so a failed upload can resume
+    
+    Jobs are keyed by (source content hash, index_id). For every chunk the
+    journal stores whether it has been encoded (and where) and whether the API
+    accepted it (with the returned task ID).
+    """
+    
+    def __init__(self, db_path: str = None):
+        if db_path is None:
+            db_path = os.path.join(DEFAULT_STATE_DIR, "journal.sqlite3")
+        
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self.chunk_root = os.path.join(os.path.dirname(os.path.abspath(db_path)), "chunks")
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    source_hash TEXT NOT NULL,
+                    index_id TEXT NOT NULL,
+                    source_name TEXT,
+                    chunk_params TEXT,
+                    chunk_count INTEGER,
+                    status TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (source_hash, index_id)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    source_hash TEXT NOT NULL,
+                    index_id TEXT NOT NULL,
+                    chunk_index INTEGER NOT NULL,
+                    chunk_path TEXT,
+                    state TEXT NOT NULL,
+                    task_id TEXT,
+                    result TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (source_hash, index_id, chunk_index)
+                )
+            """)
+    
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+    
+    def chunk_dir(self, source_hash: str, index_id: str) -> str:
+        """Stable directory for a job's chunks, so they survive a failed attempt"""
+        return os.path.join(self.chunk_root, f"{source_hash}_{index_id}")
+    
+    def start_job(self, source_hash: str, index_id: str, source_name: str = None, chunk_params: Dict = None) -> Dict:
+        """
+        Open (or resume) the job for a source/index pair
+        
+        If the chunking parameters changed since the last attempt, earlier chunk
+        records no longer line up with the new cut points and are discarded.
+        """
+        params = json.dumps(chunk_params or {}, sort_keys=True)
+        now = time.time()
+        
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE source_hash = ? AND index_id = ?", (source_hash, index_id)
+            ).fetchone()
+            
+            if row is not None and row["chunk_params"] != params:
+                self._conn.execute(
+                    "DELETE FROM chunks WHERE source_hash = ? AND index_id = ?", (source_hash, index_id)
+                )
+                row = None
+            
+            if row is None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, NULL, 'in_progress', ?)",
+                    (source_hash, index_id, source_name, params, now)
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'in_progress', updated_at = ? WHERE source_hash = ? AND index_id = ?",
+                    (now, source_hash, index_id)
+                )
+            
+            job = self._conn.execute(
+                "SELECT * FROM jobs WHERE source_hash = ? AND index_id = ?", (source_hash, index_id)
+            ).fetchone()
+        
+        return dict(job)
+    
+    def get_job(self, source_hash: str, index_id: str) -> Optional[Dict]:
+        """Return the job record, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE source_hash = ? AND index_id = ?", (source_hash, index_id)
+            ).fetchone()
+        return dict(row) if row else None
+    
+    def get_chunks(self, source_hash: str, index_id: str) -> Dict[int, Dict]:
+        """Return chunk records keyed by chunk index"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM chunks WHERE source_hash = ? AND index_id = ? ORDER BY chunk_index",
+                (source_hash, index_id)
+            ).fetchall()
+        
+        chunks = {}
+        for row in rows:
+            chunk = dict(row)
+            chunk["result"] = json.loads(chunk["result"]) if chunk["result"] else None
+            chunks[chunk["chunk_index"]] = chunk
+        return chunks
+    
+    def set_chunk_count(self, source_hash: str, index_id: str, chunk_count: int):
+        """Record how many chunks the source produced"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET chunk_count = ?, updated_at = ? WHERE source_hash = ? AND index_id = ?",
+                (chunk_count, time.time(), source_hash, index_id)
+            )
+    
+    def mark_encoded(self, source_hash: str, index_id: str, chunk_index: int, chunk_path: str):
+        """Record that a chunk file has been written (unless it was already accepted)"""
+        with self._lock, self._conn:
+            self._conn.execute("""
+                INSERT INTO chunks (source_hash, index_id, chunk_index, chunk_path, state, updated_at)
+                VALUES (?, ?, ?, ?, 'encoded', ?)
+                ON CONFLICT (source_hash, index_id, chunk_index) DO UPDATE
+                SET chunk_path = excluded.chunk_path, updated_at = excluded.updated_at
+                WHERE state != 'accepted'
+            """, (source_hash, index_id, chunk_index, chunk_path, time.time()))
+    
+    def mark_accepted(self, source_hash: str, index_id: str, chunk_index: int, result: Dict):
+        """Record that the API accepted a chunk, keeping its task ID"""
+        task_id = (result.get("_id") or result.get("id")) if isinstance(result, dict) else None
+        with self._lock, self._conn:
+            self._conn.execute("""
+                INSERT INTO chunks (source_hash, index_id, chunk_index, state, task_id, result, updated_at)
+                VALUES (?, ?, ?, 'accepted', ?, ?, ?)
+                ON CONFLICT (source_hash, index_id, chunk_index) DO UPDATE
+                SET state = 'accepted', task_id = excluded.task_id, result = excluded.result,
+                    updated_at = excluded.updated_at
+            """, (source_hash, index_id, chunk_index, task_id, json.dumps(result), time.time()))
+    
+    def finish_job(self, source_hash: str, index_id: str):
+        """Mark a job complete and remove its chunk directory"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'complete', updated_at = ? WHERE source_hash = ? AND index_id = ?",
+                (time.time(), source_hash, index_id)
+            )
+        shutil.rmtree(self.chunk_dir(source_hash, index_id), ignore_errors=True)
+    
+    def reset_job(self, source_hash: str, index_id: str):
+        """Forget a job and its chunk records, so the next attempt starts from scratch"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM chunks WHERE source_hash = ? AND index_id = ?", (source_hash, index_id)
+            )
+            self._conn.execute(
+                "DELETE FROM jobs WHERE source_hash = ? AND index_id = ?", (source_hash, index_id)
+            )
+        shutil.rmtree(self.chunk_dir(source_hash, index_id), ignore_errors=True)
@@ -0,0 +1,668 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import metrics
+from chunk_server import ChunkServer
+from file_hashing import file_digest
+from scratch_space import ScratchSpace
+from task_poller import TaskPoller
+from twelve_labs_client import TwelveLabsClient
+from upload_journal import UploadJournal
+from video_chunker import VideoChunker
+
+# How long a chunk served by URL may wait for the API to download it
+DEFAULT_FETCH_TIMEOUT = 6 * 3600
+
+
+def upload_chunks_pipelined(client: TwelveLabsClient, chunker: VideoChunker, file_path: str, index_id: str,
+                            max_concurrent_uploads: int = 2, output_dir: str = None,
+                            progress_callback: Optional[Callable[[str, int, str, Optional[Dict]], None]] = None,
+                            journal: UploadJournal = None, source_hash: str = None,
+                            upload_progress_callback: Optional[Callable[[int, int, int], None]] = None,
+                            scratch: ScratchSpace = None, scratch_timeout: Optional[float] = None,
+                            direct_stream: bool = False, chunk_server: ChunkServer = None,
+                            fetch_timeout: float = DEFAULT_FETCH_TIMEOUT) -> List[Dict]:
+    """
+    Chunk a video and upload each chunk as soon as it is written
+    
+    Chunking (producer) and uploading (consumer threads) overlap, so total time is
+    roughly the larger of the two instead of their sum. Each chunk is deleted once
+    its upload succeeds. The chunker only writes a chunk when asked for it (plus
+    one per worker with parallel re-encoding), and it is only asked once an upload
+    slot frees up, so about max_concurrent_uploads + 1 chunks are on disk at once.
+    
+    With a journal, progress is recorded per chunk and a retry of the same source
+    and index resumes: accepted chunks are not uploaded again, and chunks left on
+    disk by the failed attempt are reused instead of re-chunking the source.
+    source_hash skips hashing the file when the caller already has its digest.
+    
+    If the client has a dedup cache and this content was already uploaded to the
+    index, the earlier results are returned (as "skipped") without chunking.
+    
+    With a scratch space, chunking only starts once the estimated bytes of the
+    chunks that can be on disk at the same time are reserved (waiting up to
+    scratch_timeout seconds), and the reservation shrinks as chunks are deleted.
+    Without output_dir or journal, chunks go to a scratch directory that is
+    removed at the end.
+    
+    With direct_stream, a source that can be stream-copied is never written as
+    chunk files: each chunk is piped from ffmpeg (or sent as a byte range of the
+    source) straight into its upload, up to max_concurrent_uploads at a time.
+    Events then carry the chunk's file name instead of a path.
+    
+    With a chunk_server, chunks are not sent by this process at all: each is
+    published on the server and registered by URL, and it counts as uploaded
+    (and is deleted) once the API has downloaded it (see upload_via_chunk_server).
+    Direct streaming doesn't apply then, since the API fetches files.
+    
+    progress_callback(event, chunk_index, chunk_path, result) is called from the
+    calling thread with event "chunked", "skipped" (already accepted), "uploaded"
+    or "failed". upload_progress_callback(chunk_index, bytes_sent, total_bytes)
+    reports bytes as they are sent, from the upload threads.
+    Returns upload results in chunk order.
+    """
+    def notify(event, chunk_index, chunk_path, result=None):
+        if progress_callback:
+            progress_callback(event, chunk_index, chunk_path, result)
+    
+    def remove_chunk(chunk_path):
+        if chunk_path and chunk_path != file_path and os.path.exists(chunk_path):
+            try:
+                os.remove(chunk_path)
+            except:
+                pass
+    
+    dedup_cache = getattr(client, "dedup_cache", None)
+    if dedup_cache is not None:
+        if source_hash is None:
+            source_hash = file_digest(file_path)
+        cached = dedup_cache.lookup(source_hash, index_id, client=client)
+        if cached is not None:
+            cached = cached if isinstance(cached, list) else [cached]
+            for chunk_index, result in enumerate(cached):
+                notify("skipped", chunk_index, file_path, result)
+            return cached
+    
+    journaled = {}
+    if journal is not None:
+        if source_hash is None:
+            source_hash = file_digest(file_path)
+        job = journal.start_job(source_hash, index_id, os.path.basename(file_path), _chunk_params(chunker))
+        journaled = journal.get_chunks(source_hash, index_id)
+    
+    if (direct_stream and chunk_server is None and chunker.can_stream_directly(file_path)
+            and chunker.needs_chunking(file_path)):
+        ordered = _upload_streams(client, chunker, file_path, index_id, max_concurrent_uploads, notify,
+                                  journal, source_hash, journaled, upload_progress_callback)
+        if dedup_cache is not None:
+            dedup_cache.store(source_hash, index_id, ordered, os.path.getsize(file_path))
+        return ordered
+    
+    own_dir = None
+    if journal is not None:
+        if output_dir is None:
+            output_dir = journal.chunk_dir(source_hash, index_id)
+        chunks = _resume_or_chunk(chunker, file_path, output_dir, job, journaled)
+    else:
+        if output_dir is None:
+            output_dir = own_dir = (scratch or ScratchSpace()).new_directory("chunks")
+        chunks = _numbered(chunker.iter_chunks(file_path, output_dir))
+    
+    reservation = None
+    estimates, ahead, finished = [], 0, set()
+    if scratch is not None:
+        _, _, _, plan = chunker.get_chunk_info(file_path)
+        estimates = [chunk["estimated_bytes"] for chunk in plan] if len(plan) > 1 else []
+        # Chunks the chunker may write ahead, plus those waiting for or in an upload
+        ahead = chunker.chunks_written_ahead(file_path, len(estimates)) + max_concurrent_uploads if estimates else 0
+        finished = {i for i, chunk in journaled.items() if chunk["state"] == "accepted"}
+        try:
+            reservation = scratch.reserve(_scratch_needed(estimates, ahead, finished), path=output_dir,
+                                          timeout=scratch_timeout)
+        except BaseException:
+            chunks.close()
+            if own_dir:
+                shutil.rmtree(own_dir, ignore_errors=True)
+            raise
+    
+    def release_scratch():
+        if reservation is not None:
+            reservation.release()
+        if own_dir:
+            shutil.rmtree(own_dir, ignore_errors=True)
+    
+    def chunk_done(chunk_index):
+        # Its bytes are off the disk; let other jobs have them
+        finished.add(chunk_index)
+        if reservation is not None:
+            reservation.resize(_scratch_needed(estimates, ahead, finished))
+    
+    results = {}
+    pending = {}
+    
+    def accept(chunk_index, chunk_path, result):
+        results[chunk_index] = result
+        if journal is not None:
+            journal.mark_accepted(source_hash, index_id, chunk_index, result)
+        remove_chunk(chunk_path)
+        chunk_done(chunk_index)
+    
+    def collect(done):
+        # Every finished upload is recorded before a failure is raised, so a retry never resends it
+        error = None
+        for future in done:
+            chunk_index, chunk_path = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                # With a journal the encoded chunk is kept for the next attempt
+                if journal is None:
+                    remove_chunk(chunk_path)
+                notify("failed", chunk_index, chunk_path, {"error": str(e)})
+                error = error or Exception(f"Failed to upload chunk {chunk_index + 1}: {str(e)}")
+                continue
+            
+            accept(chunk_index, chunk_path, result)
+            notify("uploaded", chunk_index, chunk_path, result)
+        if error is not None:
+            raise error
+    
+    unsubmitted = None
+    chunk_count = 0
+    with ThreadPoolExecutor(max_workers=max_concurrent_uploads) as executor:
+        try:
+            produce_started = time.perf_counter()
+            for chunk_index, chunk_path in chunks:
+                chunk_count += 1
+                
+                previous = journaled.get(chunk_index)
+                if previous and previous["state"] == "accepted":
+                    # Uploaded by an earlier attempt
+                    results[chunk_index] = previous["result"]
+                    remove_chunk(chunk_path)
+                    chunk_done(chunk_index)
+                    notify("skipped", chunk_index, chunk_path, previous["result"])
+                    produce_started = time.perf_counter()
+                    continue
+                
+                # Time spent waiting on the chunker for this chunk
+                metrics.observe("encode_seconds", time.perf_counter() - produce_started)
+                
+                unsubmitted = chunk_path
+                if journal is not None:
+                    journal.mark_encoded(source_hash, index_id, chunk_index, chunk_path)
+                notify("chunked", chunk_index, chunk_path)
+                
+                # Back-pressure: don't pull the next chunk until an upload slot is free
+                while len(pending) >= max_concurrent_uploads:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                
+                # An unchunked source is uploaded as-is; its hash is already known
+                content_hash = source_hash if chunk_path == file_path else None
+                byte_progress = None
+                if upload_progress_callback:
+                    byte_progress = lambda sent, total, i=chunk_index: upload_progress_callback(i, sent, total)
+                if chunk_server is not None:
+                    future = executor.submit(upload_via_chunk_server, client, chunk_server, index_id, chunk_path,
+                                             fetch_timeout, progress_callback=byte_progress)
+                else:
+                    future = executor.submit(client.upload_video, index_id, chunk_path, content_hash=content_hash,
+                                             progress_callback=byte_progress)
+                pending[future] = (chunk_index, chunk_path)
+                unsubmitted = None
+                
+                # Report uploads that finished while this chunk was being produced
+                collect([f for f in list(pending) if f.done()])
+                produce_started = time.perf_counter()
+            
+            if journal is not None:
+                journal.set_chunk_count(source_hash, index_id, chunk_count)
+            
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        
+        except BaseException:
+            # Stop the chunker (removes chunks it hasn't handed out yet)
+            chunks.close()
+            for future in pending:
+                future.cancel()
+            wait(pending)
+            # Uploads that were running still finished; the API has those chunks
+            for future, (chunk_index, chunk_path) in list(pending.items()):
+                if not future.cancelled() and future.exception() is None:
+                    del pending[future]
+                    accept(chunk_index, chunk_path, future.result())
+            if journal is None:
+                for _, chunk_path in pending.values():
+                    remove_chunk(chunk_path)
+                if unsubmitted:
+                    remove_chunk(unsubmitted)
+            release_scratch()
+            raise
+    
+    release_scratch()
+    if journal is not None:
+        journal.finish_job(source_hash, index_id)
+    
+    ordered = [results[i] for i in sorted(results)]
+    # upload_video caches an unchunked source itself; URL registration doesn't know its hash
+    if dedup_cache is not None and (len(ordered) > 1 or chunk_server is not None):
+        dedup_cache.store(source_hash, index_id, ordered, os.path.getsize(file_path))
+    return ordered
+
+
+def upload_chunks_fanout(client: TwelveLabsClient, chunker: VideoChunker, file_path: str, index_ids: List[str],
+                         max_concurrent_uploads: int = 2, output_dir: str = None,
+                         progress_callback: Optional[Callable[..., None]] = None,
+                         journal: UploadJournal = None, source_hash: str = None,
+                         upload_progress_callback: Optional[Callable[[str, int, int, int], None]] = None,
+                         scratch: ScratchSpace = None, scratch_timeout: Optional[float] = None,
+                         chunk_server: ChunkServer = None, fetch_timeout: float = DEFAULT_FETCH_TIMEOUT,
+                         task_poller: TaskPoller = None) -> Dict[str, Dict]:
+    """
+    Chunk a video once and upload every chunk to each of several indexes
+    
+    Each chunk is encoded once and sent to all target indexes concurrently
+    (max_concurrent_uploads chunks in flight, each to every index at once). A
+    chunk is deleted once every index is done with it. An index whose upload
+    fails gets no further chunks while the others carry on, and its outcome is
+    "failed" instead of the whole call raising; with a journal, the chunks it
+    is missing stay on disk for a retry, otherwise they are deleted as usual.
+    
+    Indexes that already have this content (dedup cache) are "skipped", and
+    with a journal, chunks an index accepted in an earlier attempt aren't sent
+    to it again; chunks every index has aren't encoded again either. Scratch
+    space, output_dir, chunk_server and the callbacks work as in
+    upload_chunks_pipelined; callbacks also get the index ID (None for
+    "chunked", which happens once per chunk). With a task_poller, every accepted
+    task is tracked as soon as its chunk is accepted.
+    
+    Returns index_id -> {"status": "uploaded", "skipped" or "failed",
+    "results": upload results in chunk order, "error": message or None}.
+    Raises only if chunking fails or the call is interrupted.
+    """
+    index_ids = list(dict.fromkeys(index_ids))
+    if not index_ids:
+        raise ValueError("index_ids is empty")
+    
+    def notify(event, index_id, chunk_index, chunk_path, result=None):
+        if progress_callback:
+            progress_callback(event, index_id, chunk_index, chunk_path, result)
+    
+    def remove_chunk(chunk_path):
+        if chunk_path and chunk_path != file_path and os.path.exists(chunk_path):
+            try:
+                os.remove(chunk_path)
+            except:
+                pass
+    
+    outcomes = {index_id: {"status": "pending", "results": {}, "error": None} for index_id in index_ids}
+    
+    dedup_cache = getattr(client, "dedup_cache", None)
+    if source_hash is None and (dedup_cache is not None or journal is not None):
+        source_hash = file_digest(file_path)
+    if dedup_cache is not None:
+        for index_id in index_ids:
+            cached = dedup_cache.lookup(source_hash, index_id, client=client)
+            if cached is not None:
+                cached = cached if isinstance(cached, list) else [cached]
+                outcomes[index_id] = {"status": "skipped", "results": cached, "error": None}
+                for chunk_index, result in enumerate(cached):
+                    notify("skipped", index_id, chunk_index, file_path, result)
+    
+    targets = [index_id for index_id in index_ids if outcomes[index_id]["status"] == "pending"]
+    if not targets:
+        if journal is not None:
+            _remove_fanout_dirs(journal, source_hash)
+        return outcomes
+    
+    # Per target: chunk indexes it already has
+    accepted = {index_id: set() for index_id in targets}
+    on_disk = set()
+    if journal is not None:
+        for index_id in targets:
+            journal.start_job(source_hash, index_id, os.path.basename(file_path), _chunk_params(chunker))
+            for chunk_index, chunk in journal.get_chunks(source_hash, index_id).items():
+                if chunk["state"] == "accepted":
+                    accepted[index_id].add(chunk_index)
+                    outcomes[index_id]["results"][chunk_index] = chunk["result"]
+                elif chunk["chunk_path"] and os.path.exists(chunk["chunk_path"]):
+                    on_disk.add((chunk_index, chunk["chunk_path"]))
+    everywhere = set.intersection(*accepted.values())
+    
+    own_dir = None
+    if output_dir is None:
+        if journal is not None:
+            # Keyed by source and chunking parameters only, so a retry finds it whichever
+            # indexes are left to upload to
+            key = hashlib.sha1(json.dumps(_chunk_params(chunker), sort_keys=True).encode()).hexdigest()[:12]
+            output_dir = journal.chunk_dir(source_hash, f"fanout-{key}")
+        else:
+            output_dir = own_dir = (scratch or ScratchSpace()).new_directory("chunks")
+    
+    # The re-encode path skips chunks every target has, and chunks an earlier attempt left here
+    reuse_chunks = everywhere | {i for i, path in on_disk if os.path.dirname(path) == os.path.abspath(output_dir)}
+    chunks = _numbered(chunker.iter_chunks(file_path, output_dir, reuse_chunks))
+    
+    reservation = None
+    estimates, ahead, finished = [], 0, set(everywhere)
+    if scratch is not None:
+        _, _, _, plan = chunker.get_chunk_info(file_path)
+        estimates = [chunk["estimated_bytes"] for chunk in plan] if len(plan) > 1 else []
+        ahead = chunker.chunks_written_ahead(file_path, len(estimates)) + max_concurrent_uploads if estimates else 0
+        try:
+            reservation = scratch.reserve(_scratch_needed(estimates, ahead, finished), path=output_dir,
+                                          timeout=scratch_timeout)
+        except BaseException:
+            chunks.close()
+            if own_dir:
+                shutil.rmtree(own_dir, ignore_errors=True)
+            raise
+    
+    # chunk_index -> (chunk_path, targets still uploading it)
+    in_flight = {}
+    pending = {}
+    
+    def chunk_finished(chunk_index):
+        chunk_path, _ = in_flight.pop(chunk_index)
+        if journal is not None and any(chunk_index not in accepted[index_id] for index_id in targets):
+            # Some index failed before getting it; keep it for the retry
+            return
+        remove_chunk(chunk_path)
+        finished.add(chunk_index)
+        if reservation is not None:
+            reservation.resize(_scratch_needed(estimates, ahead, finished))
+    
+    def collect(done):
+        for future in done:
+            index_id, chunk_index = pending.pop(future)
+            chunk_path, waiting = in_flight[chunk_index]
+            waiting.discard(index_id)
+            try:
+                result = future.result()
+            except Exception as e:
+                outcome = outcomes[index_id]
+                if outcome["status"] != "failed":
+                    outcome["status"] = "failed"
+                    outcome["error"] = f"Failed to upload chunk {chunk_index + 1}: {str(e)}"
+                notify("failed", index_id, chunk_index, chunk_path, {"error": str(e)})
+            else:
+                accepted[index_id].add(chunk_index)
+                outcomes[index_id]["results"][chunk_index] = result
+                if journal is not None:
+                    journal.mark_accepted(source_hash, index_id, chunk_index, result)
+                task_id = result.get("_id") or result.get("id") if isinstance(result, dict) else None
+                if task_poller is not None and task_id:
+                    task_poller.track(task_id, index_id=index_id,
+                                      name=f"{os.path.basename(file_path)} (chunk {chunk_index + 1})")
+                notify("uploaded", index_id, chunk_index, chunk_path, result)
+            if not waiting:
+                chunk_finished(chunk_index)
+    
+    def send(index_id, chunk_index, chunk_path, content_hash):
+        byte_progress = None
+        if upload_progress_callback:
+            byte_progress = lambda sent, total: upload_progress_callback(index_id, chunk_index, sent, total)
+        if chunk_server is not None:
+            return upload_via_chunk_server(client, chunk_server, index_id, chunk_path, fetch_timeout,
+                                           progress_callback=byte_progress)
+        return client.upload_video(index_id, chunk_path, content_hash=content_hash, progress_callback=byte_progress)
+    
+    chunk_count = 0
+    chunked_all = False
+    with ThreadPoolExecutor(max_workers=max_concurrent_uploads * len(targets)) as executor:
+        try:
+            for chunk_index, chunk_path in chunks:
+                chunk_count += 1
+                live = [index_id for index_id in targets if outcomes[index_id]["status"] != "failed"]
+                needed = [index_id for index_id in live if chunk_index not in accepted[index_id]]
+                for index_id in targets:
+                    if chunk_index in accepted[index_id]:
+                        notify("skipped", index_id, chunk_index, chunk_path, outcomes[index_id]["results"][chunk_index])
+                
+                if journal is not None:
+                    # Failed indexes too: the chunk stays on disk for their retry
+                    for index_id in targets:
+                        if chunk_index not in accepted[index_id]:
+                            journal.mark_encoded(source_hash, index_id, chunk_index, chunk_path)
+                
+                in_flight[chunk_index] = (chunk_path, set(needed))
+                if not needed:
+                    chunk_finished(chunk_index)
+                    continue
+                
+                notify("chunked", None, chunk_index, chunk_path)
+                
+                # The chunk's hash is needed by every dedup lookup; compute it once
+                content_hash = source_hash if chunk_path == file_path else None
+                if content_hash is None and dedup_cache is not None:
+                    content_hash = file_digest(chunk_path)
+                for index_id in needed:
+                    future = executor.submit(send, index_id, chunk_index, chunk_path, content_hash)
+                    pending[future] = (index_id, chunk_index)
+                
+                # Back-pressure: at most max_concurrent_uploads chunks uploading at once
+                while len(in_flight) >= max_concurrent_uploads and pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                collect([f for f in list(pending) if f.done()])
+                
+                if all(outcomes[index_id]["status"] == "failed" for index_id in targets):
+                    # Nobody left to upload to; more chunks would only fill the disk
+                    chunks.close()
+                    break
+            else:
+                chunked_all = True
+            
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        
+        except BaseException:
+            chunks.close()
+            for future in pending:
+                future.cancel()
+            wait(pending)
+            if journal is None:
+                for chunk_path, _ in in_flight.values():
+                    remove_chunk(chunk_path)
+            if reservation is not None:
+                reservation.release()
+            if own_dir:
+                shutil.rmtree(own_dir, ignore_errors=True)
+            raise
+    
+    if reservation is not None:
+        reservation.release()
+    if own_dir:
+        shutil.rmtree(own_dir, ignore_errors=True)
+    
+    for index_id in targets:
+        outcome = outcomes[index_id]
+        outcome["results"] = [outcome["results"][i] for i in sorted(outcome["results"])]
+        if outcome["status"] == "failed":
+            continue
+        outcome["status"] = "uploaded"
+        if journal is not None:
+            journal.set_chunk_count(source_hash, index_id, chunk_count)
+            journal.finish_job(source_hash, index_id)
+        if dedup_cache is not None and (len(outcome["results"]) > 1 or chunk_server is not None):
+            dedup_cache.store(source_hash, index_id, outcome["results"], os.path.getsize(file_path))
+    
+    if journal is not None:
+        for index_id in targets:
+            # A partial count would make a later attempt take the chunks so far for all of them
+            if outcomes[index_id]["status"] == "failed" and chunked_all:
+                journal.set_chunk_count(source_hash, index_id, chunk_count)
+        if all(outcomes[index_id]["status"] == "uploaded" for index_id in targets):
+            shutil.rmtree(output_dir, ignore_errors=True)
+            _remove_fanout_dirs(journal, source_hash)
+    return outcomes
+
+
+def upload_via_chunk_server(client: TwelveLabsClient, chunk_server: ChunkServer, index_id: str, file_path: str,
+                            fetch_timeout: float = DEFAULT_FETCH_TIMEOUT, poll_interval: float = 10.0,
+                            progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict:
+    """
+    Register a local file with the API by URL and wait until the API has downloaded it
+    
+    The file is served by chunk_server only while this runs, so the caller can
+    delete it afterwards. The task is checked every poll_interval seconds while
+    waiting, so a failed download (or a task that became ready through some
+    other copy) ends the wait early. progress_callback(bytes, total) is called
+    once the file has been fetched.
+    """
+    url = chunk_server.publish(file_path)
+    try:
+        result = client.upload_video_url(index_id, url)
+        task_id = result.get("_id") or result.get("id")
+        deadline = time.monotonic() + fetch_timeout
+        
+        while not chunk_server.wait_fetched(url, poll_interval):
+            status = client.get_task_status(task_id) if task_id else {}
+            if status.get("status") == "failed":
+                raise Exception(f"Failed to upload video from URL: {status.get('error', 'the download failed')}")
+            if status.get("status") == "ready":
+                break
+            if time.monotonic() > deadline:
+                raise Exception(f"Failed to upload video from URL: not fetched within {fetch_timeout:g}s")
+        
+        if progress_callback:
+            size = os.path.getsize(file_path)
+            progress_callback(size, size)
+        return result
+    finally:
+        chunk_server.unpublish(url)
+
+
+def _upload_streams(client: TwelveLabsClient, chunker: VideoChunker, file_path: str, index_id: str,
+                    max_concurrent_uploads: int, notify: Callable, journal: Optional[UploadJournal],
+                    source_hash: Optional[str], journaled: Dict[int, Dict],
+                    upload_progress_callback: Optional[Callable[[int, int, int], None]]) -> List[Dict]:
+    """Upload every chunk straight from ffmpeg or the source bytes; returns results in chunk order"""
+    results = {}
+    pending = {}
+    streams = list(chunker.iter_chunk_streams(file_path))
+    
+    with ThreadPoolExecutor(max_workers=max_concurrent_uploads) as executor:
+        for stream in streams:
+            previous = journaled.get(stream.index)
+            if previous and previous["state"] == "accepted":
+                results[stream.index] = previous["result"]
+                notify("skipped", stream.index, stream.filename, previous["result"])
+                continue
+            
+            byte_progress = None
+            if upload_progress_callback:
+                byte_progress = lambda sent, total, i=stream.index: upload_progress_callback(i, sent, total)
+            future = executor.submit(client.upload_stream, index_id, stream.open, stream.filename,
+                                     stream.content_type, length=stream.length, size_hint=stream.size_hint,
+                                     progress_callback=byte_progress)
+            pending[future] = stream
+            notify("chunked", stream.index, stream.filename)
+        
+        if journal is not None:
+            journal.set_chunk_count(source_hash, index_id, len(streams))
+        
+        def accept(stream, result):
+            results[stream.index] = result
+            if journal is not None:
+                journal.mark_accepted(source_hash, index_id, stream.index, result)
+        
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                # Record every finished upload before raising, so a retry never resends it
+                error = None
+                for future in done:
+                    stream = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        notify("failed", stream.index, stream.filename, {"error": str(e)})
+                        error = error or Exception(f"Failed to upload chunk {stream.index + 1}: {str(e)}")
+                        continue
+                    
+                    accept(stream, result)
+                    notify("uploaded", stream.index, stream.filename, result)
+                if error is not None:
+                    raise error
+        
+        except BaseException:
+            # Uploads that haven't started never will; running ones finish first and are recorded
+            for future in pending:
+                future.cancel()
+            wait(pending)
+            for future, stream in pending.items():
+                if not future.cancelled() and future.exception() is None:
+                    accept(stream, future.result())
+            raise
+    
+    if journal is not None:
+        journal.finish_job(source_hash, index_id)
+    return [results[i] for i in sorted(results)]
+
+
+def _chunk_params(chunker: VideoChunker) -> Dict:
+    """Chunking parameters recorded in the journal; a change invalidates earlier chunk records"""
+    return {"chunk_duration_seconds": chunker.chunk_duration_seconds, "stream_copy": chunker.stream_copy,
+            "max_chunk_bytes": chunker.max_chunk_bytes, "parallelism": chunker.parallelism,
+            "encoding_profile": chunker.encoding_profile.as_dict()}
+
+
+def _remove_fanout_dirs(journal: UploadJournal, source_hash: str):
+    """Remove fan-out chunk directories of a source (e.g. from other chunking parameters) once it is everywhere"""
+    for chunk_dir in glob.glob(journal.chunk_dir(source_hash, "fanout-*")):
+        shutil.rmtree(chunk_dir, ignore_errors=True)
+
+
+def _scratch_needed(estimates: List[int], ahead: int, finished: set) -> int:
+    """Estimated bytes of the unfinished chunks that can be on disk at once"""
+    remaining = [size for i, size in enumerate(estimates) if i not in finished]
+    if not remaining:
+        return 0
+    return min(sum(remaining), max(remaining) * ahead)
+
+
+def _numbered(chunk_paths: Iterator[str]) -> Iterator[Tuple[int, str]]:
+    """Pair chunk paths with their index, closing the source generator when closed"""
+    try:
+        for chunk_index, chunk_path in enumerate(chunk_paths):
+            yield chunk_index, chunk_path
+    finally:
+        chunk_paths.close()
+
+
+def _resume_or_chunk(chunker: VideoChunker, file_path: str, output_dir: str, job: Dict,
+                     journaled: Dict[int, Dict]) -> Iterator[Tuple[int, str]]:
+    """Reuse chunks from an earlier attempt if every one is accounted for, else chunk again"""
+    chunk_count = job.get("chunk_count")
+    if chunk_count:
+        reusable = all(
+            i in journaled and (
+                journaled[i]["state"] == "accepted"
+                or (journaled[i]["chunk_path"] and os.path.exists(journaled[i]["chunk_path"]))
+            )
+            for i in range(chunk_count)
+        )
+        if reusable:
+            for i in range(chunk_count):
+                yield i, journaled[i]["chunk_path"]
+            return
+    
+    # Cut points are deterministic for the same source and parameters, so
+    # chunk indexes line up with the journal's records. The re-encode path
+    # skips chunks that were accepted or are still on disk.
+    reuse_chunks = {
+        i for i, chunk in journaled.items()
+        if chunk["state"] == "accepted" or (chunk["chunk_path"] and os.path.exists(chunk["chunk_path"]))
+    }
+    yield from _numbered(chunker.iter_chunks(file_path, output_dir, reuse_chunks))
@@ -1,131 +1,489 @@
 import os
-from moviepy.editor import VideoFileClip
-from typing import List, Tuple
+import subprocess
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
 import tempfile
-from moviepy.config import change_settings
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from encoding_profiles import EncodingProfile, get_profile
+from video_probe import ffmpeg_binary, keyframe_positions, keyframes_between, probe_video
+from chunk_planner import estimate_chunk_bytes, plan_chunks
+from scratch_space import DEFAULT_SCRATCH_ROOT, entry_prefix
+from multipart_stream import FileRanges
+
+# Codecs ffmpeg's mp4 muxer takes as-is; anything else goes straight to re-encoding
+MP4_VIDEO_CODECS = {"h264", "hevc", "mpeg4", "av1", "vp9"}
+MP4_AUDIO_CODECS = {"aac", "mp3", "ac3", "eac3", "opus", "alac", "flac"}
+
+# Containers that stay decodable when cut at a video keyframe packet, so their
+# chunks can be sent as byte ranges of the source
+BYTE_RANGE_FORMATS = {"mpegts"}
+
+# Leading bytes (PAT/PMT tables) repeated in front of every byte-range chunk, at most
+MAX_RANGE_HEADER_BYTES = 64 * 1024
+
+# Keyframes are only probed around each planned cut; the window (seconds either
+# side) doubles up to the maximum until it holds a keyframe
+KEYFRAME_WINDOW_SECONDS = 10.0
+MAX_KEYFRAME_WINDOW_SECONDS = 160.0
+
+class ChunkStream:
+    """
+    One planned chunk that is produced while it is read, never written to disk
+    
+    open() returns a fresh readable stream each time (one per upload attempt).
+    length is exact for byte ranges and None for remux pipes, whose size is
+    only estimated (size_hint).
+    """
+    
+    def __init__(self, index: int, start: float, end: float, filename: str, content_type: str,
+                 opener: Callable[[], BinaryIO], length: Optional[int] = None, size_hint: Optional[int] = None):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.filename = filename
+        self.content_type = content_type
+        self.length = length
+        self.size_hint = size_hint
+        self._opener = opener
+    
+    def open(self) -> BinaryIO:
+        return self._opener()
+
+class _RemuxPipe:
+    """Readable stdout of an ffmpeg remux; raises at EOF if ffmpeg failed, kills it on close"""
+    
+    def __init__(self, command: List[str]):
+        self._process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    
+    def read(self, size: int = -1) -> bytes:
+        data = self._process.stdout.read(size)
+        if not data and self._process.wait() != 0:
+            stderr = self._process.stderr.read().decode(errors="replace").strip()
+            raise Exception(f"Failed to remux chunk: {stderr}")
+        return data
+    
+    def close(self):
+        if self._process.poll() is None:
+            self._process.kill()
+        self._process.wait()
+        self._process.stdout.close()
+        self._process.stderr.close()
 
 class VideoChunker:
-    def __init__(self, chunk_duration_hours: float = 1.0):
+    def __init__(self, chunk_duration_hours: float = 1.0, stream_copy: bool = True,
+                 max_workers: Optional[int] = None, ffmpeg_threads: Optional[int] = None,
+                 max_chunk_bytes: Optional[int] = None, parallelism: Optional[int] = None,
+                 encoding_profile: Union[str, EncodingProfile] = None):
         self.chunk_duration_seconds = chunk_duration_hours * 3600
         
-        # Set ffmpeg path explicitly to avoid subprocess issues
-        try:
-            change_settings({"FFMPEG_BINARY": "/opt/homebrew/bin/ffmpeg"})
-        except:
-            # If homebrew path doesn't work, try default paths
-            for ffmpeg_path in ["/usr/local/bin/ffmpeg", "/usr/bin/ffmpeg"]:
-                if os.path.exists(ffmpeg_path):
-                    try:
-                        change_settings({"FFMPEG_BINARY": ffmpeg_path})
-                        break
-                    except:
-                        continue
+        # Re-encode settings by name ("throughput", "balanced", "size") or as an
+        # EncodingProfile; a profile that always re-encodes turns stream copy off
+        self.encoding_profile = get_profile(encoding_profile)
+        self.stream_copy = stream_copy and self.encoding_profile.stream_copy
+        
+        # Chunk planning targets besides duration: bytes per chunk (e.g. the API's
+        # upload limit) and upload parallelism (chunk count rounded up to a multiple)
+        self.max_chunk_bytes = max_chunk_bytes
+        self.parallelism = parallelism
+        
+        # Re-encode parallelism: max_workers ffmpeg processes with ffmpeg_threads each
+        # (default: the profile's, else up to 4). By default workers * threads stays
+        # within the CPU count.
+        self.max_workers = max_workers
+        self.ffmpeg_threads = ffmpeg_threads or self.encoding_profile.threads or min(4, os.cpu_count() or 1)
     
     def get_video_duration(self, file_path: str) -> float:
-        """Get video duration in seconds"""
+        """Get video duration in seconds (header probe, memoized per file version)"""
         try:
-            with VideoFileClip(file_path) as clip:
+            return probe_video(file_path)["duration"]
+        except Exception:
+            pass
+        
+        # Headers without a usable duration - let moviepy work it out
+        try:
+            with _video_file_clip()(file_path) as clip:
                 return clip.duration
         except Exception as e:
             raise Exception(f"Failed to get video duration: {str(e)}")
     
+    def can_stream_copy(self, file_path: str) -> bool:
+        """Whether the probed codecs can be remuxed into mp4 chunks without re-encoding"""
+        try:
+            metadata = probe_video(file_path)
+        except Exception:
+            # Unknown - let ffmpeg try
+            return True
+        
+        video_codec = metadata.get("video_codec")
+        audio_codec = metadata.get("audio_codec")
+        if video_codec and video_codec not in MP4_VIDEO_CODECS:
+            return False
+        if audio_codec and audio_codec not in MP4_AUDIO_CODECS:
+            return False
+        return True
+    
     def needs_chunking(self, file_path: str) -> bool:
-        """Check if video needs to be chunked (longer than 1 hour)"""
+        """Check if video needs to be chunked (exceeds the duration or size limit)"""
+        return len(self.get_chunk_plan(file_path)) > 1
+    
+    def get_chunk_plan(self, file_path: str) -> List[Tuple[float, float]]:
+        """
+        Balanced (start, end) cut points in seconds from probed metadata
+        
+        When the source will be stream-copied, cuts are aligned to keyframes so
+        every chunk starts exactly where the plan says; only a window around each
+        cut is scanned for them. Nothing is encoded.
+        """
+        duration = self.get_video_duration(file_path)
+        size = os.path.getsize(file_path)
+        plan = plan_chunks(duration, size, self.chunk_duration_seconds, self.max_chunk_bytes, self.parallelism)
+        
+        if len(plan) > 1 and self.stream_copy and self.can_stream_copy(file_path):
+            try:
+                plan = plan_chunks(duration, size, self.chunk_duration_seconds, self.max_chunk_bytes,
+                                   self.parallelism, snap=lambda cut: _nearest_keyframe(file_path, cut, duration))
+            except Exception:
+                pass
+        
+        return plan
+    
+    def chunks_written_ahead(self, file_path: str, chunk_count: int) -> int:
+        """
+        How many chunks can be on disk before the consumer takes the first one
+        
+        Stream copy cuts the next chunk only when it is asked for; the re-encode
+        pool works one chunk per worker ahead.
+        """
+        if self.stream_copy and self.can_stream_copy(file_path):
+            return 1
+        return self._reencode_workers(chunk_count)
+    
+    def can_stream_directly(self, file_path: str) -> bool:
+        """Whether iter_chunk_streams can produce this source's chunks without chunk files"""
+        return self.stream_copy and self.can_stream_copy(file_path)
+    
+    def iter_chunk_streams(self, file_path: str) -> Iterator[ChunkStream]:
+        """
+        The chunk plan as streams instead of files, for sources that can be stream-copied
+        
+        MPEG-TS sources with known keyframe offsets are sent as byte ranges of the
+        memory-mapped source; anything else is remuxed by ffmpeg into fragmented
+        MP4 on a pipe, one process per chunk while it is being read. Either way no
+        chunk touches the disk.
+        """
+        if not self.can_stream_directly(file_path):
+            raise Exception("Failed to stream chunks: the source can't be stream-copied")
+        
+        video_name = os.path.splitext(os.path.basename(file_path))[0]
         duration = self.get_video_duration(file_path)
-        return duration > self.chunk_duration_seconds
+        size = os.path.getsize(file_path)
+        plan = self.get_chunk_plan(file_path)
+        
+        ranges = self._byte_ranges(file_path, plan)
+        for i, (start, end) in enumerate(plan):
+            size_hint = estimate_chunk_bytes(start, end, duration, size)
+            if ranges:
+                chunk_ranges = ranges[i]
+                yield ChunkStream(
+                    i, start, end, f"{video_name}_chunk_{i+1:03d}.ts", "video/mp2t",
+                    lambda chunk_ranges=chunk_ranges: FileRanges(file_path, chunk_ranges),
+                    length=sum(stop - begin for begin, stop in chunk_ranges)
+                )
+            else:
+                command = self._remux_command(file_path, start, end if i < len(plan) - 1 else None)
+                yield ChunkStream(
+                    i, start, end, f"{video_name}_chunk_{i+1:03d}.mp4", "video/mp4",
+                    lambda command=command: _RemuxPipe(command), size_hint=size_hint
+                )
+    
+    def _byte_ranges(self, file_path: str, plan: List[Tuple[float, float]]) -> Optional[List[List[Tuple[int, int]]]]:
+        """Per chunk, the byte ranges to send (shared header, then the chunk), or None if not possible"""
+        try:
+            if probe_video(file_path).get("format_name") not in BYTE_RANGE_FORMATS:
+                return None
+            positions = keyframe_positions(file_path)
+        except Exception:
+            return None
+        if not positions:
+            return None
+        
+        offsets = dict(positions)
+        size = os.path.getsize(file_path)
+        # Cut points are keyframes (the plan is aligned), so each start has an offset
+        starts = []
+        for start, _ in plan:
+            match = min(offsets, key=lambda t: abs(t - start))
+            if abs(match - start) > 1e-3:
+                return None
+            starts.append(offsets[match])
+        
+        header = (0, positions[0][1]) if positions[0][1] <= MAX_RANGE_HEADER_BYTES else (0, 0)
+        ends = starts[1:] + [size]
+        # The first chunk starts at byte 0 and already carries the header
+        return [[(0, ends[0])]] + [[header, (begin, stop)] for begin, stop in zip(starts[1:], ends[1:])]
+    
+    def _remux_command(self, file_path: str, start: float, end: Optional[float],
+                       chunk_path: str = None) -> List[str]:
+        """
+        ffmpeg remux of [start, end) to fragmented MP4 on stdout (no seekable output needed),
+        or to a regular MP4 file at chunk_path
+        """
+        # Input seeking lands on the keyframe at or before -ss; the plan's cuts are
+        # keyframes, so nudge past rounding to never land on the previous one
+        seek = start + 0.001 if start > 0 else 0
+        command = [
+            ffmpeg_binary(),
+            "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+            "-ss", f"{seek:.6f}", "-i", file_path
+        ]
+        if end is not None:
+            # The next chunk's keyframe sits exactly at end; stop just short of it
+            command += ["-t", f"{end - seek - 0.001:.6f}"]
+        command += ["-map", "0:v:0", "-map", "0:a?", "-c", "copy"]
+        if chunk_path is not None:
+            return command + ["-movflags", "+faststart", "-f", "mp4", chunk_path]
+        return command + ["-movflags", "frag_keyframe+empty_moov+default_base_moof", "-f", "mp4", "pipe:1"]
+    
+    def _reencode_workers(self, chunk_count: int) -> int:
+        cpu_count = os.cpu_count() or 1
+        workers = self.max_workers or max(1, cpu_count // self.ffmpeg_threads)
+        return max(1, min(workers, chunk_count))
     
     def chunk_video(self, file_path: str, output_dir: str = None) -> List[str]:
         """
         Chunk video into segments of specified duration
         Returns list of chunk file paths
-        """
-        if output_dir is None:
-            output_dir = tempfile.mkdtemp()
         
-        os.makedirs(output_dir, exist_ok=True)
+        Without output_dir, chunks go to a new directory under the scratch root;
+        the chunks and that directory belong to the caller.
         
-        video_name = os.path.splitext(os.path.basename(file_path))[0]
+        With stream_copy enabled the source is cut on keyframes without
+        transcoding; it falls back to re-encoding if the streams can't be remuxed.
+        """
         chunk_paths = []
         
         try:
-            # First, get the total duration
-            duration = self.get_video_duration(file_path)
-            
-            if duration <= self.chunk_duration_seconds:
-                # No chunking needed, return original file
-                return [file_path]
-            
-            chunk_count = int(duration // self.chunk_duration_seconds) + 1
-            
-            # Create each chunk separately to avoid subprocess corruption
-            for i in range(chunk_count):
-                start_time = i * self.chunk_duration_seconds
-                end_time = min((i + 1) * self.chunk_duration_seconds, duration)
-                
-                chunk_filename = f"{video_name}_chunk_{i+1:03d}.mp4"
-                chunk_path = os.path.join(output_dir, chunk_filename)
-                
-                # Open video file fresh for each chunk to avoid subprocess issues
-                try:
-                    video = VideoFileClip(file_path)
-                    chunk = video.subclip(start_time, end_time)
-                    
-                    chunk.write_videofile(
-                        chunk_path,
-                        codec='libx264',
-                        audio_codec='aac',
-                        verbose=False,
-                        logger=None,
-                        temp_audiofile=f'temp-audio-{i+1}.m4a',
-                        remove_temp=True,
-                        preset='fast'  # Use faster preset for quicker processing
-                    )
-                    
-                    # Clean up immediately after each chunk
-                    chunk.close()
-                    video.close()
-                    
-                    chunk_paths.append(chunk_path)
-                    
-                except Exception as chunk_error:
-                    # Clean up on chunk error
-                    try:
-                        if 'chunk' in locals():
-                            chunk.close()
-                        if 'video' in locals():
-                            video.close()
-                    except:
-                        pass
-                    
-                    # Remove failed chunk file if it exists
-                    if os.path.exists(chunk_path):
-                        os.remove(chunk_path)
-                    
-                    raise chunk_error
-            
+            for chunk_path in self.iter_chunks(file_path, output_dir):
+                chunk_paths.append(chunk_path)
             return chunk_paths
-            
+        
         except Exception as e:
             # Clean up any created chunks on error
             for chunk_path in chunk_paths:
-                if os.path.exists(chunk_path):
+                if chunk_path != file_path and os.path.exists(chunk_path):
                     try:
                         os.remove(chunk_path)
                     except:
                         pass
             raise Exception(f"Failed to chunk video: {str(e)}")
     
-    def get_chunk_info(self, file_path: str) -> Tuple[bool, int, float]:
+    def iter_chunks(self, file_path: str, output_dir: str = None, reuse_chunks: Set[int] = None) -> Iterator[str]:
+        """
+        Yield chunk file paths in order, each as soon as it is fully written
+        
+        Chunks are only produced ahead of the consumer as far as
+        chunks_written_ahead says, so unconsumed chunks on disk stay bounded.
+        Chunks that were yielded belong to the caller. If the generator fails or
+        is closed early, chunks it had not yet handed out are removed.
+        reuse_chunks holds 0-based chunk indexes that are skipped (their expected
+        path is yielded as-is), e.g. chunks kept from an earlier attempt.
+        """
+        if output_dir is None:
+            # Named like ScratchSpace entries, so a sweep removes it if this process dies
+            os.makedirs(DEFAULT_SCRATCH_ROOT, exist_ok=True)
+            output_dir = tempfile.mkdtemp(prefix=entry_prefix("chunks"), dir=DEFAULT_SCRATCH_ROOT)
+        
+        os.makedirs(output_dir, exist_ok=True)
+        
+        video_name = os.path.splitext(os.path.basename(file_path))[0]
+        
+        # Cut points come from the plan, so both paths produce the same chunks
+        plan = self.get_chunk_plan(file_path)
+        
+        if len(plan) == 1:
+            # No chunking needed, hand back the original file
+            yield file_path
+            return
+        
+        if self.stream_copy and self.can_stream_copy(file_path):
+            produced = False
+            try:
+                for chunk_path in self._iter_stream_copy(file_path, output_dir, video_name, plan,
+                                                         reuse_chunks or set()):
+                    produced = True
+                    yield chunk_path
+                return
+            except Exception:
+                # Container or codec can't be remuxed into mp4 - re-encode instead,
+                # unless chunks were already handed out
+                if produced:
+                    raise
+        
+        yield from self._iter_reencode(file_path, output_dir, video_name, plan, reuse_chunks or set())
+    
+    def _iter_stream_copy(self, file_path: str, output_dir: str, video_name: str,
+                          plan: List[Tuple[float, float]], reuse_chunks: Set[int]) -> Iterator[str]:
+        """
+        Cut the planned chunks on keyframes without transcoding, one ffmpeg remux per chunk
+        
+        Each chunk is only written when the consumer asks for it, so a slow
+        consumer holds back chunking instead of letting it fill the disk.
+        """
+        for i, (start, end) in enumerate(plan):
+            chunk_path = os.path.join(output_dir, f"{video_name}_chunk_{i+1:03d}.mp4")
+            if i not in reuse_chunks:
+                command = self._remux_command(file_path, start, end if i < len(plan) - 1 else None, chunk_path)
+                try:
+                    completed = subprocess.run(command, capture_output=True, text=True)
+                    if completed.returncode != 0 or not os.path.exists(chunk_path):
+                        raise Exception(f"Stream copy failed: {completed.stderr.strip()}")
+                except BaseException:
+                    # Never hand out (or leave behind) a partly written chunk
+                    if os.path.exists(chunk_path):
+                        try:
+                            os.remove(chunk_path)
+                        except:
+                            pass
+                    raise
+            yield chunk_path
+    
+    def _iter_reencode(self, file_path: str, output_dir: str, video_name: str, plan: List[Tuple[float, float]],
+                       reuse_chunks: Set[int]) -> Iterator[str]:
+        """Split video by re-encoding each segment with ffmpeg (per the encoding profile), in parallel"""
+        chunk_count = len(plan)
+        
+        try:
+            copy_audio = probe_video(file_path).get("audio_codec") in MP4_AUDIO_CODECS
+        except Exception:
+            copy_audio = False
+        output_args = self.encoding_profile.ffmpeg_args(self.ffmpeg_threads, copy_audio)
+        
+        jobs = []
+        for i, (start_time, end_time) in enumerate(plan):
+            chunk_filename = f"{video_name}_chunk_{i+1:03d}.mp4"
+            chunk_path = os.path.join(output_dir, chunk_filename)
+            # The last chunk runs to the end of the source
+            duration = end_time - start_time if i < chunk_count - 1 else None
+            jobs.append((file_path, start_time, duration, chunk_path, output_args))
+        
+        workers = self._reencode_workers(chunk_count)
+        
+        def start(job_index):
+            if job_index in reuse_chunks:
+                future = Future()
+                future.set_result(jobs[job_index][3])
+                return future
+            return executor.submit(_encode_chunk, *jobs[job_index])
+        
+        next_job = 0
+        handed_out = 0
+        try:
+            if workers == 1:
+                for i, job in enumerate(jobs):
+                    chunk_path = job[3] if i in reuse_chunks else _encode_chunk(*job)
+                    handed_out += 1
+                    yield chunk_path
+                return
+            
+            # The encoding happens in ffmpeg processes; threads only wait on them.
+            # Only `workers` chunks are encoded ahead of the consumer, which keeps
+            # the number of finished-but-unconsumed chunks on disk bounded.
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                in_flight = deque()
+                try:
+                    while next_job < len(jobs) or in_flight:
+                        while next_job < len(jobs) and len(in_flight) < workers:
+                            in_flight.append(start(next_job))
+                            next_job += 1
+                        
+                        # Yield in submission order so chunk order is preserved
+                        chunk_path = in_flight.popleft().result()
+                        handed_out += 1
+                        yield chunk_path
+                except BaseException:
+                    for future in in_flight:
+                        future.cancel()
+                    raise
+        
+        except BaseException:
+            # Clean up chunks that were not handed out; the executor has
+            # already waited for running workers at this point
+            for i, job in enumerate(jobs[handed_out:], start=handed_out):
+                if i in reuse_chunks:
+                    continue
+                if os.path.exists(job[3]):
+                    try:
+                        os.remove(job[3])
+                    except:
+                        pass
+            raise
+    
+    def get_chunk_info(self, file_path: str) -> Tuple[bool, int, float, List[Dict]]:
         """
         Get information about chunking requirements
-        Returns: (needs_chunking, number_of_chunks, total_duration)
+        Returns: (needs_chunking, number_of_chunks, total_duration, plan)
+        plan lists each chunk's start, end, duration and estimated_bytes
         """
         duration = self.get_video_duration(file_path)
-        needs_chunking = duration > self.chunk_duration_seconds
+        size = os.path.getsize(file_path)
+        segments = self.get_chunk_plan(file_path)
         
-        if needs_chunking:
-            chunk_count = int(duration // self.chunk_duration_seconds) + 1
-        else:
-            chunk_count = 1
+        plan = [
+            {
+                "start": start,
+                "end": end,
+                "duration": end - start,
+                "estimated_bytes": estimate_chunk_bytes(start, end, duration, size)
+            }
+            for start, end in segments
+        ]
         
-        return needs_chunking, chunk_count, duration
+        return len(plan) > 1, len(plan), duration, plan
+
+
+def _video_file_clip():
+    """
+    moviepy's VideoFileClip, imported on first use and set to the resolved ffmpeg
+    
+    moviepy (with imageio and friends) takes a good part of a second to import
+    and is only needed when the headers have no usable duration.
+    """
+    from moviepy.config import change_settings
+    change_settings({"FFMPEG_BINARY": ffmpeg_binary()})
+    from moviepy.video.io.VideoFileClip import VideoFileClip
+    return VideoFileClip
+
+
+def _nearest_keyframe(file_path: str, cut: float, duration: float) -> float:
+    """Keyframe closest to cut, from a window around it; cut itself if none is found"""
+    window = KEYFRAME_WINDOW_SECONDS
+    while window <= MAX_KEYFRAME_WINDOW_SECONDS:
+        # A cut can't go at the very start or end of the file
+        keyframes = [k for k in keyframes_between(file_path, cut - window, cut + window) if 0 < k < duration]
+        if keyframes:
+            return min(keyframes, key=lambda k: abs(k - cut))
+        window *= 2
+    return cut
+
+
+def _encode_chunk(file_path: str, start_time: float, duration: Optional[float], chunk_path: str,
+                  output_args: List[str]) -> str:
+    """Re-encode one segment of file_path to chunk_path with ffmpeg (duration None: to the end)"""
+    command = [
+        ffmpeg_binary(),
+        "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+        # Seeking before -i is frame-accurate when re-encoding, and skips decoding up to the start
+        "-ss", f"{start_time:.6f}", "-i", file_path
+    ]
+    if duration is not None:
+        command += ["-t", f"{duration:.6f}"]
+    command += ["-map", "0:v:0", "-map", "0:a?"] + output_args + ["-movflags", "+faststart", chunk_path]
+    
+    completed = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if completed.returncode != 0:
+        # Remove failed chunk file if it exists
+        if os.path.exists(chunk_path):
+            os.remove(chunk_path)
+        raise Exception(f"Failed to encode chunk: {completed.stderr.decode(errors='replace').strip()}")
+    
+    return chunk_path
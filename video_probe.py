@@ -0,0 +1,265 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import metrics
+
+# System installs preferred over the static build bundled with imageio-ffmpeg
+SYSTEM_FFMPEG_PATHS = ("/opt/homebrew/bin/ffmpeg", "/usr/local/bin/ffmpeg", "/usr/bin/ffmpeg")
+
+@lru_cache(maxsize=None)
+def ffmpeg_binary() -> str:
+    """
+    The ffmpeg executable, resolved once per process
+    
+    $FFMPEG_BINARY if it names a binary, else a system install, else ffmpeg on
+    PATH, else the copy bundled with imageio-ffmpeg (moviepy's default). Nothing
+    here imports moviepy; chunking and re-encoding call this binary directly,
+    and moviepy, only loaded as the fallback when headers have no usable
+    duration, is pointed at it when it is first imported.
+    """
+    configured = os.getenv("FFMPEG_BINARY")
+    if configured and configured not in ("ffmpeg-imageio", "auto-detect"):
+        return configured
+    for path in SYSTEM_FFMPEG_PATHS:
+        if os.path.exists(path):
+            return path
+    on_path = shutil.which("ffmpeg")
+    if on_path:
+        return on_path
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return "ffmpeg"
+
+@lru_cache(maxsize=None)
+def ffprobe_binary() -> Optional[str]:
+    """ffprobe next to the ffmpeg binary, else the one on PATH (resolved once per process)"""
+    ffmpeg = ffmpeg_binary()
+    sibling = os.path.join(os.path.dirname(ffmpeg), os.path.basename(ffmpeg).replace("ffmpeg", "ffprobe"))
+    if os.path.dirname(ffmpeg) and os.path.isfile(sibling):
+        return sibling
+    return shutil.which("ffprobe")
+
+def _file_key(file_path: str):
+    """Cache key that changes whenever the file does"""
+    stat = os.stat(file_path)
+    return os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns
+
+def probe_video(file_path: str, keyframes: bool = False) -> Dict:
+    """
+    Read container metadata without decoding: duration, size, bit_rate,
+    format_name, video_codec, audio_codec, width, height, fps
+    
+    Results are memoized per (path, size, mtime). With keyframes=True the
+    result also has "keyframes" (video keyframe timestamps, from a packet
+    scan that reads the file but decodes nothing).
+    """
+    try:
+        key = _file_key(file_path)
+        metadata = dict(_probe_cached(*key))
+        if keyframes:
+            metadata["keyframes"] = list(_keyframes_cached(*key))
+        return metadata
+    except Exception as e:
+        raise Exception(f"Failed to probe video: {str(e)}")
+
+def keyframes_between(file_path: str, start: float, end: float) -> List[float]:
+    """
+    Video keyframe timestamps in [start, end], memoized like probe_video
+    
+    Only that stretch of the file is read (an ffprobe read interval, or an
+    ffmpeg input seek), so the cost doesn't grow with the length of the video.
+    """
+    try:
+        return list(_keyframes_cached(*_file_key(file_path), max(0.0, start), end))
+    except Exception as e:
+        raise Exception(f"Failed to probe video: {str(e)}")
+
+def keyframe_positions(file_path: str) -> Optional[List[Tuple[float, int]]]:
+    """
+    (timestamp, byte offset) of every video keyframe packet, memoized like
+    probe_video; None when the offsets aren't available (no ffprobe)
+    """
+    if not ffprobe_binary():
+        return None
+    try:
+        return list(_keyframe_positions_cached(*_file_key(file_path)))
+    except Exception as e:
+        raise Exception(f"Failed to probe video: {str(e)}")
+
+def clear_probe_cache():
+    """Forget memoized probe results"""
+    _probe_cached.cache_clear()
+    _keyframes_cached.cache_clear()
+    _keyframe_positions_cached.cache_clear()
+
+@lru_cache(maxsize=256)
+def _probe_cached(path: str, size: int, mtime_ns: int) -> Dict:
+    with metrics.timed("probe_seconds"):
+        ffprobe = ffprobe_binary()
+        if ffprobe:
+            return _probe_with_ffprobe(ffprobe, path, size)
+        return _probe_with_ffmpeg(path, size)
+
+@lru_cache(maxsize=256)
+def _keyframes_cached(path: str, size: int, mtime_ns: int, start: float = None, end: float = None) -> tuple:
+    """Keyframes of the whole file, or only of [start, end]"""
+    ffprobe = ffprobe_binary()
+    if not ffprobe:
+        return _keyframes_with_ffmpeg(path, start, end)
+    
+    interval = [] if start is None else ["-read_intervals", f"{start}%{end}"]
+    result = subprocess.run(
+        [ffprobe, "-v", "error", "-select_streams", "v:0", *interval,
+         "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", path],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise Exception(result.stderr.strip())
+    
+    keyframes = []
+    for line in result.stdout.splitlines():
+        pts_time, _, flags = line.partition(",")
+        if "K" in flags and pts_time not in ("", "N/A"):
+            keyframes.append(float(pts_time))
+    return _within(keyframes, start, end)
+
+@lru_cache(maxsize=64)
+def _keyframe_positions_cached(path: str, size: int, mtime_ns: int) -> tuple:
+    result = subprocess.run(
+        [ffprobe_binary(), "-v", "error", "-select_streams", "v:0",
+         "-show_entries", "packet=pts_time,pos,flags", "-of", "csv=p=0", path],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise Exception(result.stderr.strip())
+    
+    positions = []
+    for line in result.stdout.splitlines():
+        fields = line.split(",")
+        if len(fields) < 3 or "K" not in fields[2]:
+            continue
+        pts_time, pos = _to_float(fields[0]), _to_int(fields[1])
+        if pts_time is not None and pos is not None:
+            positions.append((pts_time, pos))
+    return tuple(sorted(positions))
+
+def _keyframes_with_ffmpeg(path: str, start: float = None, end: float = None) -> tuple:
+    """Fallback keyframe scan: stream-copy video packets into ffmpeg's framecrc listing"""
+    # Seek to the window but keep the file's own timestamps
+    window = [] if start is None else ["-ss", str(start), "-t", str(end - start), "-copyts"]
+    result = subprocess.run(
+        [ffmpeg_binary(), "-hide_banner", "-nostdin", "-loglevel", "error",
+         *window, "-i", path, "-map", "0:v:0", "-c", "copy", "-f", "framecrc", "-"],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise Exception(result.stderr.strip())
+    
+    time_base = 1.0
+    keyframes = []
+    for line in result.stdout.splitlines():
+        if line.startswith("#tb 0:"):
+            numerator, _, denominator = line.split(":", 1)[1].strip().partition("/")
+            time_base = float(numerator) / float(denominator)
+        elif not line.startswith("#") and "F=0x0" not in line:
+            # stream, dts, pts, duration, size, crc[, F=flags] - keyframes carry no flag column
+            fields = [field.strip() for field in line.split(",")]
+            if len(fields) >= 3 and fields[2].lstrip("-").isdigit():
+                keyframes.append(int(fields[2]) * time_base)
+    return _within(keyframes, start, end)
+
+def _within(keyframes: List[float], start: Optional[float], end: Optional[float]) -> tuple:
+    """Sorted keyframes, without those a seek read from before start or after end"""
+    if start is not None:
+        keyframes = [k for k in keyframes if start <= k <= end]
+    return tuple(sorted(keyframes))
+
+def _probe_with_ffprobe(ffprobe: str, path: str, size: int) -> Dict:
+    """Header-only probe via ffprobe's JSON output"""
+    result = subprocess.run(
+        [ffprobe, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", path],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise Exception(result.stderr.strip() or f"ffprobe exited with {result.returncode}")
+    
+    info = json.loads(result.stdout)
+    fmt = info.get("format", {})
+    video = next((s for s in info.get("streams", []) if s.get("codec_type") == "video"), {})
+    audio = next((s for s in info.get("streams", []) if s.get("codec_type") == "audio"), {})
+    
+    duration = _to_float(fmt.get("duration")) or _to_float(video.get("duration"))
+    if duration is None:
+        raise Exception("duration not found")
+    
+    return {
+        "duration": duration,
+        "size": size,
+        "bit_rate": _to_int(fmt.get("bit_rate")) or (int(size * 8 / duration) if duration else None),
+        "format_name": fmt.get("format_name"),
+        "video_codec": video.get("codec_name"),
+        "audio_codec": audio.get("codec_name"),
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "fps": _parse_rate(video.get("avg_frame_rate") or video.get("r_frame_rate"))
+    }
+
+def _probe_with_ffmpeg(path: str, size: int) -> Dict:
+    """Fallback when ffprobe isn't installed: parse the header summary `ffmpeg -i` prints"""
+    result = subprocess.run(
+        [ffmpeg_binary(), "-hide_banner", "-nostdin", "-i", path],
+        capture_output=True, text=True
+    )
+    output = result.stderr
+    
+    match = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", output)
+    if not match:
+        raise Exception(output.strip().splitlines()[-1] if output.strip() else "duration not found")
+    duration = int(match.group(1)) * 3600 + int(match.group(2)) * 60 + float(match.group(3))
+    
+    bit_rate = re.search(r"bitrate: (\d+) kb/s", output)
+    fmt = re.search(r"Input #0, ([^ ]+), from", output)
+    video = re.search(r"Stream #\d+:\d+[^:]*: Video: (\w+)[^\n]*?, (\d+)x(\d+)", output)
+    audio = re.search(r"Stream #\d+:\d+[^:]*: Audio: (\w+)", output)
+    fps = re.search(r"Stream #\d+:\d+[^:]*: Video: [^\n]*?, ([\d.]+) fps", output)
+    
+    return {
+        "duration": duration,
+        "size": size,
+        "bit_rate": int(bit_rate.group(1)) * 1000 if bit_rate else (int(size * 8 / duration) if duration else None),
+        "format_name": fmt.group(1).rstrip(",") if fmt else None,
+        "video_codec": video.group(1) if video else None,
+        "audio_codec": audio.group(1) if audio else None,
+        "width": int(video.group(2)) if video else None,
+        "height": int(video.group(3)) if video else None,
+        "fps": float(fps.group(1)) if fps else None
+    }
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _parse_rate(value) -> Optional[float]:
+    """Parse an ffprobe rational like '30000/1001'"""
+    if not value:
+        return None
+    numerator, _, denominator = value.partition("/")
+    try:
+        return float(numerator) / float(denominator or 1) if float(denominator or 1) else None
+    except ValueError:
+        return None